@@ -0,0 +1,122 @@
+# benchmarks/bench_digit_ocr.py
+"""
+Reconocedor de dígitos por plantillas (core/digit_ocr.py) frente a Tesseract.
+
+Recorta ronda, nivel y oro de los frames etiquetados (data/labels.jsonl),
+construye las plantillas con los frames de entrenamiento y, sobre los
+apartados (1 de cada --holdout), mide por campo:
+
+  - acierto exacto del texto (una lectura vacía cuenta como fallo),
+  - tiempo por recorte (p50/p95), binarizado incluido en ambos casos.
+
+Tesseract usa el mismo preprocesado que HUDReader (--psm 7 y lista blanca
+de dígitos, más "-IV" para la ronda, "III-4" en pantalla). Si pytesseract
+no está, se omite.
+
+    python benchmarks/bench_digit_ocr.py
+    python benchmarks/bench_digit_ocr.py --holdout 3 --repeat 50
+"""
+
+from __future__ import annotations
+
+import argparse
+import sys
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from harness import RESULTS_DIR, measure, print_table, run_meta, skipped, write_results  # noqa: E402
+
+from core.digit_ocr import DigitRecognizer, binarize  # noqa: E402
+from tools.build_digit_templates import FIELDS, LABELS_PATH, iter_samples, load_field_crops, split  # noqa: E402
+
+try:
+    import pytesseract
+except ImportError:
+    pytesseract = None
+
+
+def tesseract_read(crop: np.ndarray, field: str) -> Optional[str]:
+    whitelist = "0123456789-IV" if field == "round" else "0123456789"
+    arr = binarize(crop).astype(np.uint8) * 255
+    try:
+        text = pytesseract.image_to_string(arr, config=f"--psm 7 -c tessedit_char_whitelist={whitelist}")
+    except Exception:
+        return None
+    text = "".join(ch for ch in text if ch in whitelist)
+    return text or None
+
+
+def bench_reader(
+    name: str,
+    read: Callable[[np.ndarray, str], Optional[str]],
+    pairs_by_field: Dict[str, List[Tuple[np.ndarray, str]]],
+    repeat: int,
+) -> List[Dict[str, Any]]:
+    results = []
+    for field, pairs in pairs_by_field.items():
+        correct = sum(read(crop, field) == expected for crop, expected in pairs)
+        idx = [0]
+
+        def one() -> None:
+            crop, _ = pairs[idx[0] % len(pairs)]
+            idx[0] += 1
+            read(crop, field)
+
+        results.append(
+            measure(
+                f"digits.{name}.{field}",
+                "digits",
+                one,
+                repeat=repeat,
+                warmup=min(3, len(pairs)),
+                extra={"n": len(pairs), "accuracy": round(correct / len(pairs), 4)},
+            )
+        )
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Plantillas de dígitos vs Tesseract: acierto y latencia por campo.")
+    parser.add_argument("--labels", default=str(LABELS_PATH))
+    parser.add_argument("--holdout", type=int, default=4, help="1 de cada N frames para evaluar.")
+    parser.add_argument("--repeat", type=int, default=30)
+    parser.add_argument("--out", default=str(RESULTS_DIR / "digits.json"))
+    args = parser.parse_args()
+
+    frames = load_field_crops(Path(args.labels))
+    train, test = split(frames, args.holdout)
+    if not test:
+        raise SystemExit(f"Sin frames de evaluación ({len(frames)} frames, --holdout {args.holdout})")
+    rec = DigitRecognizer.fit(iter_samples(train))
+    pairs_by_field = {
+        field: [crops[field] for crops in test if field in crops] for field in FIELDS
+    }
+    pairs_by_field = {f: p for f, p in pairs_by_field.items() if p}
+
+    results = bench_reader("templates", lambda crop, field: rec.read(crop), pairs_by_field, args.repeat)
+    if pytesseract is not None:
+        results += bench_reader("tesseract", tesseract_read, pairs_by_field, max(3, args.repeat // 5))
+    else:
+        results.append(skipped("digits.tesseract", "digits", "pytesseract no instalado"))
+
+    meta = run_meta(groups=["digits"], frames_train=len(train), frames_test=len(test), fit=rec.fit_stats)
+    write_results(results, meta, Path(args.out))
+    print_table(results)
+    print()
+    print(f"  {'lector':<28} {'n':>4} {'acierto':>8} {'p50':>10} {'p95':>10}")
+    for r in results:
+        if "skipped" in r:
+            continue
+        print(
+            f"  {r['name']:<28} {r['n']:>4} {r['accuracy']:>8.1%} "
+            f"{r['p50_us'] / 1000:>8.3f}ms {r['p95_us'] / 1000:>8.3f}ms"
+        )
+    print(f"[bench] Resultados en {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,184 @@
+# benchmarks/bench_hud_runtime.py
+"""
+Runtimes del modelo HUD en CPU: eager fp32 frente a los artefactos de
+tools/export_hud_model.py (TorchScript / ONNX, fp32 / int8, channels-last).
+
+Exporta cada variante del checkpoint a un directorio temporal y, con
+HUDLocalReader sobre los frames de data/labels.jsonl, mide:
+
+  - latencia del forward con lote 1 (p50/p95) y con lote --batch-size,
+  - acierto por campo contra las etiquetas,
+  - concordancia con eager fp32 (misma lectura en los cuatro campos): lo que
+    cuesta la cuantización independientemente de lo bueno que sea el modelo,
+  - tamaño del artefacto.
+
+El preprocesado queda fuera de la medida (es el mismo en todas). Las
+variantes ONNX se omiten si no están onnx y onnxruntime.
+
+    python benchmarks/bench_hud_runtime.py
+    python benchmarks/bench_hud_runtime.py --weights hud_model.pt --threads 4 --only ts
+"""
+
+from __future__ import annotations
+
+import argparse
+import sys
+import tempfile
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from harness import RESULTS_DIR, ROOT, measure, print_table, run_meta, skipped, write_results  # noqa: E402
+
+from core.hud_local_reader import HEADS, HUDLocalReader  # noqa: E402
+from datasets.hud_dataset import label_value  # noqa: E402
+from models.hud_roi_model import stack_inputs  # noqa: E402
+from tools.export_hud_model import LABELS_PATH, export, load_labeled_frames  # noqa: E402
+
+# (nombre, formato, cuantización, channels_last); None = el checkpoint tal cual.
+VARIANTS: List[Tuple[str, Optional[str], str, bool]] = [
+    ("eager", None, "none", False),
+    ("ts", "torchscript", "none", False),
+    ("ts.cl", "torchscript", "none", True),
+    ("ts.dynamic", "torchscript", "dynamic", False),
+    ("ts.static", "torchscript", "static", False),
+    ("ts.static.cl", "torchscript", "static", True),
+    ("onnx", "onnx", "none", False),
+    ("onnx.dynamic", "onnx", "dynamic", False),
+    ("onnx.static", "onnx", "static", False),
+]
+
+
+def onnx_available() -> bool:
+    try:
+        import onnx  # noqa: F401
+        import onnxruntime  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def field_matches(hud: Dict[str, Any], rec: Dict[str, Any], field: str) -> Optional[bool]:
+    """¿Coincide la lectura con la etiqueta? None si el frame no tiene ese campo."""
+    expected = label_value(rec, field)
+    if expected is None:
+        return None
+    if field == "round":
+        return hud["round"] == expected
+    return hud[field] == int(expected)
+
+
+def bench_variant(
+    name: str,
+    path: Path,
+    frames: List[Tuple[Any, Dict[str, Any]]],
+    reference: Optional[List[Dict[str, Any]]],
+    repeat: int,
+    batch_size: int,
+) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+    reader = HUDLocalReader(str(path), device="cpu", change_detection=False)
+    # RGB -> BGR, que es lo que espera to_tensor con arrays.
+    inputs = [reader.to_tensor(rgb[:, :, ::-1]) for rgb, _ in frames]
+    huds = reader.predict_tensor_batch(stack_inputs(inputs))
+
+    extra: Dict[str, Any] = {"n": len(frames), **reader.runtime.describe(), "size_mb": round(path.stat().st_size / 1e6, 2)}
+    for field in HEADS:
+        hits = [m for m in (field_matches(h, rec, field) for h, (_, rec) in zip(huds, frames)) if m is not None]
+        extra[f"acc_{field}"] = round(sum(hits) / len(hits), 4) if hits else None
+    if reference is not None:
+        same = sum(all(h[f] == r[f] for f in HEADS) for h, r in zip(huds, reference))
+        extra["agree_eager"] = round(same / len(huds), 4)
+
+    idx = [0]
+
+    def single() -> None:
+        reader.predict_tensor_batch(stack_inputs([inputs[idx[0] % len(inputs)]]))
+        idx[0] += 1
+
+    batch = stack_inputs([inputs[i % len(inputs)] for i in range(batch_size)])
+
+    def batched() -> None:
+        reader.predict_tensor_batch(batch)
+
+    results = [
+        measure(f"hud_runtime.{name}", "hud_runtime", single, repeat=repeat, warmup=3, extra=extra),
+        measure(
+            f"hud_runtime.{name}.b{batch_size}",
+            "hud_runtime",
+            batched,
+            repeat=max(3, repeat // 5),
+            warmup=1,
+            items=batch_size,
+            extra={"batch_size": batch_size},
+        ),
+    ]
+    return results, huds
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Latencia y acierto del modelo HUD por runtime (CPU).")
+    parser.add_argument("--weights", default=str(ROOT / "hud_model.pt"))
+    parser.add_argument("--labels", default=str(LABELS_PATH))
+    parser.add_argument("--only", default="", help="Prefijos de variante separados por comas (eager,ts,onnx...).")
+    parser.add_argument("--repeat", type=int, default=50)
+    parser.add_argument("--batch-size", type=int, default=8)
+    parser.add_argument("--threads", type=int, default=None, help="torch.set_num_threads")
+    parser.add_argument("--out", default=str(RESULTS_DIR / "hud_runtime.json"))
+    args = parser.parse_args()
+
+    import torch
+
+    if args.threads:
+        torch.set_num_threads(args.threads)
+
+    weights = Path(args.weights)
+    if not weights.exists():
+        raise SystemExit(f"No existe {weights}. Entrena el modelo con train_hud_model.py primero.")
+    frames = load_labeled_frames(Path(args.labels))
+    if not frames:
+        raise SystemExit(f"No hay frames etiquetados en {args.labels}")
+
+    prefixes = [p.strip() for p in args.only.split(",") if p.strip()]
+    has_onnx = onnx_available()
+    results: List[Dict[str, Any]] = []
+    reference: Optional[List[Dict[str, Any]]] = None
+    with tempfile.TemporaryDirectory() as tmp:
+        for name, fmt, quantize, channels_last in VARIANTS:
+            # eager se mide siempre: es la referencia de concordancia.
+            if prefixes and name != "eager" and not any(name.startswith(p) for p in prefixes):
+                continue
+            if fmt == "onnx" and not has_onnx:
+                results.append(skipped(f"hud_runtime.{name}", "hud_runtime", "onnx/onnxruntime no instalados"))
+                continue
+            print(f"[bench] {name} ...")
+            try:
+                if fmt is None:
+                    path = weights
+                else:
+                    out = Path(tmp) / f"{name}{'.onnx' if fmt == 'onnx' else '.ts'}"
+                    path = export(weights, out, fmt, quantize, channels_last, frames)
+                variant_results, huds = bench_variant(name, path, frames, reference, args.repeat, args.batch_size)
+            except Exception as err:
+                results.append(skipped(f"hud_runtime.{name}", "hud_runtime", f"{type(err).__name__}: {err}"))
+                continue
+            results.extend(variant_results)
+            if fmt is None:
+                reference = huds
+
+    meta = run_meta(groups=["hud_runtime"], weights=str(weights), frames=len(frames), threads=torch.get_num_threads())
+    write_results(results, meta, Path(args.out))
+    print_table(results)
+    print()
+    print(f"  {'variante':<26} {'MB':>6} {'p50':>9} {'concord.':>9}  acierto (round/level/gold/hp)")
+    for r in results:
+        if "skipped" in r or "n" not in r:
+            continue
+        accs = "/".join("-" if r[f"acc_{f}"] is None else f"{r[f'acc_{f}']:.0%}" for f in HEADS)
+        agree = f"{r['agree_eager']:.0%}" if "agree_eager" in r else "ref"
+        print(f"  {r['name']:<26} {r['size_mb']:>6.1f} {r['p50_us'] / 1000:>7.2f}ms {agree:>9}  {accs}")
+    print(f"[bench] Resultados en {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,178 @@
+# benchmarks/bench_payload.py
+"""
+Tamaño de payload vs latencia para las imágenes que se mandan al VLM.
+
+Para cada variante (codec, calidad, max_side, mosaico de ROIs) codifica los
+frames de data/raw_frames y los envía por el gateway a un servidor local
+(tools/vlm_standin_server.py, arrancado en un hilo si no se pasa --url).
+Reporta por variante:
+
+  - bytes por petición (archivo y base64),
+  - tiempo de codificación y latencia extremo a extremo (p50/p95),
+  - fidelidad: PSNR de las regiones del HUD tras decodificar y volver a
+    la resolución original, frente a la versión sin pérdida. Por encima de
+    ~35 dB los dígitos son indistinguibles a ojo; es un proxy de si el VLM
+    seguirá leyendo igual, no sustituye a validar con el modelo real.
+
+    python benchmarks/bench_payload.py
+    python benchmarks/bench_payload.py --url http://127.0.0.1:1234 --repeat 3
+"""
+
+from __future__ import annotations
+
+import argparse
+import sys
+import time
+from pathlib import Path
+from typing import Any, Dict, List
+
+import cv2
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from harness import RESULTS_DIR, ROOT, print_table, run_meta, write_results  # noqa: E402
+
+from core.api_gateway import get_gateway  # noqa: E402
+from core.hud_regions import HUD_FIELD_BOXES, box_to_pixels  # noqa: E402
+from core.metrics import percentile  # noqa: E402
+from core.payload import PayloadConfig, encode_image, roi_composite  # noqa: E402
+
+FRAMES_DIR = ROOT / "data" / "raw_frames"
+
+VARIANTS: List[PayloadConfig] = [
+    PayloadConfig(codec="png", png_level=3),
+    PayloadConfig(codec="png", png_level=1),
+    PayloadConfig(codec="jpeg", quality=90),
+    PayloadConfig(codec="jpeg", quality=80),
+    PayloadConfig(codec="jpeg", quality=70),
+    PayloadConfig(codec="webp", quality=80),
+    PayloadConfig(codec="jpeg", quality=85, max_side=1280),
+    PayloadConfig(codec="jpeg", quality=85, max_side=960),
+    PayloadConfig(codec="png", png_level=1, max_side=1280),
+    PayloadConfig(codec="png", png_level=1, roi_composite=True),
+    PayloadConfig(codec="jpeg", quality=85, roi_composite=True),
+]
+
+
+def _psnr(a: np.ndarray, b: np.ndarray) -> float:
+    mse = float(np.mean((a.astype(np.float32) - b.astype(np.float32)) ** 2))
+    return 99.0 if mse == 0 else 10.0 * np.log10(255.0 ** 2 / mse)
+
+
+def _fidelity(frame: np.ndarray, cfg: PayloadConfig, b64: str) -> float:
+    """PSNR mínimo de las ROIs del HUD entre el payload decodificado y el original."""
+    import base64
+
+    decoded = cv2.imdecode(np.frombuffer(base64.b64decode(b64), np.uint8), cv2.IMREAD_COLOR)
+    reference = roi_composite(frame, cfg.composite_boxes) if cfg.roi_composite else frame
+    rh, rw = reference.shape[:2]
+    if decoded.shape[:2] != (rh, rw):
+        decoded = cv2.resize(decoded, (rw, rh), interpolation=cv2.INTER_LINEAR)
+    if cfg.roi_composite:
+        return _psnr(reference, decoded)
+    scores = []
+    for box in HUD_FIELD_BOXES.values():
+        l, t, r, b = box_to_pixels(box, rw, rh)
+        scores.append(_psnr(reference[t:b, l:r], decoded[t:b, l:r]))
+    return min(scores)
+
+
+def bench_variant(cfg: PayloadConfig, frames: List[np.ndarray], url: str, repeat: int) -> Dict[str, Any]:
+    gateway = get_gateway(url)
+    encode_ms: List[float] = []
+    e2e_ms: List[float] = []
+    nbytes: List[int] = []
+    b64_bytes: List[int] = []
+    fidelity: List[float] = []
+
+    for r in range(repeat):
+        for frame in frames:
+            t0 = time.perf_counter()
+            enc = encode_image(frame, cfg)
+            t1 = time.perf_counter()
+            gateway.chat(
+                model="standin",
+                messages=[
+                    {
+                        "role": "user",
+                        "content": [
+                            {"type": "text", "text": "bench"},
+                            {"type": "image_url", "image_url": {"url": enc.data_url}},
+                        ],
+                    }
+                ],
+            )
+            t2 = time.perf_counter()
+            encode_ms.append((t1 - t0) * 1000.0)
+            e2e_ms.append((t2 - t0) * 1000.0)
+            if r == 0:
+                nbytes.append(enc.nbytes)
+                b64_bytes.append(len(enc.b64))
+                fidelity.append(_fidelity(frame, cfg, enc.b64))
+
+    mean_e2e = sum(e2e_ms) / len(e2e_ms)
+    return {
+        "name": f"payload.{cfg.label()}",
+        "group": "payload",
+        "samples": len(e2e_ms),
+        "number": 1,
+        "mean_us": round(mean_e2e * 1000.0, 3),
+        "p50_us": round(percentile(e2e_ms, 50) * 1000.0, 3),
+        "p95_us": round(percentile(e2e_ms, 95) * 1000.0, 3),
+        "min_us": round(min(e2e_ms) * 1000.0, 3),
+        "ops_per_s": round(1000.0 / mean_e2e, 2),
+        "items_per_s": round(1000.0 / mean_e2e, 2),
+        "encode_ms_p50": round(percentile(encode_ms, 50), 2),
+        "bytes_mean": int(sum(nbytes) / len(nbytes)),
+        "b64_bytes_mean": int(sum(b64_bytes) / len(b64_bytes)),
+        "hud_psnr_db_min": round(min(fidelity), 2),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Bytes/latencia/fidelidad de los payloads del VLM.")
+    parser.add_argument("--url", default="", help="Servidor OpenAI-compatible; vacío = stand-in local.")
+    parser.add_argument("--base-ms", type=float, default=40.0, help="Latencia fija del stand-in.")
+    parser.add_argument("--ms-per-mb", type=float, default=30.0, help="Latencia por MB del stand-in.")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--out", default=str(RESULTS_DIR / "payload.json"))
+    args = parser.parse_args()
+
+    frames = [cv2.imread(str(p), cv2.IMREAD_COLOR) for p in sorted(FRAMES_DIR.glob("*.png"))]
+    frames = [f for f in frames if f is not None]
+    if not frames:
+        raise SystemExit(f"No hay frames en {FRAMES_DIR}")
+
+    url = args.url
+    server = None
+    if not url:
+        from tools.vlm_standin_server import serve_in_thread
+
+        server, url = serve_in_thread(base_ms=args.base_ms, ms_per_mb=args.ms_per_mb)
+        print(f"[bench] Stand-in en {url} (base {args.base_ms} ms, {args.ms_per_mb} ms/MB)")
+
+    results = []
+    try:
+        for cfg in VARIANTS:
+            print(f"[bench] {cfg.label()} ...")
+            results.append(bench_variant(cfg, frames, url, args.repeat))
+    finally:
+        if server is not None:
+            server.shutdown()
+
+    meta = run_meta(groups=["payload"], url=args.url or "standin", frames=len(frames))
+    write_results(results, meta, Path(args.out))
+    print_table(results)
+    print()
+    print(f"  {'variante':<34} {'bytes':>10} {'encode':>9} {'e2e p50':>9} {'PSNR HUD':>9}")
+    for r in results:
+        print(
+            f"  {r['name']:<34} {r['bytes_mean']:>10} {r['encode_ms_p50']:>7.1f}ms "
+            f"{r['p50_us'] / 1000:>7.1f}ms {r['hud_psnr_db_min']:>7.1f}dB"
+        )
+    print(f"[bench] Resultados en {args.out}")
+
+
+if __name__ == "__main__":
+    main()
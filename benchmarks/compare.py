@@ -0,0 +1,58 @@
+# benchmarks/compare.py
+"""
+Compara dos ejecuciones de benchmarks (JSON de run_benchmarks.py) caso a caso.
+
+    python benchmarks/compare.py base.json latest.json --threshold 0.10 --fail
+
+Se compara p50 por llamada; un caso es regresión si el nuevo p50 supera
+al base en más de `threshold` (fracción).
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+from pathlib import Path
+from typing import Any, Dict
+
+
+def _load(path: Path) -> Dict[str, Dict[str, Any]]:
+    data = json.loads(path.read_text(encoding="utf-8"))
+    return {r["name"]: r for r in data.get("results", []) if "skipped" not in r}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("base")
+    parser.add_argument("new")
+    parser.add_argument("--threshold", type=float, default=0.10)
+    parser.add_argument("--fail", action="store_true", help="Código de salida 1 si hay regresiones.")
+    args = parser.parse_args()
+
+    base = _load(Path(args.base))
+    new = _load(Path(args.new))
+
+    regressions = 0
+    for name in sorted(set(base) | set(new)):
+        if name not in base or name not in new:
+            side = "base" if name in base else "nuevo"
+            print(f"  {name:<36} solo en {side}")
+            continue
+        b, n = base[name]["p50_us"], new[name]["p50_us"]
+        delta = (n - b) / b if b > 0 else 0.0
+        flag = ""
+        if delta > args.threshold:
+            flag = "  <-- REGRESIÓN"
+            regressions += 1
+        elif delta < -args.threshold:
+            flag = "  mejora"
+        print(f"  {name:<36} {b:>11.1f}us -> {n:>11.1f}us  ({delta:+.1%}){flag}")
+
+    print(f"[bench] {regressions} regresiones (umbral {args.threshold:.0%})")
+    if args.fail and regressions:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+# benchmarks/harness.py
+"""
+Utilidades comunes de los benchmarks: medición y guardado de resultados.
+
+Cada caso produce un dict plano (nombre, grupo, percentiles en µs, ops/s)
+para poder comparar ejecuciones con benchmarks/compare.py.
+"""
+
+from __future__ import annotations
+
+import json
+import platform
+import subprocess
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+ROOT = Path(__file__).resolve().parent.parent
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from core.metrics import percentile  # noqa: E402
+
+FIXTURES_DIR = Path(__file__).resolve().parent / "fixtures"
+RESULTS_DIR = Path(__file__).resolve().parent / "results"
+
+
+def measure(
+    name: str,
+    group: str,
+    fn: Callable[[], Any],
+    *,
+    number: int = 1,
+    repeat: int = 30,
+    warmup: int = 3,
+    items: int = 1,
+    extra: Optional[Dict[str, Any]] = None,
+) -> Dict[str, Any]:
+    """
+    Ejecuta fn `warmup` veces sin medir y luego `repeat` muestras de
+    `number` llamadas cada una. `items` es cuántos elementos procesa una
+    llamada (p.ej. tamaño de batch) para calcular items/s.
+    """
+    for _ in range(warmup):
+        fn()
+    per_call: List[float] = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        for _ in range(number):
+            fn()
+        per_call.append((time.perf_counter() - t0) / number)
+
+    us = [t * 1e6 for t in per_call]
+    mean = sum(per_call) / len(per_call)
+    result: Dict[str, Any] = {
+        "name": name,
+        "group": group,
+        "samples": repeat,
+        "number": number,
+        "mean_us": round(mean * 1e6, 3),
+        "p50_us": round(percentile(us, 50), 3),
+        "p95_us": round(percentile(us, 95), 3),
+        "min_us": round(min(us), 3),
+        "ops_per_s": round(1.0 / mean, 2) if mean > 0 else None,
+        "items_per_s": round(items / mean, 2) if mean > 0 else None,
+    }
+    if extra:
+        result.update(extra)
+    return result
+
+
+def skipped(name: str, group: str, reason: str) -> Dict[str, Any]:
+    print(f"[bench] {name}: omitido ({reason})")
+    return {"name": name, "group": group, "skipped": reason}
+
+
+def _git_sha() -> Optional[str]:
+    try:
+        out = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=ROOT,
+            capture_output=True,
+            text=True,
+            timeout=5,
+        )
+        return out.stdout.strip() or None
+    except Exception:
+        return None
+
+
+def run_meta(**extra: Any) -> Dict[str, Any]:
+    meta: Dict[str, Any] = {
+        "created_utc": datetime.utcnow().isoformat() + "Z",
+        "git_sha": _git_sha(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+    }
+    try:
+        import torch
+
+        meta["torch"] = torch.__version__
+        meta["torch_threads"] = torch.get_num_threads()
+    except ImportError:
+        meta["torch"] = None
+    meta.update(extra)
+    return meta
+
+
+def write_results(
+    results: List[Dict[str, Any]],
+    meta: Dict[str, Any],
+    out_path: Path,
+    history_path: Optional[Path] = None,
+) -> None:
+    """Escribe el JSON de la ejecución y, opcionalmente, lo añade al histórico JSONL."""
+    record = {"meta": meta, "results": results}
+    out_path.parent.mkdir(parents=True, exist_ok=True)
+    out_path.write_text(json.dumps(record, ensure_ascii=False, indent=2), encoding="utf-8")
+    if history_path is not None:
+        history_path.parent.mkdir(parents=True, exist_ok=True)
+        with history_path.open("a", encoding="utf-8") as f:
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+
+def print_table(results: List[Dict[str, Any]]) -> None:
+    for r in results:
+        if "skipped" in r:
+            print(f"  {r['group']:<8} {r['name']:<36} omitido: {r['skipped']}")
+            continue
+        print(
+            f"  {r['group']:<8} {r['name']:<36} "
+            f"p50={r['p50_us']:>11.1f}us  p95={r['p95_us']:>11.1f}us  "
+            f"{r['items_per_s']:>12.1f} items/s"
+        )
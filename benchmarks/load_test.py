@@ -0,0 +1,201 @@
+# benchmarks/load_test.py
+"""
+Prueba de carga de las rutas de percepción contra un servidor OpenAI-compatible.
+
+Por defecto arranca tools/vlm_standin_server.py en un hilo (latencia, tasa de
+errores y respuestas configurables), así que corre en CI sin LM Studio / NIM.
+Para cada objetivo y nivel de concurrencia lanza --requests llamadas desde
+N hilos y reporta throughput, percentiles de latencia y errores:
+
+  nemotron   NemotronVLVLM.analyze_frame (frame completo)
+  hud        HUDReader.read (4 recortes en una petición)
+  vision     core.vision.analyze_frame (global + jugadores en paralelo)
+
+La caché de respuestas, el single-flight, la detección de cambios y el
+circuit breaker de NemotronVLVLM se desactivan: se mide el camino que llega
+al servidor en todas las llamadas, y un fallback de NemotronVLVLM se cuenta
+como error.
+
+    python benchmarks/load_test.py
+    python benchmarks/load_test.py --only hud --concurrency 1,8,32 --latency lognormal:80,0.5
+    python benchmarks/load_test.py --url http://127.0.0.1:1234 --requests 50
+"""
+
+from __future__ import annotations
+
+import argparse
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Callable, Dict, List
+
+import cv2
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from harness import RESULTS_DIR, ROOT, print_table, run_meta, write_results  # noqa: E402
+
+import core.vision as vision  # noqa: E402
+from core import vlm_cache  # noqa: E402
+from core.api_gateway import get_gateway  # noqa: E402
+from core.circuit_breaker import CircuitBreaker  # noqa: E402
+from core.hud_reader import HUDReader  # noqa: E402
+from core.metrics import percentile  # noqa: E402
+from core.vlm_nemotron import NemotronVLVLM  # noqa: E402
+
+FRAMES_DIR = ROOT / "data" / "raw_frames"
+TARGETS = ("nemotron", "hud", "vision")
+
+
+def _make_targets(url: str, model: str, frame_paths: List[Path]) -> Dict[str, Callable[[int], Any]]:
+    frames_bgr = [cv2.imread(str(p), cv2.IMREAD_COLOR) for p in frame_paths]
+    frames_rgb = [cv2.cvtColor(f, cv2.COLOR_BGR2RGB) for f in frames_bgr]
+
+    nemotron = NemotronVLVLM(
+        base_url=url,
+        model=model,
+        change_detection=False,
+        response_cache=False,
+        breaker=CircuitBreaker("load", failure_threshold=10**9),
+    )
+    hud = HUDReader(url, model, use_ocr_numbers=False, change_detection=False, response_cache=False)
+    vision.LM_STUDIO_BASE_URL = url
+    vision.MODEL_NAME = model
+
+    n = len(frame_paths)
+
+    def nemotron_call(i: int) -> Any:
+        state, ok = nemotron._state_from_frame(frames_bgr[i % n], 1)
+        if not ok:
+            raise RuntimeError("fallback")
+        return state
+
+    return {
+        "nemotron": nemotron_call,
+        "hud": lambda i: hud.read(frames_rgb[i % n]),
+        "vision": lambda i: vision.analyze_frame(str(frame_paths[i % n])),
+    }
+
+
+def run_load(name: str, fn: Callable[[int], Any], concurrency: int, requests: int) -> Dict[str, Any]:
+    latencies: List[float] = []
+    errors: Dict[str, int] = {}
+    lock = threading.Lock()
+
+    def one(i: int) -> None:
+        t0 = time.perf_counter()
+        try:
+            fn(i)
+        except Exception as e:
+            with lock:
+                key = type(e).__name__
+                errors[key] = errors.get(key, 0) + 1
+            return
+        elapsed = time.perf_counter() - t0
+        with lock:
+            latencies.append(elapsed)
+
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix=f"load-{name}") as pool:
+        list(pool.map(one, range(requests)))
+    wall = time.perf_counter() - t0
+
+    us = [t * 1e6 for t in latencies] or [0.0]
+    mean = sum(latencies) / len(latencies) if latencies else 0.0
+    return {
+        "name": f"load.{name}.c{concurrency}",
+        "group": "load",
+        "samples": len(latencies),
+        "number": 1,
+        "concurrency": concurrency,
+        "mean_us": round(mean * 1e6, 3),
+        "p50_us": round(percentile(us, 50), 3),
+        "p95_us": round(percentile(us, 95), 3),
+        "p99_us": round(percentile(us, 99), 3),
+        "min_us": round(min(us), 3),
+        "ops_per_s": round(len(latencies) / wall, 2) if wall > 0 else None,
+        "items_per_s": round(len(latencies) / wall, 2) if wall > 0 else None,
+        "errors": sum(errors.values()),
+        "error_types": errors,
+        "wall_s": round(wall, 3),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Carga concurrente sobre NemotronVLVLM, HUDReader y core.vision.")
+    parser.add_argument("--url", default="", help="Servidor OpenAI-compatible; vacío = stand-in local.")
+    parser.add_argument("--model", default="standin")
+    parser.add_argument("--only", default="", help=f"Objetivos separados por comas: {','.join(TARGETS)}")
+    parser.add_argument("--concurrency", default="1,4,16", help="Niveles de concurrencia, p.ej. 1,4,16")
+    parser.add_argument("--requests", type=int, default=64, help="Llamadas por objetivo y nivel.")
+    parser.add_argument("--latency", default="lognormal:60,0.4", help="Distribución del stand-in.")
+    parser.add_argument("--ms-per-mb", type=float, default=30.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--gateway-concurrency", type=int, default=64, help="Peticiones simultáneas del gateway.")
+    parser.add_argument("--out", default=str(RESULTS_DIR / "load.json"))
+    args = parser.parse_args()
+
+    frame_paths = sorted(FRAMES_DIR.glob("*.png"))
+    if not frame_paths:
+        raise SystemExit(f"No hay frames en {FRAMES_DIR}")
+    targets = [t for t in (args.only.split(",") if args.only else TARGETS) if t]
+    unknown = set(targets) - set(TARGETS)
+    if unknown:
+        raise SystemExit(f"Objetivos desconocidos: {sorted(unknown)}")
+    levels = [int(c) for c in args.concurrency.split(",") if c.strip()]
+
+    url = args.url
+    server = None
+    if not url:
+        from tools.vlm_standin_server import serve_in_thread
+
+        server, url = serve_in_thread(
+            latency=args.latency,
+            ms_per_mb=args.ms_per_mb,
+            error_rate=args.error_rate,
+            seed=args.seed,
+            model=args.model,
+        )
+        print(f"[load] Stand-in en {url} (latencia {args.latency}, errores {args.error_rate:.0%})")
+
+    # El gateway se comparte por URL: se crea aquí para que el límite de
+    # concurrencia por defecto (GATEWAY_MAX_CONCURRENCY) no tape la carga.
+    pool = max(levels) * 2
+    get_gateway(url, max_concurrency=args.gateway_concurrency, pool_size=pool)
+    vlm_cache._CACHE = vlm_cache.VLMResponseCache(path=None, enabled=False, single_flight=False)
+
+    fns = _make_targets(url, args.model, frame_paths)
+    results = []
+    try:
+        for name in targets:
+            for c in levels:
+                print(f"[load] {name} concurrencia={c} ...")
+                results.append(run_load(name, fns[name], c, args.requests))
+    finally:
+        if server is not None:
+            server.shutdown()
+
+    meta = run_meta(
+        groups=["load"],
+        url=args.url or "standin",
+        latency=args.latency if not args.url else None,
+        error_rate=args.error_rate if not args.url else None,
+        requests=args.requests,
+    )
+    write_results(results, meta, Path(args.out))
+    print_table(results)
+    print()
+    print(f"  {'objetivo':<24} {'req/s':>8} {'p50':>9} {'p95':>9} {'p99':>9} {'errores':>8}")
+    for r in results:
+        print(
+            f"  {r['name']:<24} {r['ops_per_s'] or 0:>8.1f} {r['p50_us'] / 1000:>7.1f}ms "
+            f"{r['p95_us'] / 1000:>7.1f}ms {r['p99_us'] / 1000:>7.1f}ms {r['errors']:>8}"
+        )
+    print(f"[load] Resultados en {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,291 @@
+# benchmarks/run_benchmarks.py
+"""
+Benchmarks de las rutas calientes, offline y en CPU.
+
+Grupos:
+  state    GameState: construcción, to_vector, to_json/from_json
+  policy   RuleBasedPolicy y LearnedPolicy (policy_model.pt)
+  storage  EpisodeLogger (log_step + end_episode) y KnowledgeBase.add_round
+  hud      HUDLocalReader sobre data/raw_frames, frame a frame y en batch
+           (sin hud_model.pt se mide un checkpoint "tiny" con pesos aleatorios)
+
+Los datos de entrada son fijos (benchmarks/fixtures/ y data/raw_frames) para
+que dos ejecuciones sean comparables. Los resultados se guardan en
+benchmarks/results/latest.json y se añaden a benchmarks/results/history.jsonl.
+
+Uso:
+    python benchmarks/run_benchmarks.py
+    python benchmarks/run_benchmarks.py --only state,policy --quick
+    python benchmarks/compare.py benchmarks/results/base.json benchmarks/results/latest.json
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+import tempfile
+from pathlib import Path
+from typing import Any, Callable, Dict, List
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from harness import (  # noqa: E402
+    FIXTURES_DIR,
+    RESULTS_DIR,
+    ROOT,
+    measure,
+    print_table,
+    run_meta,
+    skipped,
+    write_results,
+)
+
+from core.state import GameState  # noqa: E402
+
+STATES_FIXTURE = FIXTURES_DIR / "game_states.jsonl"
+FRAMES_DIR = ROOT / "data" / "raw_frames"
+
+
+def _load_state_dicts() -> List[Dict[str, Any]]:
+    with STATES_FIXTURE.open("r", encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def bench_state(repeat: int) -> List[Dict[str, Any]]:
+    dicts = _load_state_dicts()
+    states = [GameState.from_dict(d) for d in dicts]
+    raws = [s.to_json() for s in states]
+    n = len(states)
+
+    def construct() -> None:
+        for d in dicts:
+            GameState.from_dict(d)
+
+    def to_vector() -> None:
+        for s in states:
+            s.to_vector()
+
+    def to_json() -> None:
+        for s in states:
+            s.to_json()
+
+    def roundtrip() -> None:
+        for raw in raws:
+            GameState.from_json(raw).to_json()
+
+    return [
+        measure("gamestate.from_dict", "state", construct, repeat=repeat, items=n),
+        measure("gamestate.to_vector", "state", to_vector, repeat=repeat, items=n),
+        measure("gamestate.to_json", "state", to_json, repeat=repeat, items=n),
+        measure("gamestate.json_roundtrip", "state", roundtrip, repeat=repeat, items=n),
+    ]
+
+
+def bench_policy(repeat: int) -> List[Dict[str, Any]]:
+    from core.rule_based_policy import RuleBasedPolicy
+
+    states = [GameState.from_dict(d) for d in _load_state_dicts()]
+    vectors = [s.to_vector() for s in states]
+    n = len(states)
+
+    rule = RuleBasedPolicy()
+
+    def rule_based() -> None:
+        for s in states:
+            rule.choose_action(s)
+
+    results = [measure("policy.rule_based", "policy", rule_based, repeat=repeat, items=n)]
+
+    weights = ROOT / "policy_model.pt"
+    if not weights.exists():
+        results.append(skipped("policy.learned", "policy", f"no existe {weights.name}"))
+        return results
+    try:
+        from core.learned_policy import LearnedPolicy
+    except ImportError as err:
+        results.append(skipped("policy.learned", "policy", str(err)))
+        return results
+
+    learned = LearnedPolicy(str(weights), device="cpu")
+
+    def learned_policy() -> None:
+        for v in vectors:
+            learned.choose_action(v)
+
+    results.append(measure("policy.learned", "policy", learned_policy, repeat=repeat, items=n))
+    return results
+
+
+def bench_storage(repeat: int) -> List[Dict[str, Any]]:
+    from core.experience_logger import EpisodeLogger
+    from core.knowledge import KnowledgeBase
+
+    states = [GameState.from_dict(d) for d in _load_state_dicts()]
+    vectors = [s.to_vector() for s in states]
+    jsons = [s.to_json() for s in states]
+    n = len(states)
+    results: List[Dict[str, Any]] = []
+
+    with tempfile.TemporaryDirectory(prefix="mc_bench_") as tmp:
+        logger = EpisodeLogger(base_dir=str(Path(tmp) / "episodes"))
+
+        def episode() -> None:
+            logger.start_episode()
+            for i, v in enumerate(vectors):
+                logger.log_step(v, "noop", reward=0.1, done=i == n - 1, info={"step": i})
+            path = logger.end_episode({"result": "bench"})
+            path.unlink()
+
+        results.append(measure("episode_logger.episode", "storage", episode, repeat=repeat, items=n))
+
+        kb = KnowledgeBase(db_path=str(Path(tmp) / "bench.db"))
+        match_id = kb.start_match()
+
+        def add_rounds() -> None:
+            for i, raw in enumerate(jsons):
+                kb.add_round(
+                    match_id=match_id,
+                    ronda=i + 1,
+                    fase="early",
+                    game_state_json=raw,
+                    recomendaciones_json="[]",
+                )
+
+        # Cada add_round hace commit: esto mide sobre todo el fsync de SQLite.
+        results.append(
+            measure("knowledge.add_round", "storage", add_rounds, repeat=max(3, repeat // 3), warmup=1, items=n)
+        )
+        kb.conn.close()
+    return results
+
+
+def _random_hud_checkpoint(path: Path) -> Path:
+    """
+    Checkpoint con la arquitectura "tiny" y pesos aleatorios: las lecturas no
+    valen nada, pero el preprocesado y el forward cuestan lo mismo que con
+    un modelo entrenado de esa arquitectura.
+    """
+    import torch
+
+    from models.hud_model import BACKBONES, HUDModel
+    from train_hud_model import NUM_CLASSES
+
+    labels = [f"{stage}-{step}" for stage in range(1, 8) for step in range(1, 8)]
+    round_vocab = {label: i for i, label in enumerate(labels)}
+    torch.manual_seed(0)
+    model = HUDModel(
+        num_round_classes=len(round_vocab),
+        num_level_classes=NUM_CLASSES["level"],
+        num_gold_classes=NUM_CLASSES["gold"],
+        num_hp_classes=NUM_CLASSES["hp_self"],
+        backbone="tiny",
+        pretrained=False,
+    )
+    torch.save(
+        {
+            "model_state_dict": model.state_dict(),
+            "model_type": "frame",
+            "backbone": "tiny",
+            "input_size": list(BACKBONES["tiny"].input_size),
+            "num_classes": NUM_CLASSES,
+            "round_vocab": round_vocab,
+        },
+        path,
+    )
+    return path
+
+
+def bench_hud(repeat: int, weights: Path, batch_size: int) -> List[Dict[str, Any]]:
+    try:
+        import cv2
+
+        from core.hud_local_reader import HUDLocalReader
+    except ImportError as err:
+        return [skipped("hud", "hud", str(err))]
+
+    frames = [cv2.imread(str(p), cv2.IMREAD_COLOR) for p in sorted(FRAMES_DIR.glob("*.png"))]
+    frames = [f for f in frames if f is not None]
+    if not frames:
+        return [skipped("hud", "hud", f"no hay frames en {FRAMES_DIR}")]
+
+    weights_note = weights.name
+    tmp_dir = None
+    if not weights.exists():
+        tmp_dir = tempfile.TemporaryDirectory()
+        weights = _random_hud_checkpoint(Path(tmp_dir.name) / "hud_tiny_random.pt")
+        weights_note = "tiny aleatorio (no existe hud_model.pt)"
+        print(f"[bench] hud: {weights_note}")
+
+    # Sin caché por ROI: se mide el forward real en cada frame.
+    reader = HUDLocalReader(str(weights), device="cpu", change_detection=False)
+    if tmp_dir is not None:
+        tmp_dir.cleanup()
+    n = len(frames)
+    hud_repeat = max(3, repeat // 5)
+
+    def single() -> None:
+        for f in frames:
+            reader.predict_from_array(f)
+
+    batch = [frames[i % n] for i in range(batch_size)]
+
+    def batched() -> None:
+        reader.predict_batch(batch, batch_size=batch_size)
+
+    return [
+        measure("hud.single", "hud", single, repeat=hud_repeat, warmup=1, items=n, extra={"weights": weights_note}),
+        measure(
+            "hud.batched",
+            "hud",
+            batched,
+            repeat=hud_repeat,
+            warmup=1,
+            items=batch_size,
+            extra={"batch_size": batch_size, "weights": weights_note},
+        ),
+    ]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmarks de rutas calientes (CPU, offline).")
+    parser.add_argument("--only", default="", help="Grupos separados por comas: state,policy,storage,hud")
+    parser.add_argument("--quick", action="store_true", help="Menos repeticiones (smoke test).")
+    parser.add_argument("--hud-weights", default=str(ROOT / "hud_model.pt"))
+    parser.add_argument("--batch-size", type=int, default=8)
+    parser.add_argument("--threads", type=int, default=None, help="torch.set_num_threads")
+    parser.add_argument("--out", default=str(RESULTS_DIR / "latest.json"))
+    parser.add_argument("--no-history", action="store_true", help="No añadir a history.jsonl")
+    args = parser.parse_args()
+
+    if args.threads:
+        import torch
+
+        torch.set_num_threads(args.threads)
+
+    repeat = 5 if args.quick else 30
+    groups: Dict[str, Callable[[], List[Dict[str, Any]]]] = {
+        "state": lambda: bench_state(repeat),
+        "policy": lambda: bench_policy(repeat),
+        "storage": lambda: bench_storage(repeat),
+        "hud": lambda: bench_hud(repeat, Path(args.hud_weights), args.batch_size),
+    }
+    selected = [g.strip() for g in args.only.split(",") if g.strip()] or list(groups)
+    unknown = [g for g in selected if g not in groups]
+    if unknown:
+        raise SystemExit(f"Grupos desconocidos: {unknown}. Disponibles: {list(groups)}")
+
+    results: List[Dict[str, Any]] = []
+    for name in selected:
+        print(f"[bench] {name} ...")
+        results.extend(groups[name]())
+
+    meta = run_meta(groups=selected, quick=args.quick)
+    history = None if args.no_history else RESULTS_DIR / "history.jsonl"
+    write_results(results, meta, Path(args.out), history)
+    print_table(results)
+    print(f"[bench] Resultados en {args.out}")
+
+
+if __name__ == "__main__":
+    main()
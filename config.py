@@ -8,8 +8,103 @@ VLM_API_BASE_URL = "http://localhost:1234"
 VLM_API_MODEL = "qwen2-vl-7b-instruct"
 VLM_API_KEY = ""  # en local no se usa
 
+# API de OpenAI (teacher de etiquetas / politica). La key sale de OPENAI_API_KEY.
+OPENAI_API_BASE_URL = "https://api.openai.com"
+
+# Gateway HTTP compartido (core/api_gateway.py): una sesion keep-alive por servidor.
+GATEWAY_MAX_CONCURRENCY = 4   # peticiones simultaneas por servidor
+GATEWAY_RATE_PER_S = 0.0      # 0 = sin limite de peticiones/s
+GATEWAY_BURST = 4
+GATEWAY_POOL_SIZE = 8         # conexiones keep-alive
+GATEWAY_TIMEOUT = 60.0
+
 # Titulo de la ventana del juego (ajustalo si es distinto)
 GAME_WINDOW_TITLE = "MagicChessGoGo"
 CAPTURE_FPS = 5
+# Fuente de frames: "window", "dir:data/raw_frames", "video:ruta.mp4", "synthetic".
+# Las fuentes de replay permiten correr los loops sin el juego (Linux/CI).
+FRAME_SOURCE = "window"
+# Entregar frames sin esperar a CAPTURE_FPS (benchmark de throughput offline).
+FRAME_SOURCE_MAX_SPEED = False
+# Guardar los frames capturados en data/raw_frames/ (solo para dataset; la
+# inferencia trabaja sobre el frame en memoria). Se escriben en segundo plano
+# como cap_*.{png,jpg,webp}; la cuota borra los cap_* mas antiguos.
+SAVE_RAW_FRAMES = True
+FRAME_ARCHIVE_CODEC = "png"       # png | jpeg | webp
+FRAME_ARCHIVE_QUALITY = 90        # jpeg/webp
+FRAME_ARCHIVE_PNG_LEVEL = 3       # 0-9
+FRAME_ARCHIVE_SAMPLE_EVERY = 1    # guardar 1 de cada N frames
+FRAME_ARCHIVE_MAX_MB = 2048
 
 DB_PATH = "magic_chess.db"
+
+# Latencias por etapa (core/metrics.py). Desactivado = coste despreciable.
+METRICS_ENABLED = False
+METRICS_PATH = "data/metrics.jsonl"
+METRICS_DUMP_SECONDS = 30.0
+METRICS_WINDOW = 1000   # muestras recientes por histograma
+
+# Loop en tiempo real por etapas (captura -> HUD -> politica -> log en hilos).
+REALTIME_PIPELINED = False
+PIPELINE_FRAME_QUEUE = 2      # frames en espera antes de descartar el mas viejo
+PIPELINE_RESULT_QUEUE = 64    # transiciones pendientes de loguear
+PIPELINE_REPORT_SECONDS = 5.0
+
+# Imagenes enviadas a los VLM (core/payload.py). Por defecto sin perdida;
+# benchmarks/bench_payload.py compara bytes/latencia de otras opciones.
+VLM_PAYLOAD_MAX_SIDE = 0          # 0 = resolucion original; p.ej. 1280
+VLM_PAYLOAD_CODEC = "png"         # png | jpeg | webp
+VLM_PAYLOAD_QUALITY = 85          # jpeg / webp
+VLM_PAYLOAD_PNG_LEVEL = 1         # mismo resultado que 9, mucho mas rapido
+VLM_PAYLOAD_ROI_COMPOSITE = False # solo las regiones del HUD en un mosaico
+
+# Respuestas del VLM en streaming (core/json_stream.py): se corta en cuanto
+# el JSON esta completo. Deadline 0 = esperar hasta el cierre del objeto.
+VLM_STREAMING = False
+VLM_STREAM_DEADLINE_S = 0.0
+
+# Cascada del HUD (core/hud_cascade.py): modelo local primero y VLM solo en
+# los campos cuya confianza calibrada quede por debajo del umbral.
+HUD_CASCADE_ENABLED = False
+HUD_CASCADE_THRESHOLDS = {"round": 0.85, "level": 0.85, "gold": 0.80, "hp_self": 0.80}
+HUD_CASCADE_VLM_CONFIDENCE = 0.9  # confianza asignada a un campo leido por el VLM
+HUD_CASCADE_DIGIT_CONFIDENCE = 0.85  # idem, leido con las plantillas de digitos (antes del VLM)
+VLM_READ_CONFIDENCE = 0.9         # NemotronVLVLM con todos los campos presentes
+
+# Pesos del modelo HUD local (HUDLocalReader): el checkpoint de
+# train_hud_model.py (.pt) o un artefacto de tools/export_hud_model.py
+# (.ts TorchScript / .onnx, p.ej. "hud_model.static.ts" int8), que se cargan
+# sin torchvision.
+HUD_MODEL_WEIGHTS = "hud_model.pt"
+
+# Lectura del HUD por lotes (HUDLocalReader.predict_batch y
+# tools/hud_bulk_predict.py): imagenes por forward e hilos/procesos de decodificado.
+HUD_PREDICT_BATCH_SIZE = 32
+HUD_PREDICT_WORKERS = 4
+
+# Reconocedor de digitos del HUD por plantillas (core/digit_ocr.py). Se
+# construye con tools/build_digit_templates.py; si el archivo no existe,
+# HUDReader vuelve a pytesseract.
+HUD_DIGIT_TEMPLATES = "hud_digits.npz"
+HUD_DIGIT_MIN_SCORE = 0.6         # correlacion minima por glifo
+
+# Presupuesto por llamada y circuit breaker de NemotronVLVLM
+# (core/circuit_breaker.py). Con el circuito abierto o si la llamada falla
+# se reutiliza el ultimo GameState bueno con la confianza multiplicada por
+# VLM_FALLBACK_CONFIDENCE_FACTOR.
+VLM_CALL_BUDGET_S = 8.0           # timeout de cada peticion (antes 60 s)
+VLM_BREAKER_FAILURES = 3          # fallos seguidos que abren el circuito
+VLM_BREAKER_SLOW_S = 6.0          # respuesta mas lenta que esto = fallo (0 = no)
+VLM_BREAKER_RESET_S = 15.0        # segundos abierto antes de probar otra vez
+VLM_FALLBACK_CONFIDENCE_FACTOR = 0.5
+
+# Cache de respuestas del VLM por hash de las imagenes (core/vlm_cache.py)
+VLM_CACHE_ENABLED = True
+VLM_CACHE_PATH = "data/vlm_cache.sqlite"
+VLM_CACHE_MEMORY_ITEMS = 512
+VLM_CACHE_MAX_DISK_ITEMS = 50000
+VLM_CACHE_TTL_S = 7 * 24 * 3600   # 0 = sin caducidad
+VLM_CACHE_HASH_SIZE = 16          # rejilla 16x16 del dHash
+VLM_CACHE_PERCEPTUAL_MAX_PIXELS = 32000  # recortes hasta este area: dHash; mayores: hash exacto
+VLM_CACHE_MAX_DISTANCE = 0        # bits tolerados por recorte perceptual (0 = solo exacto)
+VLM_SINGLE_FLIGHT = True          # peticiones identicas en vuelo esperan a la primera
@@ -0,0 +1,311 @@
+# core/api_gateway.py
+"""
+Gateway HTTP compartido para todas las llamadas a APIs estilo OpenAI
+(LM Studio, NIM, OpenAI).
+
+Antes cada llamador creaba su propio cliente (un OpenAI(...) por llamada en
+core.vision, requests.post sin sesión en NemotronVLVLM...), así que cada
+petición abría una conexión TCP/TLS nueva. Aquí hay un único
+requests.Session por servidor con:
+
+  - pool de conexiones keep-alive (HTTPAdapter),
+  - token bucket para limitar peticiones por segundo,
+  - semáforo para acotar peticiones concurrentes,
+  - latencia y errores por endpoint (stats() y core.metrics).
+
+    from core.api_gateway import get_gateway, message_text
+
+    gw = get_gateway("http://localhost:1234")
+    resp = gw.chat(model="qwen2-vl-7b-instruct", messages=[...])
+    text = message_text(resp)
+
+chat_stream() da la respuesta en streaming (SSE); core/json_stream.py la usa
+para cortar en cuanto llega el JSON pedido.
+
+La base_url se acepta con o sin sufijo /v1.
+"""
+
+from __future__ import annotations
+
+import json
+import threading
+import time
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from config import (
+    GATEWAY_BURST,
+    GATEWAY_MAX_CONCURRENCY,
+    GATEWAY_POOL_SIZE,
+    GATEWAY_RATE_PER_S,
+    GATEWAY_TIMEOUT,
+)
+from core.metrics import METRICS, RollingHistogram
+
+
+class TokenBucket:
+    """Limitador de tasa: `rate` tokens/s con ráfagas de hasta `burst`."""
+
+    def __init__(self, rate: float, burst: int = 1) -> None:
+        self.rate = float(rate)
+        self.capacity = float(max(1, burst))
+        self._tokens = self.capacity
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> float:
+        """Bloquea hasta obtener un token. Devuelve los segundos esperados."""
+        if self.rate <= 0:
+            return 0.0
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._last) * self.rate)
+                self._last = now
+                if self._tokens >= 1.0:
+                    self._tokens -= 1.0
+                    return waited
+                wait = (1.0 - self._tokens) / self.rate
+            time.sleep(wait)
+            waited += wait
+
+
+class EndpointStats:
+    def __init__(self) -> None:
+        self.requests = 0
+        self.errors = 0
+        self.throttled_s = 0.0
+        self.latency = RollingHistogram(window=500)
+
+    def summary(self) -> Dict[str, Any]:
+        out: Dict[str, Any] = {
+            "requests": self.requests,
+            "errors": self.errors,
+            "throttled_s": round(self.throttled_s, 3),
+        }
+        out.update(self.latency.summary())
+        return out
+
+
+def normalize_base_url(base_url: str) -> str:
+    """'http://host:1234/v1/' -> 'http://host:1234'."""
+    url = base_url.rstrip("/")
+    if url.endswith("/v1"):
+        url = url[: -len("/v1")]
+    return url
+
+
+def message_text(resp: Dict[str, Any]) -> str:
+    """Texto de choices[0].message.content (str o lista de bloques)."""
+    try:
+        content = resp["choices"][0]["message"].get("content")
+    except (KeyError, IndexError, TypeError, AttributeError):
+        return ""
+    if content is None:
+        return ""
+    if isinstance(content, list):
+        parts = []
+        for item in content:
+            if isinstance(item, dict) and item.get("text"):
+                parts.append(str(item["text"]))
+            elif isinstance(item, str):
+                parts.append(item)
+        return "".join(parts)
+    return str(content)
+
+
+class APIGateway:
+    def __init__(
+        self,
+        base_url: str,
+        api_key: str = "",
+        max_concurrency: int = GATEWAY_MAX_CONCURRENCY,
+        rate_per_s: float = GATEWAY_RATE_PER_S,
+        burst: int = GATEWAY_BURST,
+        pool_size: int = GATEWAY_POOL_SIZE,
+        timeout: float = GATEWAY_TIMEOUT,
+    ) -> None:
+        """
+        max_concurrency: peticiones simultáneas como máximo (el resto espera).
+        rate_per_s: peticiones por segundo (0 = sin límite); burst = ráfaga.
+        pool_size: conexiones keep-alive que se mantienen abiertas.
+        """
+        self.base_url = normalize_base_url(base_url)
+        self.api_key = api_key
+        self.timeout = timeout
+        self.host = urlparse(self.base_url).netloc or self.base_url
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max(1, pool_size))
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.session.headers.update({"Content-Type": "application/json", "Accept": "application/json"})
+        if api_key:
+            self.session.headers["Authorization"] = f"Bearer {api_key}"
+
+        self._semaphore = threading.BoundedSemaphore(max(1, max_concurrency))
+        self._bucket = TokenBucket(rate_per_s, burst)
+        self._stats: Dict[str, EndpointStats] = {}
+        self._lock = threading.Lock()
+
+    def _endpoint(self, path: str) -> EndpointStats:
+        with self._lock:
+            stats = self._stats.get(path)
+            if stats is None:
+                stats = self._stats[path] = EndpointStats()
+            return stats
+
+    def post_json(self, path: str, payload: Dict[str, Any], timeout: Optional[float] = None) -> Dict[str, Any]:
+        """POST JSON a base_url + path. Lanza requests.HTTPError si el status no es 2xx."""
+        stats = self._endpoint(path)
+        waited = self._bucket.acquire()
+        with self._semaphore:
+            t0 = time.perf_counter()
+            try:
+                resp = self.session.post(
+                    self.base_url + path,
+                    json=payload,
+                    timeout=timeout or self.timeout,
+                )
+                resp.raise_for_status()
+                data = resp.json()
+            except Exception:
+                with self._lock:
+                    stats.requests += 1
+                    stats.errors += 1
+                    stats.throttled_s += waited
+                raise
+            finally:
+                elapsed = time.perf_counter() - t0
+                METRICS.observe(f"gateway.{self.host}{path}", elapsed)
+        with self._lock:
+            stats.requests += 1
+            stats.throttled_s += waited
+            stats.latency.add(elapsed)
+        return data
+
+    def chat(
+        self,
+        model: str,
+        messages: List[Dict[str, Any]],
+        temperature: float = 0.0,
+        max_tokens: Optional[int] = None,
+        timeout: Optional[float] = None,
+        **extra: Any,
+    ) -> Dict[str, Any]:
+        """POST /v1/chat/completions. Devuelve el JSON de respuesta tal cual."""
+        payload: Dict[str, Any] = {"model": model, "messages": messages, "temperature": temperature}
+        if max_tokens is not None:
+            payload["max_tokens"] = max_tokens
+        payload.update(extra)
+        return self.post_json("/v1/chat/completions", payload, timeout=timeout)
+
+    def chat_stream(
+        self,
+        model: str,
+        messages: List[Dict[str, Any]],
+        temperature: float = 0.0,
+        max_tokens: Optional[int] = None,
+        timeout: Optional[float] = None,
+        **extra: Any,
+    ) -> Iterator[str]:
+        """
+        POST /v1/chat/completions con stream=true. Genera los trozos de texto
+        (choices[0].delta.content) según llegan. Si el llamador deja de
+        iterar y cierra el generador, se cierra la conexión y el servidor
+        deja de generar. La latencia registrada es la de la respuesta
+        completa o hasta el corte.
+        """
+        path = "/v1/chat/completions"
+        payload: Dict[str, Any] = {
+            "model": model,
+            "messages": messages,
+            "temperature": temperature,
+            "stream": True,
+        }
+        if max_tokens is not None:
+            payload["max_tokens"] = max_tokens
+        payload.update(extra)
+
+        stats = self._endpoint(path)
+        waited = self._bucket.acquire()
+        with self._semaphore:
+            t0 = time.perf_counter()
+            resp = None
+            failed = False
+            try:
+                resp = self.session.post(
+                    self.base_url + path,
+                    json=payload,
+                    timeout=timeout or self.timeout,
+                    stream=True,
+                    headers={"Accept": "text/event-stream"},
+                )
+                resp.raise_for_status()
+                for line in resp.iter_lines(decode_unicode=False):
+                    if not line or not line.startswith(b"data:"):
+                        continue
+                    data = line[5:].strip()
+                    if data == b"[DONE]":
+                        break
+                    chunk = json.loads(data)
+                    try:
+                        delta = chunk["choices"][0].get("delta") or {}
+                    except (KeyError, IndexError, TypeError, AttributeError):
+                        continue
+                    text = delta.get("content")
+                    if text:
+                        yield text
+            except Exception:
+                failed = True
+                raise
+            finally:
+                if resp is not None:
+                    resp.close()
+                elapsed = time.perf_counter() - t0
+                METRICS.observe(f"gateway.{self.host}{path}.stream", elapsed)
+                with self._lock:
+                    stats.requests += 1
+                    stats.throttled_s += waited
+                    if failed:
+                        stats.errors += 1
+                    else:
+                        stats.latency.add(elapsed)
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            return {f"{self.host}{path}": s.summary() for path, s in self._stats.items()}
+
+    def close(self) -> None:
+        self.session.close()
+
+
+_GATEWAYS: Dict[Tuple[str, str], APIGateway] = {}
+_GATEWAYS_LOCK = threading.Lock()
+
+
+def get_gateway(base_url: str, api_key: str = "", **kwargs: Any) -> APIGateway:
+    """
+    Gateway compartido por (base_url, api_key). Los kwargs solo se usan la
+    primera vez que se crea.
+    """
+    key = (normalize_base_url(base_url), api_key or "")
+    with _GATEWAYS_LOCK:
+        gw = _GATEWAYS.get(key)
+        if gw is None:
+            gw = _GATEWAYS[key] = APIGateway(base_url, api_key=api_key, **kwargs)
+        return gw
+
+
+def all_stats() -> Dict[str, Dict[str, Any]]:
+    """Stats de todos los gateways creados en el proceso."""
+    with _GATEWAYS_LOCK:
+        gateways = list(_GATEWAYS.values())
+    out: Dict[str, Dict[str, Any]] = {}
+    for gw in gateways:
+        out.update(gw.stats())
+    return out
@@ -1,13 +1,20 @@
 # core/capture.py
-import time
 from typing import Optional
 
-import mss
-import mss.tools
 import numpy as np
-import win32gui
 
 from config import CAPTURE_FPS, GAME_WINDOW_TITLE
+from core.frame_source import FrameSource
+
+# win32gui/mss solo existen en Windows; en Linux se usan las fuentes de replay
+# de core/frame_source.py.
+try:
+    import mss
+    import mss.tools
+    import win32gui
+except ImportError:
+    mss = None
+    win32gui = None
 
 
 def _get_window_rect(title: str) -> Optional[tuple]:
@@ -18,10 +25,20 @@ def _get_window_rect(title: str) -> Optional[tuple]:
     return rect  # (left, top, right, bottom)
 
 
-class WindowCapture:
-    def __init__(self, window_title: str = GAME_WINDOW_TITLE, fps: int = CAPTURE_FPS):
+class WindowCapture(FrameSource):
+    def __init__(
+        self,
+        window_title: str = GAME_WINDOW_TITLE,
+        fps: int = CAPTURE_FPS,
+        max_speed: bool = False,
+    ):
+        if mss is None or win32gui is None:
+            raise RuntimeError(
+                "WindowCapture necesita win32gui y mss (solo Windows). "
+                "Usa una fuente de replay: FRAME_SOURCE='dir:data/raw_frames'."
+            )
+        super().__init__(fps=fps, max_speed=max_speed)
         self.window_title = window_title
-        self.fps = fps
         self.sct = mss.mss()
 
     def capture_once(self) -> Optional[np.ndarray]:
@@ -33,11 +50,8 @@ class WindowCapture:
         monitor = {"left": left, "top": top, "width": right - left, "height": bottom - top}
         img = self.sct.grab(monitor)
         frame = np.array(img)[:, :, :3]  # BGR
+        self.frames_read += 1
         return frame
 
-    def capture_loop(self):
-        delay = 1.0 / self.fps
-        while True:
-            frame = self.capture_once()
-            yield frame
-            time.sleep(delay)
+    def close(self) -> None:
+        self.sct.close()
@@ -0,0 +1,132 @@
+# core/circuit_breaker.py
+"""
+Circuit breaker para los backends VLM.
+
+Si el servidor local se cuelga o empieza a devolver basura, cada frame
+pagaría el timeout completo. El breaker cuenta fallos consecutivos
+(excepciones, JSON inválido y respuestas más lentas que `slow_call_s`) y,
+al llegar a `failure_threshold`, se abre: durante `reset_timeout_s` las
+llamadas se rechazan al instante y el llamador usa su fallback. Pasado ese
+tiempo deja pasar una sola llamada de prueba (half-open); si va bien se
+cierra, si falla vuelve a abrirse.
+
+    breaker = CircuitBreaker("vlm")
+    if not breaker.allow():
+        return fallback()
+    t0 = time.perf_counter()
+    try:
+        result = call()
+    except Exception:
+        breaker.record_failure()
+        return fallback()
+    breaker.record_success(time.perf_counter() - t0)
+
+Estado y contadores van a core.metrics como breaker.<nombre>.*.
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+from typing import Any, Dict
+
+from core.metrics import METRICS
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+_STATE_GAUGE = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+
+class CircuitBreaker:
+    def __init__(
+        self,
+        name: str,
+        failure_threshold: int = 3,
+        slow_call_s: float = 0.0,
+        reset_timeout_s: float = 15.0,
+    ) -> None:
+        """
+        failure_threshold: fallos seguidos que abren el circuito.
+        slow_call_s: una llamada correcta más lenta que esto cuenta como
+            fallo (0 = no se mira la latencia).
+        reset_timeout_s: segundos abierto antes de probar de nuevo.
+        """
+        self.name = name
+        self.failure_threshold = max(1, failure_threshold)
+        self.slow_call_s = slow_call_s
+        self.reset_timeout_s = reset_timeout_s
+        self.state = CLOSED
+        self._consecutive = 0
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self._lock = threading.Lock()
+
+        self.successes = 0
+        self.failures = 0
+        self.slow_calls = 0
+        self.rejected = 0
+        self.trips = 0
+
+    def _set_state(self, state: str) -> None:
+        self.state = state
+        METRICS.set_gauge(f"breaker.{self.name}.state", _STATE_GAUGE[state])
+
+    def allow(self) -> bool:
+        """True si se puede llamar al backend ahora."""
+        with self._lock:
+            if self.state == OPEN and time.monotonic() - self._opened_at >= self.reset_timeout_s:
+                self._set_state(HALF_OPEN)
+                self._probe_in_flight = False
+            if self.state == CLOSED:
+                return True
+            if self.state == HALF_OPEN and not self._probe_in_flight:
+                self._probe_in_flight = True
+                return True
+            self.rejected += 1
+        METRICS.incr(f"breaker.{self.name}.rejected")
+        return False
+
+    def record_success(self, latency_s: float = 0.0) -> None:
+        if self.slow_call_s > 0 and latency_s > self.slow_call_s:
+            with self._lock:
+                self.slow_calls += 1
+            METRICS.incr(f"breaker.{self.name}.slow")
+            self.record_failure()
+            return
+        with self._lock:
+            self.successes += 1
+            self._consecutive = 0
+            self._probe_in_flight = False
+            if self.state != CLOSED:
+                self._set_state(CLOSED)
+
+    def record_failure(self) -> None:
+        tripped = False
+        with self._lock:
+            self.failures += 1
+            self._consecutive += 1
+            self._probe_in_flight = False
+            if self.state == HALF_OPEN or (
+                self.state == CLOSED and self._consecutive >= self.failure_threshold
+            ):
+                self._opened_at = time.monotonic()
+                self.trips += 1
+                self._set_state(OPEN)
+                tripped = True
+        METRICS.incr(f"breaker.{self.name}.failures")
+        if tripped:
+            METRICS.incr(f"breaker.{self.name}.trips")
+            print(f"[breaker] {self.name} abierto durante {self.reset_timeout_s:.0f}s tras {self._consecutive} fallos")
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "state": self.state,
+                "successes": self.successes,
+                "failures": self.failures,
+                "slow_calls": self.slow_calls,
+                "rejected": self.rejected,
+                "trips": self.trips,
+            }
@@ -0,0 +1,416 @@
+# core/digit_ocr.py
+"""
+Reconocedor de dígitos para la fuente del HUD, sin Tesseract.
+
+pytesseract lanza un proceso por recorte (decenas de ms cada uno). Aquí el
+texto del HUD (oro, nivel, ronda "2-3") se lee en tres pasos, todo en NumPy:
+
+  1. binarizado: gris, invertido si el fondo es claro, umbral fijo
+     (el mismo preprocesado que usaba HUDReader._ocr_digits), quitando la
+     tinta pegada al borde del recorte (marcos, el contorno del orbe);
+  2. segmentación por proyección de columnas: cada tramo de columnas con
+     tinta es un glifo; los tramos demasiado anchos (glifos pegados) se
+     parten por el guion y según la proporción típica de un dígito;
+  3. clasificación por correlación normalizada contra plantillas: todos los
+     glifos del recorte se comparan con todas las plantillas en una sola
+     multiplicación de matrices.
+
+Las plantillas se construyen con tools/build_digit_templates.py a partir de
+data/labels.jsonl + data/raw_frames y se guardan en un .npz:
+
+    rec = DigitRecognizer.load("hud_digits.npz")
+    rec.read_int(gold_crop)      # -> 27 | None
+    rec.read_round(round_crop)   # -> "2-3" | None   (en pantalla "II-3")
+
+benchmarks/bench_digit_ocr.py compara precisión y tiempo con Tesseract.
+"""
+
+from __future__ import annotations
+
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+CHARSET = "0123456789-IV"   # la fase de la ronda va en números romanos: "III-4"
+JUNK = "?"                  # glifos que no son texto (el "Lv" del nivel...)
+ROMAN = {1: "I", 2: "II", 3: "III", 4: "IV", 5: "V", 6: "VI", 7: "VII", 8: "VIII", 9: "IX"}
+GLYPH_SHAPE = (20, 14)      # alto, ancho de la plantilla normalizada
+DIGIT_ASPECT = 0.7          # ancho / alto típico de un dígito del HUD
+
+Box = Tuple[int, int, int, int]  # x0, x1, y0, y1 (x1/y1 exclusivos)
+
+
+def round_to_glyphs(label: str) -> str:
+    """"3-4" (etiqueta) -> "III-4" (lo que se ve en la barra superior)."""
+    stage, sep, rest = str(label).partition("-")
+    if sep and stage.isdigit() and int(stage) in ROMAN:
+        return ROMAN[int(stage)] + sep + rest
+    return str(label)
+
+
+def glyphs_to_round(text: str) -> Optional[str]:
+    """"III-4" -> "3-4"; None si no tiene forma de ronda."""
+    stage, sep, rest = text.partition("-")
+    by_roman = {v: k for k, v in ROMAN.items()}
+    if not sep or not rest.isdigit() or stage not in by_roman:
+        return None
+    return f"{by_roman[stage]}-{rest}"
+
+
+def to_gray(crop: Any) -> np.ndarray:
+    """Array RGB/gris o PIL.Image -> gris float32 (luminancia RGB)."""
+    arr = np.asarray(crop)
+    if arr.ndim == 3:
+        arr = arr[:, :, :3].astype(np.float32) @ np.array([0.299, 0.587, 0.114], np.float32)
+    return arr.astype(np.float32, copy=False)
+
+
+def binarize(crop: Any, threshold: int = 120) -> np.ndarray:
+    """Máscara booleana de tinta (texto claro sobre fondo oscuro)."""
+    gray = to_gray(crop)
+    if gray.size and gray.mean() > 128:
+        gray = 255.0 - gray
+    return gray > threshold
+
+
+def _run_starts(major: np.ndarray, minor: np.ndarray) -> np.ndarray:
+    """Píxeles ordenados por (major, minor): True donde empieza un tramo nuevo."""
+    new = np.ones(len(major), bool)
+    new[1:] = (major[1:] != major[:-1]) | (minor[1:] != minor[:-1] + 1)
+    return new
+
+
+def clear_border(mask: np.ndarray, max_iter: int = 32) -> np.ndarray:
+    """
+    Quita la tinta conectada al borde del recorte (marco de la barra,
+    contorno del orbe...). Reconstrucción geodésica sobre los píxeles de
+    tinta, alternando tramos horizontales y verticales: cada pasada marca
+    tramos enteros, así que converge en pocas iteraciones en lugar de
+    avanzar píxel a píxel.
+    """
+    h, w = mask.shape
+    flat = np.flatnonzero(mask)                     # orden fila-columna
+    if len(flat) == 0:
+        return mask
+    ys, xs = np.divmod(flat, w)
+    border = (ys == 0) | (ys == h - 1) | (xs == 0) | (xs == w - 1)
+    if not border.any():
+        return mask
+
+    row_id = np.cumsum(_run_starts(ys, xs)) - 1
+    # Mismos píxeles en orden columna-fila, para los tramos verticales.
+    pos = np.empty(mask.size, np.int32)
+    pos[flat] = np.arange(len(flat), dtype=np.int32)
+    cx, cy = np.divmod(np.flatnonzero(np.ascontiguousarray(mask.T)), h)
+    col_starts = _run_starts(cx, cy)
+    col_id = np.empty(len(flat), np.int64)
+    col_id[pos[cy * w + cx]] = np.cumsum(col_starts) - 1
+    n_runs = (int(row_id[-1]) + 1, int(col_starts.sum()))
+
+    reached = border
+    count = int(reached.sum())
+    for _ in range(max_iter):
+        for ids, n in zip((row_id, col_id), n_runs):
+            hit = np.zeros(n, bool)
+            hit[ids[reached]] = True
+            reached = hit[ids]
+        new_count = int(reached.sum())
+        if new_count == count:
+            break
+        count = new_count
+    out = mask.copy()
+    out.ravel()[flat[reached]] = False
+    return out
+
+
+def _runs(flags: np.ndarray) -> np.ndarray:
+    """Tramos [inicio, fin) de True en un vector booleano, como array (n, 2)."""
+    padded = np.concatenate(([0], flags.astype(np.int8), [0]))
+    edges = np.flatnonzero(np.diff(padded))
+    return edges.reshape(-1, 2)
+
+
+def _box(mask: np.ndarray, x0: int, x1: int) -> Optional[Box]:
+    rows = np.flatnonzero(mask[:, x0:x1].any(axis=1))
+    if len(rows) == 0:
+        return None
+    return int(x0), int(x1), int(rows[0]), int(rows[-1]) + 1
+
+
+def _split_wide(mask: np.ndarray, box: Box, line_top: int, line_h: int) -> List[Box]:
+    """
+    Parte un tramo con varios glifos pegados. Primero separa los guiones
+    (columnas con tinta solo en la franja central de la línea, como en
+    "3-4" de la ronda) y luego reparte el resto según DIGIT_ASPECT.
+    """
+    x0, x1, _, _ = box
+    cols = mask[:, x0:x1]
+    # El guion queda algo por debajo del centro de la línea.
+    band_lo, band_hi = line_top + int(0.3 * line_h), line_top + int(np.ceil(0.85 * line_h))
+    outside = cols[:band_lo].any(axis=0) | cols[band_hi:].any(axis=0)
+    dash_cols = cols.any(axis=0) & ~outside
+    pieces: List[Tuple[int, int, bool]] = []
+    cursor = x0
+    for a, b in _runs(dash_cols):
+        if b - a < 0.3 * line_h:
+            continue
+        if x0 + a > cursor:
+            pieces.append((cursor, x0 + a, False))
+        pieces.append((x0 + a, x0 + b, True))
+        cursor = x0 + b
+    if cursor < x1:
+        pieces.append((cursor, x1, False))
+
+    boxes: List[Box] = []
+    for a, b, is_dash in pieces:
+        n = 1 if is_dash else max(1, int(round((b - a) / (DIGIT_ASPECT * line_h))))
+        cuts = np.linspace(a, b, n + 1).round().astype(int)
+        for c0, c1 in zip(cuts[:-1], cuts[1:]):
+            sub = _box(mask, c0, c1)
+            if sub is not None:
+                boxes.append(sub)
+    return boxes
+
+
+def segment(mask: np.ndarray, min_pixels: int = 4, min_fill: float = 0.2) -> List[Box]:
+    """
+    Cajas de glifo de izquierda a derecha sobre una máscara ya pasada por
+    clear_border. Descarta ruido (pocos píxeles, trazos finos como el aro de la moneda,
+    manchas bajas fuera de la línea), conserva guiones (bajos y anchos, a
+    media altura) y parte tramos anchos en tantos glifos como quepan.
+    """
+    if mask.size == 0:
+        return []
+    # Estadísticas de todos los tramos de columnas a la vez.
+    h = mask.shape[0]
+    col_ink = mask.sum(axis=0)
+    runs = _runs(col_ink > 0)
+    if len(runs) == 0:
+        return []
+    first = np.where(col_ink > 0, mask.argmax(axis=0), h)
+    last = np.where(col_ink > 0, h - 1 - mask[::-1].argmax(axis=0), -1)
+    x0s, x1s = runs[:, 0], runs[:, 1]
+    # reduceat llega hasta el inicio del tramo siguiente; las columnas vacías
+    # de en medio son neutras (primera fila h, última -1, tinta 0).
+    y0s = np.minimum.reduceat(first, x0s)
+    y1s = np.maximum.reduceat(last, x0s) + 1
+    ink = np.add.reduceat(col_ink, x0s)
+    keep = (ink >= min_pixels) & (ink >= min_fill * (x1s - x0s) * (y1s - y0s))
+    candidates: List[Box] = [
+        (int(a), int(b), int(c), int(d)) for a, b, c, d in zip(x0s[keep], x1s[keep], y0s[keep], y1s[keep])
+    ]
+    if not candidates:
+        return []
+
+    line_h = max(y1 - y0 for _, _, y0, y1 in candidates)
+    line_top = min(y0 for _, _, y0, y1 in candidates if y1 - y0 >= 0.5 * line_h)
+    line_mid = line_top + line_h / 2.0
+
+    boxes: List[Box] = []
+    for x0, x1, y0, y1 in candidates:
+        w, h = x1 - x0, y1 - y0
+        if h < 0.5 * line_h:
+            # Solo un guion sobrevive: ancho, bajo y centrado en la línea.
+            if w >= 1.5 * h and abs((y0 + y1) / 2.0 - line_mid) <= line_h / 4.0:
+                boxes.append((x0, x1, y0, y1))
+            continue
+        if w <= line_h:
+            boxes.append((x0, x1, y0, y1))
+            continue
+        boxes.extend(_split_wide(mask, (x0, x1, y0, y1), line_top, line_h))
+    return boxes
+
+
+def glyph_mask(crop: Any, threshold: int = 120) -> np.ndarray:
+    """binarize + clear_border: la máscara que usan segment y glyph_vectors."""
+    return clear_border(binarize(crop, threshold))
+
+
+def glyph_vectors(mask: np.ndarray, boxes: Sequence[Box], shape: Tuple[int, int] = GLYPH_SHAPE) -> np.ndarray:
+    """
+    Remuestrea cada glifo a `shape` y lo normaliza (media 0, norma 1), de
+    modo que el producto escalar es la correlación normalizada.
+
+    La ventana vertical es la de la línea de texto (no la del glifo): un
+    guion queda como una barra a media altura y no como un bloque lleno.
+    La horizontal mantiene la proporción para que un "1" no se estire.
+    """
+    gh, gw = shape
+    if not boxes:
+        return np.zeros((0, gh * gw), np.float32)
+    b = np.asarray(boxes, dtype=np.float32)
+    x0, x1, y0, y1 = b[:, 0], b[:, 1], b[:, 2], b[:, 3]
+    tall = (y1 - y0) >= 0.5 * (y1 - y0).max()
+    top = y0[tall].min() if tall.any() else y0.min()
+    bottom = y1[tall].max() if tall.any() else y1.max()
+    line_h = max(bottom - top, 1.0)
+    win_w = np.maximum(x1 - x0, DIGIT_ASPECT * line_h)
+    cx = (x0 + x1) / 2.0
+
+    # Centros de muestreo (n, gh) y (n, gw), vecino más próximo.
+    ys = top + (np.arange(gh, dtype=np.float32) + 0.5) * (line_h / gh)
+    xs = (cx - win_w / 2.0)[:, None] + (np.arange(gw, dtype=np.float32) + 0.5)[None, :] * (win_w / gw)[:, None]
+    yi = np.floor(ys).astype(int)
+    xi = np.floor(xs).astype(int)
+    h, w = mask.shape
+    inside_x = (xi >= x0[:, None]) & (xi < x1[:, None])
+    yi_c = np.clip(yi, 0, h - 1)
+    xi_c = np.clip(xi, 0, w - 1)
+    samples = mask[yi_c[None, :, None], xi_c[:, None, :]]          # (n, gh, gw)
+    samples &= inside_x[:, None, :] & ((yi >= 0) & (yi < h))[None, :, None]
+
+    vecs = samples.reshape(len(boxes), -1).astype(np.float32)
+    vecs -= vecs.mean(axis=1, keepdims=True)
+    norms = np.linalg.norm(vecs, axis=1, keepdims=True)
+    return vecs / np.maximum(norms, 1e-6)
+
+
+class DigitRecognizer:
+    def __init__(
+        self,
+        templates: np.ndarray,
+        labels: np.ndarray,
+        charset: str = CHARSET,
+        shape: Tuple[int, int] = GLYPH_SHAPE,
+        threshold: int = 120,
+        min_score: float = 0.6,
+    ) -> None:
+        """
+        templates: (K, alto*ancho) normalizadas; labels: índice en `charset`.
+        charset: caracteres reconocibles; JUNK, si está, marca glifos que se
+            descartan al leer.
+        min_score: correlación mínima por glifo; por debajo la lectura es None.
+        """
+        order = np.argsort(labels, kind="stable")
+        self.templates = np.ascontiguousarray(templates[order], dtype=np.float32)
+        self.labels = np.asarray(labels)[order].astype(np.int64)
+        self.charset = charset
+        self.shape = tuple(shape)
+        self.threshold = threshold
+        self.min_score = min_score
+        # Inicio de cada clase en `templates` para reducir por clase de golpe.
+        self._classes, self._starts = np.unique(self.labels, return_index=True)
+
+    # ---------- construcción ----------
+
+    @classmethod
+    def fit(
+        cls,
+        samples: Iterable[Tuple[Any, str]],
+        max_per_class: int = 24,
+        threshold: int = 120,
+        min_score: float = 0.6,
+        charset: str = CHARSET,
+        shape: Tuple[int, int] = GLYPH_SHAPE,
+        max_junk: int = 3,
+    ) -> "DigitRecognizer":
+        """
+        samples: (recorte, texto esperado). Se usan los recortes cuya
+        segmentación da tantos glifos como caracteres tiene el texto o hasta
+        `max_junk` más: el texto se alinea a la derecha y los glifos sobrantes
+        de la izquierda (el "Lv" del orbe de nivel) se aprenden como JUNK.
+        Cada clase guarda su media más hasta `max_per_class - 1` ejemplos.
+        """
+        charset = charset if JUNK in charset else charset + JUNK
+        per_class: Dict[int, List[np.ndarray]] = {}
+        used = skipped = 0
+        for crop, text in samples:
+            text = str(text)
+            if not text or any(ch not in charset or ch == JUNK for ch in text):
+                skipped += 1
+                continue
+            mask = glyph_mask(crop, threshold)
+            boxes = segment(mask)
+            extra = len(boxes) - len(text)
+            if not 0 <= extra <= max_junk:
+                skipped += 1
+                continue
+            used += 1
+            for ch, vec in zip(JUNK * extra + text, glyph_vectors(mask, boxes, shape)):
+                per_class.setdefault(charset.index(ch), []).append(vec)
+        if not per_class:
+            raise ValueError("Ningún recorte se pudo segmentar según su etiqueta")
+
+        templates, labels = [], []
+        for idx, vecs in sorted(per_class.items()):
+            stack = np.stack(vecs)
+            mean = stack.mean(axis=0)
+            mean -= mean.mean()
+            protos = [mean / max(np.linalg.norm(mean), 1e-6)]
+            if max_per_class > 1:
+                pick = np.linspace(0, len(stack) - 1, min(len(stack), max_per_class - 1)).round().astype(int)
+                protos.extend(stack[np.unique(pick)])
+            templates.extend(protos)
+            labels.extend([idx] * len(protos))
+
+        rec = cls(np.stack(templates), np.asarray(labels), charset, shape, threshold, min_score)
+        rec.fit_stats = {
+            "samples_used": used,
+            "samples_skipped": skipped,
+            "per_class": {charset[i]: len(v) for i, v in sorted(per_class.items())},
+        }
+        return rec
+
+    def save(self, path: str | Path) -> None:
+        np.savez_compressed(
+            path,
+            templates=self.templates,
+            labels=self.labels,
+            charset=np.array(self.charset),
+            shape=np.array(self.shape),
+            threshold=np.array(self.threshold),
+            min_score=np.array(self.min_score),
+        )
+
+    @classmethod
+    def load(cls, path: str | Path, min_score: Optional[float] = None) -> "DigitRecognizer":
+        with np.load(path) as data:
+            return cls(
+                data["templates"],
+                data["labels"],
+                charset=str(data["charset"]),
+                shape=tuple(int(v) for v in data["shape"]),
+                threshold=int(data["threshold"]),
+                min_score=float(data["min_score"]) if min_score is None else min_score,
+            )
+
+    # ---------- lectura ----------
+
+    def classify(self, vecs: np.ndarray) -> Tuple[str, np.ndarray]:
+        """Glifos normalizados (n, D) -> (texto, correlación de cada glifo)."""
+        if len(vecs) == 0:
+            return "", np.zeros(0, np.float32)
+        scores = vecs @ self.templates.T                             # (n, K)
+        per_class = np.maximum.reduceat(scores, self._starts, axis=1)  # (n, clases)
+        best = per_class.argmax(axis=1)
+        text = "".join(self.charset[c] for c in self._classes[best])
+        return text, per_class[np.arange(len(vecs)), best]
+
+    def read_with_score(self, crop: Any) -> Tuple[Optional[str], float]:
+        """
+        (texto | None, peor correlación). Los glifos JUNK se descartan; None
+        si no queda ninguno o alguno no se parece lo bastante a nada.
+        """
+        mask = glyph_mask(crop, self.threshold)
+        boxes = segment(mask)
+        if not boxes:
+            return None, 0.0
+        text, scores = self.classify(glyph_vectors(mask, boxes, self.shape))
+        keep = np.array([ch != JUNK for ch in text])
+        if not keep.any():
+            return None, 0.0
+        text = "".join(ch for ch in text if ch != JUNK)
+        score = float(scores[keep].min())
+        return (text if score >= self.min_score else None), score
+
+    def read(self, crop: Any) -> Optional[str]:
+        return self.read_with_score(crop)[0]
+
+    def read_int(self, crop: Any) -> Optional[int]:
+        text = self.read(crop)
+        return int(text) if text and text.isdigit() else None
+
+    def read_round(self, crop: Any) -> Optional[str]:
+        text = self.read(crop)
+        return glyphs_to_round(text) if text else None
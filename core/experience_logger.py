@@ -13,6 +13,8 @@ from pathlib import Path
 from typing import Any, Dict, List, Optional
 from datetime import datetime
 
+from core.metrics import timed
+
 
 class EpisodeLogger:
     """
@@ -53,6 +55,7 @@ class EpisodeLogger:
         self._start_time = datetime.utcnow()
         self._transitions = []
 
+    @timed("episode.log_step")
     def log_step(
         self,
         state_vector: list[float] | list[int],
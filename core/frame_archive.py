@@ -0,0 +1,180 @@
+# core/frame_archive.py
+"""
+Archivo de frames en segundo plano.
+
+El loop en tiempo real solo hace `submit(frame)`, que nunca bloquea: el frame
+entra en una cola acotada y un hilo aparte lo comprime (PNG/JPEG/WebP) y lo
+escribe. Si la cola está llena el frame se descarta y se cuenta.
+
+El directorio se gestiona como un buffer circular: cuando los archivos
+propios (prefijo `cap_`) superan la cuota, se borran los más antiguos.
+Los archivos que no llevan ese prefijo (p.ej. frames ya etiquetados) no se
+tocan nunca.
+"""
+
+from __future__ import annotations
+
+import queue
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Deque, Dict, Optional, Tuple
+
+import cv2
+import numpy as np
+
+ARCHIVE_PREFIX = "cap_"
+
+_CODECS = {
+    "png": ".png",
+    "jpeg": ".jpg",
+    "jpg": ".jpg",
+    "webp": ".webp",
+}
+
+
+class FrameArchiveWriter:
+    def __init__(
+        self,
+        out_dir: str = "data/raw_frames",
+        codec: str = "png",
+        quality: int = 90,
+        png_level: int = 3,
+        sample_every: int = 1,
+        max_bytes: int = 2 * 1024 ** 3,
+        queue_size: int = 16,
+    ) -> None:
+        """
+        codec: png | jpeg | webp.
+        quality: calidad 0-100 para jpeg/webp.
+        png_level: compresión PNG 0-9 (más alto = más lento, menos bytes).
+        sample_every: guarda 1 de cada N frames recibidos.
+        max_bytes: cuota en disco de los archivos propios (0 = sin límite).
+        """
+        codec = codec.lower()
+        if codec not in _CODECS:
+            raise ValueError(f"Codec no soportado: {codec} (usa png, jpeg o webp)")
+        self.out_dir = Path(out_dir)
+        self.out_dir.mkdir(parents=True, exist_ok=True)
+        self.codec = codec
+        self.ext = _CODECS[codec]
+        if codec == "png":
+            self.params = [cv2.IMWRITE_PNG_COMPRESSION, int(png_level)]
+        elif codec == "webp":
+            self.params = [cv2.IMWRITE_WEBP_QUALITY, int(quality)]
+        else:
+            self.params = [cv2.IMWRITE_JPEG_QUALITY, int(quality)]
+        self.sample_every = max(1, int(sample_every))
+        self.max_bytes = int(max_bytes)
+
+        self._queue: "queue.Queue[Optional[Tuple[int, np.ndarray]]]" = queue.Queue(maxsize=max(1, queue_size))
+        self._lock = threading.Lock()
+        self._session = datetime.now().strftime("%Y%m%dT%H%M%S")
+
+        # Archivos propios existentes (de sesiones anteriores), del más viejo al más nuevo.
+        self._files: Deque[Tuple[Path, int]] = deque()
+        self.disk_bytes = 0
+        for p in sorted(self.out_dir.glob(f"{ARCHIVE_PREFIX}*")):
+            size = p.stat().st_size
+            self._files.append((p, size))
+            self.disk_bytes += size
+
+        self.received = 0
+        self.sampled_out = 0
+        self.dropped = 0
+        self.written = 0
+        self.bytes_written = 0
+        self.deleted = 0
+        self.errors = 0
+
+        self._thread = threading.Thread(target=self._run, name="frame-archive", daemon=True)
+        self._thread.start()
+        self._enforce_quota()
+
+    def submit(self, frame: np.ndarray) -> bool:
+        """
+        Encola un frame para guardarlo. No bloquea nunca.
+        Devuelve True si el frame se encoló.
+        """
+        with self._lock:
+            self.received += 1
+            idx = self.received
+        if (idx - 1) % self.sample_every != 0:
+            self.sampled_out += 1
+            return False
+        try:
+            # Copia: el productor puede reutilizar el buffer del frame.
+            self._queue.put_nowait((idx, frame.copy()))
+            return True
+        except queue.Full:
+            with self._lock:
+                self.dropped += 1
+            return False
+
+    def _run(self) -> None:
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            idx, frame = item
+            try:
+                ok, buf = cv2.imencode(self.ext, frame, self.params)
+                if not ok:
+                    raise RuntimeError("cv2.imencode devolvió False")
+                path = self.out_dir / f"{ARCHIVE_PREFIX}{self._session}_{idx:06d}{self.ext}"
+                data = buf.tobytes()
+                path.write_bytes(data)
+            except Exception as err:
+                with self._lock:
+                    self.errors += 1
+                print(f"[archive] Error guardando frame {idx}: {err}")
+                continue
+            with self._lock:
+                self.written += 1
+                self.bytes_written += len(data)
+                self.disk_bytes += len(data)
+                self._files.append((path, len(data)))
+            self._enforce_quota()
+
+    def _enforce_quota(self) -> None:
+        if self.max_bytes <= 0:
+            return
+        while True:
+            with self._lock:
+                if self.disk_bytes <= self.max_bytes or len(self._files) <= 1:
+                    return
+                path, size = self._files.popleft()
+                self.disk_bytes -= size
+                self.deleted += 1
+            try:
+                path.unlink()
+            except FileNotFoundError:
+                pass
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "received": self.received,
+                "sampled_out": self.sampled_out,
+                "dropped": self.dropped,
+                "written": self.written,
+                "bytes_written": self.bytes_written,
+                "deleted": self.deleted,
+                "disk_bytes": self.disk_bytes,
+                "pending": self._queue.qsize(),
+                "errors": self.errors,
+            }
+
+    def close(self, timeout: float = 10.0) -> None:
+        """Vacía la cola pendiente y para el hilo escritor."""
+        deadline = time.monotonic() + timeout
+        while self._thread.is_alive():
+            try:
+                self._queue.put(None, timeout=0.1)
+                break
+            except queue.Full:
+                if time.monotonic() > deadline:
+                    return
+        self._thread.join(timeout=max(0.0, deadline - time.monotonic()))
@@ -0,0 +1,258 @@
+# core/frame_source.py
+"""
+Fuentes de frames intercambiables.
+
+Todas devuelven frames BGR (np.ndarray HxWx3) igual que WindowCapture, así el
+resto del pipeline no sabe si lee la ventana del juego, una carpeta de PNG,
+un vídeo o frames sintéticos. Las fuentes de replay permiten correr los loops
+en Linux/CI sin el juego abierto.
+
+Spec de texto (config.FRAME_SOURCE o --source):
+    window              ventana del juego (win32gui + mss, solo Windows)
+    dir:data/raw_frames carpeta de imágenes, en orden alfabético
+    video:partida.mp4   vídeo decodificado con cv2
+    synthetic           frames generados (synthetic:500 para limitar a 500)
+
+max_speed=True ignora los fps y entrega frames tan rápido como se consuman,
+para medir el throughput real de percepción + política.
+
+La cadencia la marca un DeadlineScheduler (core/scheduler.py): si el
+consumidor va tarde se saltan frames en vez de acumular retraso.
+"""
+
+from __future__ import annotations
+
+import time
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import Iterator, List, Optional
+
+import cv2
+import numpy as np
+
+from config import CAPTURE_FPS
+from core.metrics import span
+from core.scheduler import DeadlineScheduler, TimedFrame
+
+
+class FrameSource(ABC):
+    def __init__(self, fps: float = CAPTURE_FPS, max_speed: bool = False) -> None:
+        self.fps = fps
+        self.max_speed = max_speed
+        self.frames_read = 0
+        self.scheduler = DeadlineScheduler(fps, max_speed=max_speed)
+
+    @abstractmethod
+    def capture_once(self) -> Optional[np.ndarray]:
+        """Devuelve el siguiente frame BGR, o None si no hay frame disponible."""
+        ...
+
+    @property
+    def exhausted(self) -> bool:
+        """True cuando una fuente finita ya no tiene más frames."""
+        return False
+
+    def close(self) -> None:
+        pass
+
+    def timed_loop(self) -> Iterator[TimedFrame]:
+        """
+        Frames en deadlines absolutos de la rejilla 1/fps, con marca de
+        tiempo monotónica. El tiempo que el consumidor tarda entre frames ya
+        no retrasa la cadencia; si se pasa de un periodo se saltan ticks.
+        """
+        while True:
+            seq, deadline, skipped = self.scheduler.wait_next()
+            with span("capture"):
+                frame = self.capture_once()
+            t_capture = time.monotonic()
+            if frame is None and self.exhausted:
+                return
+            self.scheduler.record(t_capture, deadline)
+            yield TimedFrame(
+                frame=frame,
+                seq=seq,
+                t_capture=t_capture,
+                deadline=deadline,
+                skipped=skipped,
+            )
+
+    def capture_loop(self) -> Iterator[Optional[np.ndarray]]:
+        for timed in self.timed_loop():
+            yield timed.frame
+
+    def timing_stats(self) -> dict:
+        """fps conseguidos, frames saltados y percentiles de jitter."""
+        return self.scheduler.stats()
+
+    def __enter__(self) -> "FrameSource":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+class DirectoryFrameSource(FrameSource):
+    """Reproduce las imágenes de una carpeta (por defecto data/raw_frames)."""
+
+    EXTENSIONS = (".png", ".jpg", ".jpeg", ".bmp")
+
+    def __init__(
+        self,
+        directory: str = "data/raw_frames",
+        loop: bool = False,
+        fps: float = CAPTURE_FPS,
+        max_speed: bool = False,
+    ) -> None:
+        super().__init__(fps=fps, max_speed=max_speed)
+        self.directory = Path(directory)
+        if not self.directory.is_dir():
+            raise FileNotFoundError(f"No existe el directorio de frames: {self.directory}")
+        self.paths: List[Path] = sorted(
+            p for p in self.directory.iterdir() if p.suffix.lower() in self.EXTENSIONS
+        )
+        if not self.paths:
+            raise FileNotFoundError(f"No hay imágenes en {self.directory}")
+        self.loop = loop
+        self._idx = 0
+
+    @property
+    def exhausted(self) -> bool:
+        return not self.loop and self._idx >= len(self.paths)
+
+    def capture_once(self) -> Optional[np.ndarray]:
+        if self._idx >= len(self.paths):
+            if not self.loop:
+                return None
+            self._idx = 0
+        path = self.paths[self._idx]
+        self._idx += 1
+        frame = cv2.imread(str(path), cv2.IMREAD_COLOR)
+        if frame is None:
+            print(f"[capture] No se pudo leer {path}")
+            return None
+        self.frames_read += 1
+        return frame
+
+
+class VideoFrameSource(FrameSource):
+    """Reproduce un vídeo grabado de la partida."""
+
+    def __init__(
+        self,
+        path: str,
+        loop: bool = False,
+        fps: float | None = None,
+        max_speed: bool = False,
+    ) -> None:
+        self.path = Path(path)
+        if not self.path.exists():
+            raise FileNotFoundError(f"No existe el vídeo: {self.path}")
+        self._cap = cv2.VideoCapture(str(self.path))
+        if not self._cap.isOpened():
+            raise RuntimeError(f"cv2 no pudo abrir el vídeo: {self.path}")
+        # Por defecto se respeta la cadencia del propio vídeo.
+        video_fps = self._cap.get(cv2.CAP_PROP_FPS) or CAPTURE_FPS
+        super().__init__(fps=fps or video_fps, max_speed=max_speed)
+        self.loop = loop
+        self._ended = False
+
+    @property
+    def exhausted(self) -> bool:
+        return self._ended
+
+    def capture_once(self) -> Optional[np.ndarray]:
+        if self._ended:
+            return None
+        ok, frame = self._cap.read()
+        if not ok and self.loop:
+            self._cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+            ok, frame = self._cap.read()
+        if not ok:
+            self._ended = True
+            return None
+        self.frames_read += 1
+        return frame
+
+    def close(self) -> None:
+        self._cap.release()
+
+
+class SyntheticFrameSource(FrameSource):
+    """
+    Genera frames 1080p con un fondo fijo y números que cambian en las zonas
+    del HUD (ronda, nivel, oro). Sirve para medir throughput sin datos reales;
+    las lecturas del modelo sobre estos frames no significan nada.
+    """
+
+    def __init__(
+        self,
+        num_frames: int | None = None,
+        width: int = 1920,
+        height: int = 1080,
+        change_every: int = 10,
+        seed: int = 0,
+        fps: float = CAPTURE_FPS,
+        max_speed: bool = False,
+    ) -> None:
+        super().__init__(fps=fps, max_speed=max_speed)
+        self.num_frames = num_frames
+        self.width = width
+        self.height = height
+        self.change_every = max(1, change_every)
+        rng = np.random.default_rng(seed)
+        self._background = rng.integers(0, 80, size=(height, width, 3), dtype=np.uint8)
+        self._current: Optional[np.ndarray] = None
+
+    @property
+    def exhausted(self) -> bool:
+        return self.num_frames is not None and self.frames_read >= self.num_frames
+
+    def _render(self, step: int) -> np.ndarray:
+        frame = self._background.copy()
+        w, h = self.width, self.height
+        font = cv2.FONT_HERSHEY_SIMPLEX
+        stage, sub = 1 + step // 7, 1 + step % 7
+        cv2.putText(frame, f"{stage}-{sub}", (int(0.325 * w), int(0.035 * h)), font, 0.8, (255, 255, 255), 2)
+        cv2.putText(frame, str(1 + step % 9), (int(0.025 * w), int(0.90 * h)), font, 1.2, (255, 255, 255), 2)
+        cv2.putText(frame, str((step * 3) % 100), (int(0.92 * w), int(0.88 * h)), font, 1.4, (0, 215, 255), 3)
+        return frame
+
+    def capture_once(self) -> Optional[np.ndarray]:
+        if self.exhausted:
+            return None
+        n = self.frames_read
+        # El HUD solo cambia cada `change_every` frames, como en el juego real.
+        if self._current is None or n % self.change_every == 0:
+            self._current = self._render(n // self.change_every)
+        self.frames_read += 1
+        return self._current.copy()
+
+
+def build_frame_source(
+    spec: str = "window",
+    fps: float = CAPTURE_FPS,
+    max_speed: bool = False,
+    loop: bool = False,
+) -> FrameSource:
+    """Construye una FrameSource a partir de un spec de texto (ver docstring del módulo)."""
+    kind, _, arg = spec.partition(":")
+    kind = kind.strip().lower()
+    arg = arg.strip()
+
+    if kind == "window":
+        # Import diferido: win32gui/mss solo existen en Windows.
+        from core.capture import WindowCapture
+
+        kwargs = {"window_title": arg} if arg else {}
+        return WindowCapture(fps=fps, max_speed=max_speed, **kwargs)
+    if kind == "dir":
+        return DirectoryFrameSource(arg or "data/raw_frames", loop=loop, fps=fps, max_speed=max_speed)
+    if kind == "video":
+        if not arg:
+            raise ValueError("El spec 'video' necesita ruta: video:partida.mp4")
+        return VideoFrameSource(arg, loop=loop, fps=fps, max_speed=max_speed)
+    if kind == "synthetic":
+        num = int(arg) if arg else None
+        return SyntheticFrameSource(num_frames=num, fps=fps, max_speed=max_speed)
+    raise ValueError(f"Fuente de frames desconocida: {spec}")
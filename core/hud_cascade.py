@@ -0,0 +1,194 @@
+# core/hud_cascade.py
+"""
+Lectura del HUD en cascada: modelo local primero, VLM solo si duda.
+
+HUDLocalReader da, para cada campo, su valor y una confianza calibrada
+(softmax con temperatura). Los campos por debajo de su umbral
+(HUD_CASCADE_THRESHOLDS) se leen primero con las plantillas de dígitos
+(core/digit_ocr.py, <1 ms) y, los que estas tampoco leen con seguridad,
+con HUDReader, recortando únicamente esas regiones, en una sola llamada.
+El resto no sale del proceso.
+
+La lectura del VLM se reutiliza mientras la ROI del campo no cambie, así
+un campo que el modelo local lee mal siempre no dispara una llamada por
+frame. hp_self no tiene recorte en HUDReader: se queda con la lectura local
+y no cuenta para la confianza de la lectura (confidence_fields), que si no
+se quedaría en la del peor frame de hp_self aunque el VLM confirme el resto.
+
+    cascade = CascadeHUDReader(HUDLocalReader("hud_model.pt"),
+                               HUDReader(VLM_API_BASE_URL, VLM_API_MODEL))
+    hud = cascade.predict_from_array(frame_bgr)   # misma interfaz que HUDLocalReader
+    gs.update_from_hud(hud)                       # confianza -> gs.confianza_lectura
+"""
+
+from __future__ import annotations
+
+from collections import Counter
+from pathlib import Path
+from typing import Any, Dict, Mapping, Optional
+
+import numpy as np
+
+from config import (
+    HUD_CASCADE_DIGIT_CONFIDENCE,
+    HUD_CASCADE_THRESHOLDS,
+    HUD_CASCADE_VLM_CONFIDENCE,
+    HUD_DIGIT_MIN_SCORE,
+    HUD_DIGIT_TEMPLATES,
+)
+from core.digit_ocr import DigitRecognizer, glyphs_to_round
+from core.hud_regions import HUD_FIELD_BOXES, crop_box
+from core.metrics import span, timed
+from core.roi_change import ROIChangeDetector
+
+# Campo del modelo local -> recorte de HUDReader que lo lee.
+VLM_CROPS = {
+    "round": "round_box",
+    "level": "level_box",
+    "gold": "gold_box",
+}
+
+
+def _vlm_value(field: str, value: Any) -> Any:
+    """
+    Lectura de HUDReader en el formato del modelo local. La ronda llega tal
+    cual se ve ("IV-1") y el vocabulario del modelo usa "4-1"; None si no
+    tiene forma de ronda.
+    """
+    if field != "round":
+        return value
+    text = str(value).strip().upper()
+    stage, sep, step = text.partition("-")
+    if sep and stage.isdigit() and step.isdigit():
+        return text
+    return glyphs_to_round(text)
+
+
+class CascadeHUDReader:
+    def __init__(
+        self,
+        local_reader: Any,
+        vlm_reader: Any | None,
+        thresholds: Optional[Mapping[str, float]] = None,
+        vlm_confidence: float = HUD_CASCADE_VLM_CONFIDENCE,
+        change_detection: bool = True,
+        digit_templates: str | None = HUD_DIGIT_TEMPLATES,
+        digit_confidence: float = HUD_CASCADE_DIGIT_CONFIDENCE,
+    ) -> None:
+        """
+        local_reader: HUDLocalReader (predict_from_array con "confidence").
+        vlm_reader: HUDReader (read_crops); None = solo modelo local.
+        thresholds: confianza mínima por campo para no escalar al VLM.
+        vlm_confidence: confianza asignada a un campo leído por el VLM.
+        digit_templates: plantillas de core/digit_ocr.py que se prueban
+            antes del VLM (None o fichero inexistente = directo al VLM).
+        digit_confidence: confianza asignada a un campo leído con ellas.
+        """
+        self.local = local_reader
+        self.vlm = vlm_reader
+        self.thresholds: Dict[str, float] = dict(HUD_CASCADE_THRESHOLDS if thresholds is None else thresholds)
+        self.vlm_confidence = float(vlm_confidence)
+        self.digit_confidence = float(digit_confidence)
+        self.digits: DigitRecognizer | None = None
+        if digit_templates and Path(digit_templates).exists():
+            try:
+                self.digits = DigitRecognizer.load(digit_templates, min_score=HUD_DIGIT_MIN_SCORE)
+            except Exception as e:
+                print(f"[cascade] No se pudieron cargar las plantillas de digitos {digit_templates}: {e}")
+        self.change_detector = (
+            ROIChangeDetector({f: HUD_FIELD_BOXES[f] for f in VLM_CROPS}) if change_detection else None
+        )
+        self.frames = 0
+        self.frames_escalated = 0
+        self.escalated: Counter = Counter()
+        self.by_digits: Counter = Counter()
+        self.reused: Counter = Counter()
+        self.vlm_errors = 0
+
+    def _needs_vlm(self, field: str, confidence: Dict[str, float]) -> bool:
+        if field not in VLM_CROPS or (self.vlm is None and self.digits is None):
+            return False
+        return confidence.get(field, 0.0) < self.thresholds.get(field, 0.0)
+
+    def _read_digits(self, rgb: np.ndarray, field: str) -> Any:
+        """Lectura con plantillas en el formato del modelo local; None si no es segura."""
+        crop = crop_box(rgb, HUD_FIELD_BOXES[field])
+        if field == "round":
+            return self.digits.read_round(crop)
+        return self.digits.read_int(crop)
+
+    @timed("hud.cascade")
+    def predict_from_array(self, frame_bgr: np.ndarray) -> Dict[str, Any]:
+        hud = dict(self.local.predict_from_array(frame_bgr))
+        confidence = dict(hud.get("confidence", {}))
+        self.frames += 1
+
+        # Solo cuentan para GameState.confianza_lectura los campos que la
+        # cascada puede corregir.
+        hud["confidence_fields"] = [f for f in confidence if f in VLM_CROPS]
+        doubtful = [f for f in VLM_CROPS if self._needs_vlm(f, confidence)]
+        if not doubtful:
+            hud["confidence"] = confidence
+            return hud
+
+        check = self.change_detector.check(frame_bgr) if self.change_detector else None
+        # Las plantillas y HUDReader recortan sobre RGB.
+        rgb = np.ascontiguousarray(frame_bgr[:, :, 2::-1])
+        to_ask = []
+        for field in doubtful:
+            if check is not None and not check.is_changed(field):
+                # El VLM ya leyó esta región tal cual: se reutiliza.
+                hud[field] = self.change_detector.cached(field)
+                confidence[field] = self.vlm_confidence
+                self.reused[field] += 1
+            else:
+                to_ask.append(field)
+
+        if to_ask and self.digits is not None:
+            with span("hud.cascade.digits"):
+                pending = []
+                for field in to_ask:
+                    value = self._read_digits(rgb, field)
+                    if value is None:
+                        pending.append(field)
+                        continue
+                    hud[field] = value
+                    confidence[field] = self.digit_confidence
+                    self.by_digits[field] += 1
+                to_ask = pending
+
+        if to_ask and self.vlm is not None:
+            self.frames_escalated += 1
+            try:
+                with span("hud.cascade.vlm"):
+                    values = self.vlm.read_crops(rgb, [VLM_CROPS[f] for f in to_ask])
+            except Exception as vlm_err:
+                # Sin VLM se queda la lectura local con su confianza baja.
+                self.vlm_errors += 1
+                print(f"[cascade] Error consultando al VLM: {vlm_err}")
+                values = {}
+            read = {}
+            for field in to_ask:
+                value = _vlm_value(field, values.get(VLM_CROPS[field]))
+                if value is None:
+                    continue
+                hud[field] = value
+                confidence[field] = self.vlm_confidence
+                read[field] = value
+                self.escalated[field] += 1
+            if check is not None:
+                self.change_detector.commit(check, read)
+
+        hud["confidence"] = confidence
+        return hud
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "frames": self.frames,
+            "frames_escalated": self.frames_escalated,
+            "local_only_rate": round(1.0 - self.frames_escalated / self.frames, 3) if self.frames else 0.0,
+            "escalated": dict(self.escalated),
+            "by_digits": dict(self.by_digits),
+            "reused": dict(self.reused),
+            "vlm_errors": self.vlm_errors,
+        }
@@ -2,22 +2,52 @@
 """
 Lector de HUD que usa el modelo local entrenado (hud_model.pt).
 Se integra fácilmente con state.py y con tu bucle de juego.
+
+Además del argmax de cada cabeza se devuelve su confianza: la probabilidad
+softmax de la clase elegida, con la temperatura calibrada que guarda
+train_hud_model.py en el checkpoint ("temperatures"; 1.0 si no existe).
+Va en hud["confidence"] y la usa core/hud_cascade.py para decidir qué
+campos consultar al VLM.
+
+predict_batch lee muchas imágenes independientes (rutas, arrays BGR o
+PIL.Image) en lotes de tamaño fijo, un forward por lote; es lo que usa
+tools/hud_bulk_predict.py para etiquetar/evaluar directorios enteros.
+
+El checkpoint dice qué modelo es ("model_type"): "frame" (HUDModel,
+frame entero con el backbone e input_size guardados; ResNet18 a 224x224
+si faltan las claves) o "roi"
+(models/hud_roi_model.py, un tensor por región del HUD). La entrada de
+predict_tensor_batch es entonces un tensor o un dict de tensores.
+
+weights_path puede ser también un artefacto de tools/export_hud_model.py
+(.ts TorchScript, .onnx ONNX Runtime; int8/channels-last según se
+exportara): core/hud_runtime.py lo carga sin torchvision.
 """
 
 from __future__ import annotations
 
 from pathlib import Path
-from typing import Dict, Any
+from typing import Any, Dict, List, Sequence, Tuple
 
+import numpy as np
 import torch
 from PIL import Image
-from torchvision import transforms
 
-from models.hud_model import HUDModel
+from config import HUD_PREDICT_BATCH_SIZE
+from core.hud_regions import HUD_FIELD_BOXES
+from core.hud_runtime import HEADS, load_runtime
+from core.metrics import span, timed
+from core.roi_change import ROIChangeDetector
+from models.hud_roi_model import FrameTransform, RoiTransform, batch_len, stack_inputs
 
 
 class HUDLocalReader:
-    def __init__(self, weights_path: str = "hud_model.pt", device: str | None = None):
+    def __init__(
+        self,
+        weights_path: str = "hud_model.pt",
+        device: str | None = None,
+        change_detection: bool = True,
+    ):
         self.weights_path = Path(weights_path)
         if not self.weights_path.exists():
             raise FileNotFoundError(
@@ -25,56 +55,123 @@ class HUDLocalReader:
                 "Entrena el modelo con train_hud_model.py primero."
             )
 
-        ckpt = torch.load(self.weights_path, map_location="cpu")
-        self.round_vocab = ckpt["round_vocab"]
+        # Eager (.pt), TorchScript (.ts) u ONNX (.onnx), según la extensión.
+        self.runtime = load_runtime(self.weights_path, device)
+        meta = self.runtime.meta
+        self.device = self.runtime.device
+        self.round_vocab = meta["round_vocab"]
         self.inv_round_vocab = {v: k for k, v in self.round_vocab.items()}
-
-        self.device = device or ("cuda" if torch.cuda.is_available() else "cpu")
-
-        self.model = HUDModel(
-            num_round_classes=len(self.round_vocab),
-            num_level_classes=10,
-            num_gold_classes=101,
-            num_hp_classes=101,
-        )
-        self.model.load_state_dict(ckpt["model_state_dict"])
-        self.model.to(self.device)
-        self.model.eval()
-
-        self.transform = transforms.Compose(
-            [
-                transforms.Resize((224, 224)),
-                transforms.ToTensor(),
-                transforms.Normalize(
-                    mean=[0.485, 0.456, 0.406],
-                    std=[0.229, 0.224, 0.225],
-                ),
-            ]
-        )
-
-    def _predict_tensor(self, img_tensor: torch.Tensor) -> Dict[str, Any]:
-        x = img_tensor.unsqueeze(0).to(self.device)
-        with torch.no_grad():
-            outputs = self.model(x)
-
-        def _argmax(logits: torch.Tensor) -> int:
-            return int(logits.argmax(dim=1).item())
-
-        round_idx = _argmax(outputs["round"])
-        level_idx = _argmax(outputs["level"])
-        gold_idx = _argmax(outputs["gold"])
-        hp_idx = _argmax(outputs["hp_self"])
-
-        round_str = self.inv_round_vocab.get(round_idx, None)
-
-        return {
-            "round": round_str,
-            "level": level_idx,
-            "gold": gold_idx,
-            "hp_self": hp_idx,
+        # Temperatura por cabeza (calibración); >1 suaviza, <1 afila.
+        self.temperatures: Dict[str, float] = {
+            head: float(meta["temperatures"].get(head, 1.0)) for head in HEADS
         }
 
+        self.model_type = meta["model_type"]
+        if self.model_type == "roi":
+            self.transform = RoiTransform(meta.get("roi_sizes"))
+        else:
+            self.transform = FrameTransform(meta["input_size"])
+
+        # Solo aplica a predict_from_array (frames consecutivos del loop).
+        self.change_detector = ROIChangeDetector(HUD_FIELD_BOXES) if change_detection else None
+        # Confianza de la última lectura de cada campo (para ROIs sin cambio).
+        self._confidence: Dict[str, float] = {}
+
+    def predict_tensor_batch(self, x: Any) -> List[Dict[str, Any]]:
+        """
+        Un forward para un lote ya preprocesado (to_tensor + stack_inputs):
+        (N, 3, H, W), o {campo: (N, 3, h, w)} con el modelo roi -> N lecturas.
+        """
+        with span("hud.forward"):
+            outputs = self.runtime(x)
+
+        values: Dict[str, List[int]] = {}
+        confs: Dict[str, List[float]] = {}
+        for head in HEADS:
+            probs = torch.softmax(outputs[head] / self.temperatures[head], dim=1)
+            p, idx = probs.max(dim=1)
+            values[head] = idx.tolist()
+            confs[head] = p.tolist()
+
+        huds: List[Dict[str, Any]] = []
+        for i in range(batch_len(x)):
+            hud: Dict[str, Any] = {head: values[head][i] for head in HEADS}
+            hud["round"] = self.inv_round_vocab.get(hud["round"], None)
+            hud["confidence"] = {head: round(confs[head][i], 4) for head in HEADS}
+            huds.append(hud)
+        return huds
+
+    def _predict_tensor(self, img_tensor: Any) -> Dict[str, Any]:
+        return self.predict_tensor_batch(stack_inputs([img_tensor]))[0]
+
+    def to_tensor(self, item: Any) -> Any:
+        """
+        Ruta (str/Path), PIL.Image o array BGR/BGRA (como predict_from_array)
+        -> tensor preprocesado igual que en entrenamiento.
+        """
+        if isinstance(item, (str, Path)):
+            img = Image.open(item).convert("RGB")
+        elif isinstance(item, Image.Image):
+            img = item.convert("RGB")
+        else:
+            arr = np.asarray(item)
+            if arr.ndim != 3 or arr.shape[2] < 3:
+                raise ValueError(f"Se esperaba un frame HxWx3 BGR, llegó {arr.shape}")
+            img = np.ascontiguousarray(arr[:, :, 2::-1])
+        return self.transform(img)
+
+    @timed("hud.predict_batch")
+    def predict_batch(
+        self,
+        items: Sequence[Any],
+        batch_size: int = HUD_PREDICT_BATCH_SIZE,
+    ) -> List[Dict[str, Any]]:
+        """
+        Lee imágenes independientes en lotes de `batch_size`, en orden. Sin
+        detección de cambios: cada imagen se lee entera.
+        """
+        huds: List[Dict[str, Any]] = []
+        for start in range(0, len(items), max(1, batch_size)):
+            chunk = items[start : start + batch_size]
+            with span("hud.preprocess"):
+                x = stack_inputs([self.to_tensor(item) for item in chunk])
+            huds.extend(self.predict_tensor_batch(x))
+        return huds
+
     def predict_from_image_path(self, image_path: str) -> Dict[str, Any]:
-        img = Image.open(image_path).convert("RGB")
-        x = self.transform(img)
-        return self._predict_tensor(x)
+        return self._predict_tensor(self.to_tensor(image_path))
+
+    def _with_confidence(self, hud: Dict[str, Any], changed: Tuple[str, ...]) -> Dict[str, Any]:
+        """Confianza nueva para los campos releídos; la previa para el resto."""
+        fresh = hud.get("confidence", {})
+        for field in changed:
+            if field in fresh:
+                self._confidence[field] = fresh[field]
+        out = dict(hud)
+        out["confidence"] = {f: self._confidence[f] for f in HEADS if f in self._confidence}
+        return out
+
+    @timed("hud.predict")
+    def predict_from_array(self, frame_bgr: np.ndarray) -> Dict[str, Any]:
+        """
+        Predice directamente sobre un frame BGR en memoria (el que devuelve
+        WindowCapture.capture_once), sin pasar por disco.
+        Acepta también BGRA (se ignora el canal alfa).
+        """
+        if frame_bgr.ndim != 3 or frame_bgr.shape[2] < 3:
+            raise ValueError(f"Se esperaba un frame HxWx3 BGR, llegó {frame_bgr.shape}")
+        check = self.change_detector.check(frame_bgr) if self.change_detector else None
+        if check is not None and check.all_unchanged():
+            # Ninguna ROI cambió: se evita el forward completo.
+            return self._with_confidence(self.change_detector.cached_values(), ())
+
+        with span("hud.preprocess"):
+            # Mismo preprocesado que en entrenamiento.
+            x = self.to_tensor(frame_bgr)
+        hud = self._predict_tensor(x)
+        if check is None:
+            return self._with_confidence(hud, HEADS)
+        # Campos cuya ROI no cambió conservan su lectura (evita parpadeos).
+        hud = check.merge(hud)
+        self.change_detector.commit(check, hud)
+        return self._with_confidence(hud, tuple(check.changed))
@@ -1,12 +1,11 @@
-﻿import base64
-import json
+﻿import json
+import dataclasses
 from dataclasses import dataclass
 from pathlib import Path
 from typing import Dict, Optional, Tuple
 
 import numpy as np
 from PIL import Image, ImageDraw
-from openai import OpenAI
 
 # OCR opcional (si pytesseract esta instalado y el binario disponible)
 try:
@@ -14,14 +13,33 @@ try:
 except ImportError:
     pytesseract = None
 
-# Coordenadas normalizadas (x1, y1, x2, y2) para 1920x1080.
-# Ajustadas con las capturas de referencia.
-ROUND_BOX = (0.32, 0.01, 0.36, 0.04)        # barra superior I-1/I-2 (a la izq. del timer verde)
-LEVEL_BOX = (0.01, 0.86, 0.07, 0.91)        # orbe azul abajo-izquierda (nivel)
-GOLD_BOX = (0.90, 0.83, 0.99, 0.90)         # moneda grande abajo-derecha (recortado izq/alto)
-SHOP_DETECT_BOX = (0.03, 0.15, 0.97, 0.60)  # banda donde aparece la tienda
-PLAYERS_BOX = (0.80, 0.07, 0.95, 0.75)      # lista de jugadores/vidas a la derecha
-HP_ONLY_BOX = (0.87, 0.07, 0.95, 0.75)      # columna de corazones
+from config import HUD_DIGIT_MIN_SCORE, HUD_DIGIT_TEMPLATES, VLM_STREAM_DEADLINE_S, VLM_STREAMING
+from core.api_gateway import get_gateway, message_text
+from core.digit_ocr import DigitRecognizer, binarize, glyphs_to_round
+from core.hud_regions import (
+    GOLD_BOX,
+    HP_ONLY_BOX,
+    LEVEL_BOX,
+    PLAYERS_BOX,
+    ROUND_BOX,
+    SHOP_DETECT_BOX,
+)
+from core.json_stream import has_fields, stream_json
+from core.metrics import span, timed
+from core.payload import PayloadConfig, encode_pil
+from core.roi_change import ROIChangeDetector
+from core.vlm_cache import get_vlm_cache
+
+# Nombre del recorte -> caja. El orden es el que recibe el VLM.
+CROP_BOXES = {
+    "round_box": ROUND_BOX,
+    "level_box": LEVEL_BOX,
+    "gold_box": GOLD_BOX,
+    "shop_box": SHOP_DETECT_BOX,
+}
+
+# Claves que devuelve _ask_multi.
+RESPONSE_FIELDS = ("round_label", "nivel_tablero", "oro", "tienda_abierta")
 
 
 @dataclass
@@ -43,14 +61,35 @@ class HUDReader:
         api_key: str = "",
         debug_overlay: bool = False,
         use_ocr_numbers: bool = True,
+        change_detection: bool = True,
+        response_cache: bool = True,
+        payload: PayloadConfig | None = None,
+        streaming: bool = VLM_STREAMING,
+        stream_deadline_s: float = VLM_STREAM_DEADLINE_S,
+        digit_templates: str | None = HUD_DIGIT_TEMPLATES,
     ):
-        self.client = OpenAI(base_url=base_url, api_key=api_key or "lm-studio")
+        self.gateway = get_gateway(base_url, api_key=api_key)
         self.model = model
         self.debug_overlay = debug_overlay
         self.use_ocr_numbers = use_ocr_numbers
-        self.ocr_available = pytesseract is not None
+        # Plantillas propias (core/digit_ocr.py) antes que Tesseract: <1 ms por campo.
+        self.digits: DigitRecognizer | None = None
+        if use_ocr_numbers and digit_templates and Path(digit_templates).exists():
+            try:
+                self.digits = DigitRecognizer.load(digit_templates, min_score=HUD_DIGIT_MIN_SCORE)
+            except Exception as e:
+                print(f"[hud] No se pudieron cargar las plantillas de digitos {digit_templates}: {e}")
+        self.ocr_available = self.digits is not None or pytesseract is not None
         if self.use_ocr_numbers and not self.ocr_available:
-            print("[hud] Aviso: pytesseract no disponible; usando solo VLM para numeros.")
+            print("[hud] Aviso: sin plantillas de digitos ni pytesseract; usando solo VLM para numeros.")
+        # Reutiliza la lectura previa de cada recorte si no ha cambiado.
+        self.change_detector = ROIChangeDetector(CROP_BOXES) if change_detection else None
+        # Recortes ya vistos (mismo hash perceptual) no vuelven al VLM.
+        self.cache = get_vlm_cache() if response_cache else None
+        # Los recortes ya son pequeños: el mosaico no aplica aquí.
+        self.payload = dataclasses.replace(payload or PayloadConfig(), roi_composite=False)
+        self.streaming = streaming
+        self.stream_deadline_s = stream_deadline_s
 
     @staticmethod
     def _crop(frame: np.ndarray, box: Tuple[float, float, float, float]) -> Image.Image:
@@ -64,24 +103,19 @@ class HUDReader:
         right, bottom = min(w, right), min(h, bottom)
         return Image.fromarray(frame[top:bottom, left:right, :])
 
+    @timed("hud_reader.encode")
     def _encode_image(self, img: Image.Image) -> Tuple[str, str]:
-        import io
-
-        bio = io.BytesIO()
-        img.save(bio, format="PNG")
-        return "image/png", base64.b64encode(bio.getvalue()).decode("utf-8")
+        enc = encode_pil(img, self.payload)
+        return enc.mime, enc.b64
 
+    @timed("hud_reader.ocr")
     def _ocr_digits(self, img: Image.Image) -> Optional[int]:
+        if self.digits is not None:
+            return self.digits.read_int(img)
         if pytesseract is None:
             return None
-        # Preprocesado ligero para numeros blancos/amarillos sobre fondos claros
-        gray = img.convert("L")
-        # Invertir si fondo claro
-        arr = np.array(gray)
-        if arr.mean() > 128:
-            arr = 255 - arr
-        # Binariza
-        arr = (arr > 120).astype(np.uint8) * 255
+        # Numeros blancos/amarillos: gris, invertido si el fondo es claro, binarizado
+        arr = binarize(img).astype(np.uint8) * 255
         try:
             text = pytesseract.image_to_string(arr, config="--psm 7 -c tessedit_char_whitelist=0123456789")
             digits = "".join(ch for ch in text if ch.isdigit())
@@ -91,21 +125,36 @@ class HUDReader:
             return None
         return None
 
+    @timed("hud_reader.ocr")
+    def _ocr_round(self, img: Image.Image) -> Optional[str]:
+        """Etiqueta de ronda tal cual se ve ("II-3", como la pide el prompt) con las plantillas."""
+        if self.digits is None:
+            return None
+        text = self.digits.read(img)
+        return text if text and glyphs_to_round(text) else None
+
     def _ask_multi(self, crops: Dict[str, Image.Image]) -> Dict:
-        """Una sola llamada con 4 recortes."""
-        content = [
-            {
-                "type": "text",
-                "text": (
-                    "Recibes 4 imagenes: round_box, level_box, gold_box, shop_box. "
-                    "Devuelve SOLO un JSON valido con las claves: "
-                    "{\"round_label\": string|null, \"nivel_tablero\": int|null, "
-                    "\"oro\": int|null, \"tienda_abierta\": true|false}. "
-                    "round_label es texto tipo I-1/I-2; nivel_tablero es el numero blanco del orbe azul; "
-                    "oro es el numero grande en la moneda amarilla; tienda_abierta es true si la tienda con 5 cartas y botones de oro esta visible."
-                ),
-            }
-        ]
+        """Una sola llamada con los recortes recibidos (hasta 4)."""
+        prompt = (
+            f"Recibes {len(crops)} imagenes: {', '.join(crops)}. "
+            "Devuelve SOLO un JSON valido con las claves: "
+            "{\"round_label\": string|null, \"nivel_tablero\": int|null, "
+            "\"oro\": int|null, \"tienda_abierta\": true|false}. "
+            "round_label es texto tipo I-1/I-2; nivel_tablero es el numero blanco del orbe azul; "
+            "oro es el numero grande en la moneda amarilla; tienda_abierta es true si la tienda con 5 cartas y botones de oro esta visible."
+        )
+        if self.cache is None:
+            return self._request(prompt, crops)
+        return self.cache.get_or_call(
+            list(crops.values()),
+            prompt + self.payload.label(),
+            self.model,
+            lambda: self._request(prompt, crops),
+            cacheable=has_fields(RESPONSE_FIELDS) if self.streaming else None,
+        )
+
+    def _request(self, prompt: str, crops: Dict[str, Image.Image]) -> Dict:
+        content = [{"type": "text", "text": prompt}]
 
         for name, img in crops.items():
             mime, b64 = self._encode_image(img)
@@ -117,12 +166,25 @@ class HUDReader:
                 }
             )
 
-        resp = self.client.chat.completions.create(
-            model=self.model,
-            temperature=0.0,
-            messages=[{"role": "user", "content": content}],
-        )
-        raw = resp.choices[0].message.content or ""
+        if self.streaming:
+            with span("hud_reader.http"):
+                return stream_json(
+                    self.gateway,
+                    required=RESPONSE_FIELDS,
+                    deadline_s=self.stream_deadline_s,
+                    metric="hud_reader.stream",
+                    model=self.model,
+                    temperature=0.0,
+                    messages=[{"role": "user", "content": content}],
+                )
+
+        with span("hud_reader.http"):
+            resp = self.gateway.chat(
+                model=self.model,
+                temperature=0.0,
+                messages=[{"role": "user", "content": content}],
+            )
+        raw = message_text(resp)
         text = raw.strip()
         if text.startswith("```"):
             lines = text.splitlines()
@@ -184,25 +246,57 @@ class HUDReader:
         img.save(out_path)
         return str(out_path)
 
+    @timed("hud_reader.read")
     def read(self, frame: np.ndarray) -> HUDReadout:
-        crops = {
-            "round_box": self._crop(frame, ROUND_BOX),
-            "level_box": self._crop(frame, LEVEL_BOX),
-            "gold_box": self._crop(frame, GOLD_BOX),
-            "shop_box": self._crop(frame, SHOP_DETECT_BOX),
-        }
-        result = self._ask_multi(crops)
+        check = self.change_detector.check(frame) if self.change_detector else None
+        if check is not None and check.all_unchanged():
+            # Nada cambio en el HUD: sin VLM ni OCR.
+            return self._readout_from(self.change_detector.cached_values(), None)
 
+        names = [n for n in CROP_BOXES if check is None or check.is_changed(n)]
+        values, result = self._read_crops(frame, names)
         debug_path = self._save_debug(frame, result)
 
+        if check is not None:
+            values = check.merge(values)
+            # Solo se cachean lecturas validas; un null se vuelve a intentar.
+            self.change_detector.commit(
+                check, {k: v for k, v in values.items() if v is not None}
+            )
+        return self._readout_from(values, debug_path or None)
+
+    def read_crops(self, frame: np.ndarray, names) -> Dict:
+        """
+        Lee solo los recortes `names` (claves de CROP_BOXES) en una llamada,
+        sin caché por ROI. Lo usa core/hud_cascade.py para los campos en
+        los que el modelo local duda.
+        """
+        values, _ = self._read_crops(frame, [n for n in CROP_BOXES if n in names])
+        return values
+
+    def _read_crops(self, frame: np.ndarray, names) -> Tuple[Dict, Dict]:
+        crops = {n: self._crop(frame, CROP_BOXES[n]) for n in names}
+        result = self._ask_multi(crops)
+
         # OCR preferente para oro y nivel si disponible
-        ocr_oro = self._ocr_digits(crops["gold_box"]) if self.use_ocr_numbers else None
-        ocr_nivel = self._ocr_digits(crops["level_box"]) if self.use_ocr_numbers else None
+        ocr_oro = self._ocr_digits(crops["gold_box"]) if self.use_ocr_numbers and "gold_box" in crops else None
+        ocr_nivel = self._ocr_digits(crops["level_box"]) if self.use_ocr_numbers and "level_box" in crops else None
+        ocr_ronda = self._ocr_round(crops["round_box"]) if self.use_ocr_numbers and "round_box" in crops else None
 
+        values = {
+            "round_box": ocr_ronda if ocr_ronda is not None else result.get("round_label"),
+            "level_box": ocr_nivel if ocr_nivel is not None else result.get("nivel_tablero"),
+            "gold_box": ocr_oro if ocr_oro is not None else result.get("oro"),
+            "shop_box": bool(result.get("tienda_abierta", False)),
+        }
+        return {n: values[n] for n in names}, result
+
+    @staticmethod
+    def _readout_from(values: Dict, debug_path: Optional[str]) -> HUDReadout:
         return HUDReadout(
-            round_label=result.get("round_label"),
-            nivel_tablero=ocr_nivel if ocr_nivel is not None else result.get("nivel_tablero"),
-            oro=ocr_oro if ocr_oro is not None else result.get("oro"),
-            tienda_abierta=bool(result.get("tienda_abierta", False)),
-            debug_path=debug_path or None,
+            round_label=values.get("round_box"),
+            nivel_tablero=values.get("level_box"),
+            oro=values.get("gold_box"),
+            tienda_abierta=bool(values.get("shop_box", False)),
+            debug_path=debug_path,
         )
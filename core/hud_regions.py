@@ -0,0 +1,47 @@
+# core/hud_regions.py
+"""
+Regiones fijas del HUD (coordenadas normalizadas x1, y1, x2, y2 para 1920x1080)
+y helpers de recorte sobre arrays. Sin dependencias pesadas para que las usen
+tanto los lectores VLM como el modelo local.
+"""
+
+from __future__ import annotations
+
+from typing import Dict, Tuple
+
+import numpy as np
+
+Box = Tuple[float, float, float, float]
+
+# Ajustadas con las capturas de referencia.
+ROUND_BOX = (0.32, 0.01, 0.36, 0.04)        # barra superior I-1/I-2 (a la izq. del timer verde)
+LEVEL_BOX = (0.01, 0.86, 0.07, 0.91)        # orbe azul abajo-izquierda (nivel)
+GOLD_BOX = (0.90, 0.83, 0.99, 0.90)         # moneda grande abajo-derecha (recortado izq/alto)
+SHOP_DETECT_BOX = (0.03, 0.15, 0.97, 0.60)  # banda donde aparece la tienda
+PLAYERS_BOX = (0.80, 0.07, 0.95, 0.75)      # lista de jugadores/vidas a la derecha
+HP_ONLY_BOX = (0.87, 0.07, 0.95, 0.75)      # columna de corazones
+BOARD_BOX = (0.18, 0.15, 0.82, 0.92)        # tablero y banquillo
+SYNERGY_BOX = (0.04, 0.08, 0.16, 0.58)      # panel de sinergias a la izquierda
+
+# Campo del HUD -> region de la que sale su lectura.
+HUD_FIELD_BOXES: Dict[str, Box] = {
+    "round": ROUND_BOX,
+    "level": LEVEL_BOX,
+    "gold": GOLD_BOX,
+    "hp_self": HP_ONLY_BOX,
+}
+
+
+def box_to_pixels(box: Box, width: int, height: int) -> Tuple[int, int, int, int]:
+    """Convierte una caja normalizada a (left, top, right, bottom) en pixeles."""
+    x1, y1, x2, y2 = box
+    left, top = max(0, int(x1 * width)), max(0, int(y1 * height))
+    right, bottom = min(width, int(x2 * width)), min(height, int(y2 * height))
+    return left, top, right, bottom
+
+
+def crop_box(frame: np.ndarray, box: Box) -> np.ndarray:
+    """Recorta una region del frame (vista, sin copiar)."""
+    h, w = frame.shape[:2]
+    left, top, right, bottom = box_to_pixels(box, w, h)
+    return frame[top:bottom, left:right]
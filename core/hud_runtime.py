@@ -0,0 +1,208 @@
+# core/hud_runtime.py
+"""
+Runtimes de inferencia del modelo HUD local.
+
+HUDLocalReader elige el runtime por la extensión del archivo de pesos:
+
+  .pt    checkpoint de train_hud_model.py, PyTorch eager (el modelo "frame"
+         importa torchvision salvo con el backbone "tiny")
+  .ts    TorchScript exportado por tools/export_hud_model.py: fp32 o int8,
+         opcionalmente channels-last
+  .onnx  ONNX Runtime (onnxruntime es opcional), fp32 o int8
+
+Los artefactos exportados llevan dentro los metadatos del checkpoint
+(round_vocab, temperatures, model_type, backbone, input_size, roi_sizes,
+num_classes) y se cargan
+sin torchvision ni el código de models/. Todos los runtimes reciben el
+lote de to_tensor + stack_inputs y devuelven {cabeza: logits (N, C)}.
+
+    runtime = load_runtime("hud_model.int8.ts")
+    logits = runtime(x)                       # {"round": ..., "level": ..., ...}
+"""
+
+from __future__ import annotations
+
+import json
+from pathlib import Path
+from typing import Any, Dict, List, Mapping, Tuple
+
+import torch
+import torch.nn as nn
+
+HEADS = ("round", "level", "gold", "hp_self")
+# Salidas del .onnx (las entradas de un modelo roi ya se llaman como las cabezas).
+ONNX_OUTPUTS = tuple(f"{head}_logits" for head in HEADS)
+
+# Checkpoints anteriores a "num_classes" tenían 10 niveles.
+LEGACY_NUM_CLASSES = {"level": 10, "gold": 101, "hp_self": 101}
+
+# Claves del checkpoint que viajan con el artefacto exportado.
+META_KEYS = ("model_type", "backbone", "input_size", "num_classes", "round_vocab", "temperatures", "roi_sizes")
+# Nombre del JSON de metadatos (extra file de TorchScript / metadata_props de ONNX).
+META_NAME = "hud_meta.json"
+
+TORCHSCRIPT_SUFFIXES = (".ts", ".torchscript")
+ONNX_SUFFIXES = (".onnx",)
+
+
+def checkpoint_meta(ckpt: Mapping[str, Any]) -> Dict[str, Any]:
+    """Metadatos de un checkpoint de train_hud_model.py, con los valores por defecto de los antiguos."""
+    meta = {key: ckpt[key] for key in META_KEYS if ckpt.get(key) is not None}
+    meta.setdefault("model_type", "frame")
+    meta.setdefault("num_classes", dict(LEGACY_NUM_CLASSES))
+    meta.setdefault("temperatures", {})
+    if meta["model_type"] == "frame":
+        from models.hud_model import BACKBONES, DEFAULT_BACKBONE
+
+        # Checkpoints sin "backbone" son ResNet18 a 224x224.
+        meta.setdefault("backbone", DEFAULT_BACKBONE)
+        meta.setdefault("input_size", list(BACKBONES[meta["backbone"]].input_size))
+    return meta
+
+
+def input_names(meta: Mapping[str, Any]) -> List[str]:
+    """Entradas posicionales del artefacto: "image", o una por región en modelos roi."""
+    if meta.get("model_type") == "roi":
+        from models.hud_roi_model import ROI_SIZES
+
+        return list(meta.get("roi_sizes") or ROI_SIZES)
+    return ["image"]
+
+
+def flatten_inputs(x: Any, names: List[str]) -> Tuple[torch.Tensor, ...]:
+    if isinstance(x, Mapping):
+        return tuple(x[name] for name in names)
+    return (x,)
+
+
+class ExportWrapper(nn.Module):
+    """Entradas posicionales y salida en tupla (orden HEADS), que es lo que aceptan trace y ONNX."""
+
+    def __init__(self, model: nn.Module, names: List[str]) -> None:
+        super().__init__()
+        self.model = model
+        self.names = names
+
+    def forward(self, *inputs: torch.Tensor) -> Tuple[torch.Tensor, ...]:
+        x = inputs[0] if self.names == ["image"] else dict(zip(self.names, inputs))
+        out = self.model(x)
+        return tuple(out[head] for head in HEADS)
+
+
+def build_model(meta: Mapping[str, Any]) -> nn.Module:
+    """Modelo eager con la forma que describe `meta`, sin pesos preentrenados (vienen del checkpoint)."""
+    num_classes = meta["num_classes"]
+    kwargs = dict(
+        num_round_classes=len(meta["round_vocab"]),
+        num_level_classes=num_classes["level"],
+        num_gold_classes=num_classes["gold"],
+        num_hp_classes=num_classes["hp_self"],
+    )
+    if meta["model_type"] == "roi":
+        from models.hud_roi_model import HUDRoiModel
+
+        return HUDRoiModel(**kwargs)
+    from models.hud_model import HUDModel
+
+    return HUDModel(**kwargs, backbone=meta["backbone"], pretrained=False)
+
+
+def load_checkpoint(path: Path | str) -> Tuple[nn.Module, Dict[str, Any]]:
+    """Checkpoint .pt -> (modelo eager en eval, metadatos)."""
+    ckpt = torch.load(path, map_location="cpu")
+    meta = checkpoint_meta(ckpt)
+    model = build_model(meta)
+    model.load_state_dict(ckpt["model_state_dict"])
+    model.eval()
+    return model, meta
+
+
+class HUDRuntime:
+    backend = "base"
+
+    def __init__(self, meta: Dict[str, Any], device: str = "cpu") -> None:
+        self.meta = meta
+        self.device = device
+        self.names = input_names(meta)
+
+    def __call__(self, x: Any) -> Dict[str, torch.Tensor]:
+        raise NotImplementedError
+
+    def describe(self) -> Dict[str, Any]:
+        return {
+            "backend": self.backend,
+            "model_type": self.meta["model_type"],
+            "quantization": self.meta.get("quantization", "none"),
+            "channels_last": bool(self.meta.get("channels_last", False)),
+            "device": self.device,
+        }
+
+
+class EagerRuntime(HUDRuntime):
+    backend = "eager"
+
+    def __init__(self, path: Path | str, device: str | None = None) -> None:
+        model, meta = load_checkpoint(path)
+        super().__init__(meta, device or ("cuda" if torch.cuda.is_available() else "cpu"))
+        self.model = model.to(self.device)
+
+    def __call__(self, x: Any) -> Dict[str, torch.Tensor]:
+        from models.hud_roi_model import to_device
+
+        with torch.no_grad():
+            return self.model(to_device(x, self.device))
+
+
+class TorchScriptRuntime(HUDRuntime):
+    backend = "torchscript"
+
+    def __init__(self, path: Path | str, device: str | None = None) -> None:
+        extra = {META_NAME: ""}
+        module = torch.jit.load(str(path), map_location="cpu", _extra_files=extra)
+        meta = json.loads(extra[META_NAME])
+        engine = meta.get("qengine")
+        if engine and engine in torch.backends.quantized.supported_engines:
+            torch.backends.quantized.engine = engine
+        # Los kernels int8 son solo de CPU.
+        if meta.get("quantization", "none") != "none":
+            device = "cpu"
+        super().__init__(meta, device or "cpu")
+        self.module = module.to(self.device).eval()
+        self.memory_format = torch.channels_last if meta.get("channels_last") else torch.contiguous_format
+
+    def __call__(self, x: Any) -> Dict[str, torch.Tensor]:
+        inputs = [
+            t.to(self.device).contiguous(memory_format=self.memory_format) for t in flatten_inputs(x, self.names)
+        ]
+        with torch.no_grad():
+            outputs = self.module(*inputs)
+        return dict(zip(HEADS, outputs))
+
+
+class OnnxRuntime(HUDRuntime):
+    backend = "onnx"
+
+    def __init__(self, path: Path | str, device: str | None = None) -> None:
+        try:
+            import onnxruntime as ort
+        except ImportError as err:
+            raise ImportError("Para cargar un .onnx hace falta onnxruntime (pip install onnxruntime)") from err
+
+        self.session = ort.InferenceSession(str(path), providers=["CPUExecutionProvider"])
+        meta = json.loads(self.session.get_modelmeta().custom_metadata_map[META_NAME])
+        super().__init__(meta, "cpu")
+
+    def __call__(self, x: Any) -> Dict[str, torch.Tensor]:
+        feed = {name: t.cpu().numpy() for name, t in zip(self.names, flatten_inputs(x, self.names))}
+        outputs = self.session.run(list(ONNX_OUTPUTS), feed)
+        return {head: torch.from_numpy(out) for head, out in zip(HEADS, outputs)}
+
+
+def load_runtime(path: Path | str, device: str | None = None) -> HUDRuntime:
+    """Runtime según la extensión de `path` (ver docstring del módulo)."""
+    suffix = Path(path).suffix.lower()
+    if suffix in TORCHSCRIPT_SUFFIXES:
+        return TorchScriptRuntime(path, device)
+    if suffix in ONNX_SUFFIXES:
+        return OnnxRuntime(path, device)
+    return EagerRuntime(path, device)
@@ -0,0 +1,179 @@
+# core/json_stream.py
+"""
+Lectura incremental del JSON que devuelven los VLM en modo streaming.
+
+Los modelos verbosos siguen generando después de cerrar el objeto (o se
+enrollan con campos que no pedimos), y sin streaming hay que esperar al
+último token antes de hacer json.loads. Aquí se consume el stream SSE de
+/v1/chat/completions (APIGateway.chat_stream) con un parser que sigue la
+profundidad de llaves y corta en cuanto:
+
+  - el objeto raíz se cierra, o
+  - todos los campos `required` de primer nivel ya tienen valor completo, o
+  - se agota `deadline_s`: se devuelven los campos completos hasta ese
+    momento (un campo a medio escribir se descarta).
+
+Cerrar la conexión HTTP hace que LM Studio / NIM / vLLM dejen de generar.
+
+    from core.json_stream import stream_json
+
+    data = stream_json(gw, required=("oro", "nivel"), deadline_s=4.0,
+                       model=..., messages=[...], max_tokens=512)
+"""
+
+from __future__ import annotations
+
+import json
+import time
+from typing import Any, Callable, Dict, Optional, Sequence
+
+import requests
+
+from core.metrics import METRICS
+
+
+class IncrementalJSONObject:
+    """
+    Sigue un objeto JSON que llega por trozos. Ignora el texto previo a la
+    primera '{' (fences ```json, frases de cortesía) y recuerda dónde acaba
+    cada miembro de primer nivel para poder parsear el prefijo completo.
+    """
+
+    def __init__(self) -> None:
+        self.buffer = ""
+        self.closed = False
+        self._pos = 0
+        self._start = -1
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._last_member_end = -1   # índice de la ',' de primer nivel más reciente
+        self._members = 0            # miembros completos ya vistos
+        self._parsed_members = -1
+        self._parsed: Dict[str, Any] = {}
+
+    def feed(self, text: str) -> bool:
+        """Añade texto. Devuelve True cuando el objeto raíz ya está cerrado."""
+        if self.closed or not text:
+            return self.closed
+        self.buffer += text
+        buf = self.buffer
+        i = self._pos
+        n = len(buf)
+        while i < n:
+            ch = buf[i]
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+            elif self._start < 0:
+                if ch == "{":
+                    self._start = i
+                    self._depth = 1
+            elif ch == '"':
+                self._in_string = True
+            elif ch in "{[":
+                self._depth += 1
+            elif ch in "}]":
+                self._depth -= 1
+                if self._depth == 0:
+                    self.closed = True
+                    self._pos = i + 1
+                    self.buffer = buf[: i + 1]
+                    return True
+            elif ch == "," and self._depth == 1:
+                self._last_member_end = i
+                self._members += 1
+            i += 1
+        self._pos = n
+        return False
+
+    def value(self) -> Optional[Dict[str, Any]]:
+        """El objeto completo si ya se cerró y es JSON válido."""
+        if not self.closed:
+            return None
+        try:
+            data = json.loads(self.buffer[self._start :])
+        except json.JSONDecodeError:
+            return None
+        return data if isinstance(data, dict) else None
+
+    def partial(self) -> Dict[str, Any]:
+        """Miembros de primer nivel ya completos (todos si el objeto se cerró)."""
+        full = self.value()
+        if full is not None:
+            return full
+        if self._last_member_end < 0:
+            return {}
+        if self._parsed_members != self._members:
+            try:
+                data = json.loads(self.buffer[self._start : self._last_member_end] + "}")
+                self._parsed = data if isinstance(data, dict) else {}
+            except json.JSONDecodeError:
+                self._parsed = {}
+            self._parsed_members = self._members
+        return dict(self._parsed)
+
+    def has_fields(self, required: Sequence[str]) -> bool:
+        if not required:
+            return False
+        if self.closed:
+            return True
+        if self._last_member_end < 0:
+            return False
+        done = self.partial()
+        return all(k in done for k in required)
+
+
+def has_fields(required: Sequence[str]) -> Callable[[Any], bool]:
+    """Predicado para VLMResponseCache.get_or_call: no cachear respuestas parciales."""
+    return lambda value: isinstance(value, dict) and all(k in value for k in required)
+
+
+def stream_json(
+    gateway: Any,
+    *,
+    required: Sequence[str] = (),
+    deadline_s: Optional[float] = None,
+    metric: str = "",
+    **chat_kwargs: Any,
+) -> Dict[str, Any]:
+    """
+    Pide `chat_kwargs` a `gateway` en streaming y devuelve el objeto JSON
+    de la respuesta en cuanto está listo (ver docstring del módulo). {} si
+    no llegó ningún campo completo.
+    """
+    parser = IncrementalJSONObject()
+    t0 = time.perf_counter()
+    deadline = t0 + deadline_s if deadline_s and deadline_s > 0 else None
+    if deadline_s and deadline_s > 0:
+        # Ningún read debe bloquear más allá del deadline.
+        chat_kwargs.setdefault("timeout", deadline_s)
+
+    reason = "eof"
+    stream = gateway.chat_stream(**chat_kwargs)
+    try:
+        for delta in stream:
+            if parser.feed(delta):
+                reason = "closed"
+                break
+            if parser.has_fields(required):
+                reason = "required"
+                break
+            if deadline is not None and time.perf_counter() >= deadline:
+                reason = "deadline"
+                break
+    except requests.exceptions.Timeout:
+        if not parser.partial():
+            raise
+        reason = "deadline"
+    finally:
+        # Cierra la respuesta HTTP: el servidor deja de generar.
+        stream.close()
+
+    if metric:
+        METRICS.observe(f"{metric}.{reason}", time.perf_counter() - t0)
+    return parser.partial()
@@ -4,6 +4,7 @@ from pathlib import Path
 from typing import Optional, Dict, Any, List
 
 from config import DB_PATH
+from core.metrics import timed
 
 
 class KnowledgeBase:
@@ -116,6 +117,7 @@ class KnowledgeBase:
         """, (posicion, vida, match_id))
         self.conn.commit()
 
+    @timed("kb.add_round")
     def add_round(self, match_id: int, ronda: int, fase: str,
                   game_state_json: str,
                   recomendaciones_json: str,
@@ -10,6 +10,7 @@ from typing import List, Any
 
 import torch
 
+from core.metrics import timed
 from core.policy_network import PolicyNetwork, ACTIONS as DEFAULT_ACTIONS
 
 
@@ -53,6 +54,7 @@ class LearnedPolicy:
         model.eval()
         return model
 
+    @timed("policy.learned")
     def choose_action(self, state_vector: List[float]) -> str:
         state = torch.tensor(
             state_vector, dtype=torch.float32, device=self.device
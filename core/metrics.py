@@ -0,0 +1,229 @@
+# core/metrics.py
+"""
+Instrumentación ligera de latencias por etapa.
+
+    from core.metrics import span, timed
+
+    with span("vlm.http"):
+        resp = requests.post(...)
+
+    @timed("reward.compute")
+    def compute_reward(...): ...
+
+Cada nombre mantiene un histograma con las últimas N muestras (p50/p95/p99)
+y contadores totales. Si METRICS_ENABLED está activo, el snapshot se añade
+periódicamente como una línea a METRICS_PATH (JSONL).
+
+Además de latencias hay contadores (incr) y valores instantáneos
+(set_gauge), p.ej. estado de un circuit breaker o número de fallbacks; van
+en la misma línea JSONL bajo "counters" y "gauges".
+
+Con las métricas desactivadas, span() devuelve un context manager vacío
+compartido y timed() solo añade una comprobación de un booleano.
+"""
+
+from __future__ import annotations
+
+import functools
+import json
+import math
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Deque, Dict, Optional, Sequence, TypeVar
+
+from config import METRICS_DUMP_SECONDS, METRICS_ENABLED, METRICS_PATH, METRICS_WINDOW
+
+F = TypeVar("F", bound=Callable[..., Any])
+
+
+def percentile(values: Sequence[float], q: float) -> float:
+    """Percentil q (0-100) con interpolación lineal; 0.0 si no hay datos."""
+    if not values:
+        return 0.0
+    data = sorted(values)
+    k = (len(data) - 1) * q / 100.0
+    lo, hi = math.floor(k), math.ceil(k)
+    if lo == hi:
+        return float(data[int(k)])
+    return float(data[lo] + (data[hi] - data[lo]) * (k - lo))
+
+
+class RollingHistogram:
+    """Ventana de las últimas `window` muestras (en segundos) + totales."""
+
+    def __init__(self, window: int = 1000) -> None:
+        self._samples: Deque[float] = deque(maxlen=window)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, value: float) -> None:
+        self._samples.append(value)
+        self.count += 1
+        self.total += value
+        if value > self.max:
+            self.max = value
+
+    def summary(self) -> Dict[str, float]:
+        ms = [v * 1000.0 for v in self._samples]
+        return {
+            "count": self.count,
+            "mean_ms": round(self.total * 1000.0 / self.count, 3) if self.count else 0.0,
+            "p50_ms": round(percentile(ms, 50), 3),
+            "p95_ms": round(percentile(ms, 95), 3),
+            "p99_ms": round(percentile(ms, 99), 3),
+            "max_ms": round(self.max * 1000.0, 3),
+        }
+
+
+class _NullSpan:
+    __slots__ = ()
+
+    def __enter__(self) -> "_NullSpan":
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        return None
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class _Span:
+    __slots__ = ("_metrics", "_name", "_t0")
+
+    def __init__(self, metrics: "Metrics", name: str) -> None:
+        self._metrics = metrics
+        self._name = name
+        self._t0 = 0.0
+
+    def __enter__(self) -> "_Span":
+        self._t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self._metrics.observe(self._name, time.perf_counter() - self._t0)
+
+
+class Metrics:
+    def __init__(
+        self,
+        enabled: bool = False,
+        path: str = "data/metrics.jsonl",
+        dump_every: float = 30.0,
+        window: int = 1000,
+    ) -> None:
+        self.enabled = enabled
+        self.path = Path(path)
+        self.dump_every = dump_every
+        self.window = window
+        self._hists: Dict[str, RollingHistogram] = {}
+        self._counters: Dict[str, int] = {}
+        self._gauges: Dict[str, float] = {}
+        self._lock = threading.Lock()
+        self._last_dump = time.monotonic()
+
+    def configure(
+        self,
+        enabled: Optional[bool] = None,
+        path: Optional[str] = None,
+        dump_every: Optional[float] = None,
+    ) -> None:
+        if enabled is not None:
+            self.enabled = enabled
+        if path is not None:
+            self.path = Path(path)
+        if dump_every is not None:
+            self.dump_every = dump_every
+
+    def span(self, name: str) -> Any:
+        if not self.enabled:
+            return _NULL_SPAN
+        return _Span(self, name)
+
+    def observe(self, name: str, seconds: float) -> None:
+        if not self.enabled:
+            return
+        with self._lock:
+            hist = self._hists.get(name)
+            if hist is None:
+                hist = self._hists[name] = RollingHistogram(self.window)
+            hist.add(seconds)
+            due = self.dump_every > 0 and time.monotonic() - self._last_dump >= self.dump_every
+        if due:
+            self.dump()
+
+    def incr(self, name: str, n: int = 1) -> None:
+        if not self.enabled:
+            return
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + n
+
+    def set_gauge(self, name: str, value: float) -> None:
+        if not self.enabled:
+            return
+        with self._lock:
+            self._gauges[name] = value
+
+    def snapshot(self) -> Dict[str, Dict[str, float]]:
+        with self._lock:
+            return {name: h.summary() for name, h in sorted(self._hists.items())}
+
+    def counters(self) -> Dict[str, Any]:
+        """{"counters": {...}, "gauges": {...}} actuales."""
+        with self._lock:
+            return {"counters": dict(sorted(self._counters.items())), "gauges": dict(sorted(self._gauges.items()))}
+
+    def dump(self) -> None:
+        """Añade el snapshot actual como una línea JSONL."""
+        with self._lock:
+            self._last_dump = time.monotonic()
+        spans = self.snapshot()
+        values = self.counters()
+        if not spans and not values["counters"] and not values["gauges"]:
+            return
+        record = {"ts": datetime.utcnow().isoformat() + "Z", "spans": spans, **values}
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self.path.open("a", encoding="utf-8") as f:
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+    def reset(self) -> None:
+        with self._lock:
+            self._hists.clear()
+            self._counters.clear()
+            self._gauges.clear()
+
+
+METRICS = Metrics(
+    enabled=METRICS_ENABLED,
+    path=METRICS_PATH,
+    dump_every=METRICS_DUMP_SECONDS,
+    window=METRICS_WINDOW,
+)
+
+
+def span(name: str) -> Any:
+    """Context manager que mide el bloque con el nombre dado."""
+    return METRICS.span(name)
+
+
+def timed(name: str) -> Callable[[F], F]:
+    """Decorador equivalente a envolver la función entera en span(name)."""
+
+    def deco(fn: F) -> F:
+        @functools.wraps(fn)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            if not METRICS.enabled:
+                return fn(*args, **kwargs)
+            t0 = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                METRICS.observe(name, time.perf_counter() - t0)
+
+        return wrapper  # type: ignore[return-value]
+
+    return deco
@@ -0,0 +1,167 @@
+# core/payload.py
+"""
+Preparación de las imágenes que se envían a los modelos de visión.
+
+Antes el frame completo (1920x1080) se mandaba como PNG sin tocar: varios MB
+de base64 por petición que hay que codificar, subir y que el servidor tiene
+que decodificar. Aquí se decide, de forma configurable:
+
+  - max_side: reducir el lado mayor (INTER_AREA) antes de codificar,
+  - codec: png | jpeg | webp, con su calidad / nivel de compresión,
+  - roi_composite: en vez del frame entero, un mosaico con solo las
+    regiones del HUD (cajas de core/hud_regions.py) apiladas en vertical.
+
+Los defaults (config.VLM_PAYLOAD_*) son sin pérdida; para elegir un ajuste
+con menos bytes usa benchmarks/bench_payload.py, que mide bytes por
+petición, latencia y la fidelidad de las ROIs del HUD.
+"""
+
+from __future__ import annotations
+
+import base64
+from dataclasses import dataclass, field
+from typing import Dict, Optional
+
+import cv2
+import numpy as np
+from PIL import Image
+
+from config import (
+    VLM_PAYLOAD_CODEC,
+    VLM_PAYLOAD_MAX_SIDE,
+    VLM_PAYLOAD_PNG_LEVEL,
+    VLM_PAYLOAD_QUALITY,
+    VLM_PAYLOAD_ROI_COMPOSITE,
+)
+from core.hud_regions import (
+    GOLD_BOX,
+    LEVEL_BOX,
+    PLAYERS_BOX,
+    ROUND_BOX,
+    SHOP_DETECT_BOX,
+    Box,
+    crop_box,
+)
+from core.metrics import timed
+
+_MIME = {
+    "png": ("image/png", ".png"),
+    "jpeg": ("image/jpeg", ".jpg"),
+    "jpg": ("image/jpeg", ".jpg"),
+    "webp": ("image/webp", ".webp"),
+}
+
+# Regiones del mosaico, en el orden en que se apilan.
+COMPOSITE_BOXES: Dict[str, Box] = {
+    "round": ROUND_BOX,
+    "level": LEVEL_BOX,
+    "gold": GOLD_BOX,
+    "players": PLAYERS_BOX,
+    "shop": SHOP_DETECT_BOX,
+}
+
+
+@dataclass
+class PayloadConfig:
+    max_side: int = VLM_PAYLOAD_MAX_SIDE          # 0 = sin reescalar
+    codec: str = VLM_PAYLOAD_CODEC                # png | jpeg | webp
+    quality: int = VLM_PAYLOAD_QUALITY            # jpeg / webp
+    png_level: int = VLM_PAYLOAD_PNG_LEVEL        # 0-9
+    roi_composite: bool = VLM_PAYLOAD_ROI_COMPOSITE
+    composite_boxes: Dict[str, Box] = field(default_factory=lambda: dict(COMPOSITE_BOXES))
+
+    def __post_init__(self) -> None:
+        self.codec = self.codec.lower()
+        if self.codec not in _MIME:
+            raise ValueError(f"Codec no soportado: {self.codec} (usa png, jpeg o webp)")
+
+    @property
+    def lossless(self) -> bool:
+        return self.codec == "png" and self.max_side <= 0 and not self.roi_composite
+
+    def label(self) -> str:
+        parts = ["roi" if self.roi_composite else "full", self.codec]
+        if self.codec == "png":
+            parts.append(f"l{self.png_level}")
+        else:
+            parts.append(f"q{self.quality}")
+        if self.max_side > 0:
+            parts.append(f"max{self.max_side}")
+        return "-".join(parts)
+
+
+@dataclass
+class EncodedImage:
+    mime: str
+    b64: str
+    width: int
+    height: int
+    nbytes: int     # bytes del archivo codificado (antes de base64)
+
+    @property
+    def data_url(self) -> str:
+        return f"data:{self.mime};base64,{self.b64}"
+
+
+def downscale(frame: np.ndarray, max_side: int) -> np.ndarray:
+    """Reduce el frame para que su lado mayor sea <= max_side (no amplía)."""
+    if max_side <= 0:
+        return frame
+    h, w = frame.shape[:2]
+    scale = max_side / float(max(h, w))
+    if scale >= 1.0:
+        return frame
+    size = (max(1, round(w * scale)), max(1, round(h * scale)))
+    return cv2.resize(frame, size, interpolation=cv2.INTER_AREA)
+
+
+def roi_composite(frame: np.ndarray, boxes: Dict[str, Box], gap: int = 4) -> np.ndarray:
+    """Apila en vertical los recortes de `boxes`, alineados a la izquierda, sobre fondo negro."""
+    crops = [crop_box(frame, box) for box in boxes.values()]
+    crops = [c for c in crops if c.size]
+    if not crops:
+        return frame
+    width = max(c.shape[1] for c in crops)
+    height = sum(c.shape[0] for c in crops) + gap * (len(crops) - 1)
+    canvas = np.zeros((height, width) + frame.shape[2:], dtype=frame.dtype)
+    y = 0
+    for c in crops:
+        canvas[y : y + c.shape[0], : c.shape[1]] = c
+        y += c.shape[0] + gap
+    return canvas
+
+
+@timed("payload.encode")
+def encode_image(frame_bgr: np.ndarray, cfg: Optional[PayloadConfig] = None) -> EncodedImage:
+    """Aplica mosaico/reescalado/codec a un frame BGR y lo devuelve en base64."""
+    cfg = cfg or PayloadConfig()
+    img = frame_bgr
+    if cfg.roi_composite:
+        img = roi_composite(img, cfg.composite_boxes)
+    img = downscale(img, cfg.max_side)
+
+    mime, ext = _MIME[cfg.codec]
+    if cfg.codec == "png":
+        params = [cv2.IMWRITE_PNG_COMPRESSION, int(cfg.png_level)]
+    elif cfg.codec == "webp":
+        params = [cv2.IMWRITE_WEBP_QUALITY, int(cfg.quality)]
+    else:
+        params = [cv2.IMWRITE_JPEG_QUALITY, int(cfg.quality)]
+    ok, buf = cv2.imencode(ext, np.ascontiguousarray(img), params)
+    if not ok:
+        raise RuntimeError(f"cv2.imencode falló ({cfg.codec})")
+    data = buf.tobytes()
+    h, w = img.shape[:2]
+    return EncodedImage(
+        mime=mime,
+        b64=base64.b64encode(data).decode("utf-8"),
+        width=w,
+        height=h,
+        nbytes=len(data),
+    )
+
+
+def encode_pil(img: Image.Image, cfg: Optional[PayloadConfig] = None) -> EncodedImage:
+    """Igual que encode_image para un recorte PIL en RGB."""
+    rgb = np.asarray(img.convert("RGB"))
+    return encode_image(np.ascontiguousarray(rgb[:, :, ::-1]), cfg)
@@ -0,0 +1,234 @@
+# core/pipeline.py
+"""
+Pipeline por etapas para el loop en tiempo real.
+
+Cada etapa corre en su propio hilo y se comunica con la siguiente mediante
+una cola acotada. Las colas de frames descartan el elemento más antiguo
+cuando se llenan (un frame viejo ya no sirve), así una etapa lenta no frena
+a la captura. Las colas de resultados bloquean para no perder transiciones.
+"""
+
+from __future__ import annotations
+
+import queue
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+# Centinela que recorre el pipeline para indicar fin de stream.
+STOP = object()
+
+
+class BoundedQueue:
+    """
+    Cola acotada con política configurable cuando está llena:
+    - drop_oldest=True : descarta el elemento más antiguo y encola el nuevo.
+    - drop_oldest=False: bloquea al productor hasta que haya hueco.
+    """
+
+    def __init__(self, maxsize: int, drop_oldest: bool = False) -> None:
+        self._q: "queue.Queue[Any]" = queue.Queue(maxsize=max(1, int(maxsize)))
+        self._lock = threading.Lock()
+        self.maxsize = max(1, int(maxsize))
+        self.drop_oldest = drop_oldest
+        self.dropped = 0
+
+    def put(self, item: Any) -> None:
+        # El centinela nunca se descarta ni se pierde.
+        if item is STOP or not self.drop_oldest:
+            self._q.put(item)
+            return
+        with self._lock:
+            while True:
+                try:
+                    self._q.put_nowait(item)
+                    return
+                except queue.Full:
+                    try:
+                        self._q.get_nowait()
+                        self.dropped += 1
+                    except queue.Empty:
+                        continue
+
+    def get(self, timeout: float | None = None) -> Any:
+        return self._q.get(timeout=timeout)
+
+    def depth(self) -> int:
+        return self._q.qsize()
+
+
+@dataclass
+class StageStats:
+    """Contadores de una etapa del pipeline."""
+
+    name: str
+    processed: int = 0
+    errors: int = 0
+    busy_s: float = 0.0
+    started_at: float = field(default_factory=time.monotonic)
+
+    def throughput(self) -> float:
+        elapsed = time.monotonic() - self.started_at
+        return self.processed / elapsed if elapsed > 0 else 0.0
+
+    def busy_ratio(self) -> float:
+        elapsed = time.monotonic() - self.started_at
+        return self.busy_s / elapsed if elapsed > 0 else 0.0
+
+
+class _Stage:
+    def __init__(
+        self,
+        name: str,
+        fn: Callable[[Any], Any],
+        in_q: BoundedQueue,
+        out_q: Optional[BoundedQueue],
+    ) -> None:
+        self.name = name
+        self.fn = fn
+        self.in_q = in_q
+        self.out_q = out_q
+        self.stats = StageStats(name=name)
+        self.thread = threading.Thread(target=self._run, name=f"stage-{name}", daemon=True)
+
+    def _run(self) -> None:
+        while True:
+            item = self.in_q.get()
+            if item is STOP:
+                if self.out_q is not None:
+                    self.out_q.put(STOP)
+                return
+            t0 = time.perf_counter()
+            try:
+                result = self.fn(item)
+            except Exception as err:
+                self.stats.errors += 1
+                print(f"[pipeline] Error en etapa {self.name}: {err}")
+                result = None
+            self.stats.busy_s += time.perf_counter() - t0
+            self.stats.processed += 1
+            # None = la etapa filtra el elemento (no produce salida)
+            if result is not None and self.out_q is not None:
+                self.out_q.put(result)
+
+
+class Pipeline:
+    """
+    Pipeline lineal: una fuente (iterable) seguida de N etapas.
+
+    Ejemplo:
+        pipe = Pipeline()
+        pipe.source("capture", frames)
+        pipe.stage("hud", read_fn, maxsize=2, drop_oldest=True)
+        pipe.stage("policy", policy_fn, maxsize=8)
+        pipe.run()
+    """
+
+    def __init__(self) -> None:
+        self._source_name: str = "source"
+        self._source: Optional[Iterable[Any]] = None
+        self._source_stats = StageStats(name="source")
+        self._stages: List[_Stage] = []
+        self._queues: List[BoundedQueue] = []
+        self._stop = threading.Event()
+
+    def source(self, name: str, iterable: Iterable[Any]) -> "Pipeline":
+        self._source_name = name
+        self._source = iterable
+        self._source_stats = StageStats(name=name)
+        return self
+
+    def stage(
+        self,
+        name: str,
+        fn: Callable[[Any], Any],
+        maxsize: int = 8,
+        drop_oldest: bool = False,
+    ) -> "Pipeline":
+        """Añade una etapa; `maxsize`/`drop_oldest` definen su cola de entrada."""
+        in_q = BoundedQueue(maxsize, drop_oldest=drop_oldest)
+        if self._stages:
+            self._stages[-1].out_q = in_q
+        self._queues.append(in_q)
+        self._stages.append(_Stage(name, fn, in_q, None))
+        return self
+
+    def stop(self) -> None:
+        """Pide a la fuente que deje de producir; las etapas vacían sus colas."""
+        self._stop.set()
+
+    @property
+    def stopped(self) -> bool:
+        return self._stop.is_set()
+
+    def report(self) -> Dict[str, Dict[str, Any]]:
+        """Throughput por etapa y profundidad/descartes de su cola de entrada."""
+        out: Dict[str, Dict[str, Any]] = {
+            self._source_name: {
+                "processed": self._source_stats.processed,
+                "fps": round(self._source_stats.throughput(), 2),
+            }
+        }
+        for st, q in zip(self._stages, self._queues):
+            out[st.name] = {
+                "processed": st.stats.processed,
+                "fps": round(st.stats.throughput(), 2),
+                "busy": round(st.stats.busy_ratio(), 3),
+                "errors": st.stats.errors,
+                "queue_depth": q.depth(),
+                "queue_max": q.maxsize,
+                "dropped": q.dropped,
+            }
+        return out
+
+    @staticmethod
+    def format_report(report: Dict[str, Dict[str, Any]]) -> str:
+        parts = []
+        for name, s in report.items():
+            txt = f"{name}: {s['fps']:.1f}/s"
+            if "queue_depth" in s:
+                txt += f" q={s['queue_depth']}/{s['queue_max']} drop={s['dropped']}"
+            parts.append(txt)
+        return " | ".join(parts)
+
+    def _produce(self) -> None:
+        first_q = self._queues[0]
+        try:
+            for item in self._source or []:
+                if self._stop.is_set():
+                    break
+                if item is None:
+                    continue
+                self._source_stats.processed += 1
+                first_q.put(item)
+        finally:
+            first_q.put(STOP)
+
+    def run(self, report_every: float = 0.0) -> Dict[str, Dict[str, Any]]:
+        """
+        Arranca todas las etapas y bloquea hasta que el stream termina.
+        Si report_every > 0 imprime el estado del pipeline cada N segundos.
+        """
+        if self._source is None or not self._stages:
+            raise RuntimeError("El pipeline necesita una fuente y al menos una etapa.")
+
+        for st in self._stages:
+            st.stats.started_at = time.monotonic()
+            st.thread.start()
+        self._source_stats.started_at = time.monotonic()
+        producer = threading.Thread(target=self._produce, name="stage-source", daemon=True)
+        producer.start()
+
+        last_report = time.monotonic()
+        try:
+            while self._stages[-1].thread.is_alive():
+                self._stages[-1].thread.join(timeout=0.2)
+                if report_every > 0 and time.monotonic() - last_report >= report_every:
+                    print("[pipeline] " + self.format_report(self.report()))
+                    last_report = time.monotonic()
+        except KeyboardInterrupt:
+            self.stop()
+            self._stages[-1].thread.join()
+        producer.join(timeout=1.0)
+        return self.report()
@@ -13,9 +13,11 @@ from __future__ import annotations
 
 from typing import Optional
 
+from core.metrics import timed
 from core.state import GameState
 
 
+@timed("reward.compute")
 def compute_reward(
     prev_state: GameState,
     new_state: GameState,
@@ -0,0 +1,158 @@
+# core/roi_change.py
+"""
+Detector de cambios por región del HUD.
+
+A 5 fps casi todos los frames consecutivos tienen la misma ronda, nivel, oro y
+vida. Para cada ROI se guarda una firma muy reducida (media por bloques de la
+región) y solo se vuelve a leer el campo si algún bloque cambia de forma
+apreciable. Si no cambia, se reutiliza la última lectura de ese campo.
+
+Uso típico:
+    check = detector.check(frame)
+    if check.all_unchanged():
+        return detector.cached_values()
+    values = leer(frame)                # inferencia real
+    values = check.merge(values)        # campos sin cambio -> valor previo
+    detector.commit(check, values)
+"""
+
+from __future__ import annotations
+
+from collections import Counter
+from typing import Any, Dict, Mapping, Optional, Set, Tuple
+
+import cv2
+import numpy as np
+
+from core.hud_regions import Box, crop_box
+
+
+class ROICheck:
+    """Resultado de comparar un frame contra las firmas guardadas."""
+
+    def __init__(
+        self,
+        detector: "ROIChangeDetector",
+        signatures: Dict[str, np.ndarray],
+        changed: Set[str],
+    ) -> None:
+        self._detector = detector
+        self.signatures = signatures
+        self.changed = changed
+
+    def all_unchanged(self) -> bool:
+        return not self.changed
+
+    def is_changed(self, field: str) -> bool:
+        return field in self.changed
+
+    def merge(self, values: Mapping[str, Any]) -> Dict[str, Any]:
+        """Sustituye los campos sin cambio por su lectura previa."""
+        out = dict(values)
+        for field in self.signatures:
+            if field not in self.changed and field in self._detector._values:
+                out[field] = self._detector._values[field]
+        return out
+
+
+class ROIChangeDetector:
+    def __init__(
+        self,
+        rois: Mapping[str, Box],
+        threshold: float = 12.0,
+        grid: Tuple[int, int] = (8, 24),
+    ) -> None:
+        """
+        rois: campo -> caja normalizada (ver core/hud_regions.py).
+        threshold: diferencia absoluta (escala 0-255) que debe superar algún
+            bloque para considerar la región cambiada. Se usa el máximo y no
+            la media para que un solo dígito distinto dispare la relectura.
+        grid: tamaño máximo (filas, columnas) de la firma por bloques.
+        """
+        self.rois: Dict[str, Box] = dict(rois)
+        self.threshold = float(threshold)
+        self.grid = grid
+        self._signatures: Dict[str, np.ndarray] = {}
+        self._values: Dict[str, Any] = {}
+        self.hits: Counter = Counter()
+        self.misses: Counter = Counter()
+        # frames en los que ninguna región cambió (inferencia evitada entera)
+        self.checks = 0
+        self.full_hits = 0
+
+    def _signature(self, frame: np.ndarray, box: Box) -> np.ndarray:
+        crop = crop_box(frame, box)
+        if crop.ndim == 3:
+            crop = crop[:, :, :3]
+        h, w = crop.shape[:2]
+        if h == 0 or w == 0:
+            return np.zeros((0, 0), dtype=np.int16)
+        size = (min(w, self.grid[1]), min(h, self.grid[0]))
+        small = cv2.resize(np.ascontiguousarray(crop), size, interpolation=cv2.INTER_AREA)
+        if small.ndim == 3:
+            # suma de canales en int16: barato y suficiente para detectar cambios
+            return small.astype(np.int16).sum(axis=2)
+        return small.astype(np.int16) * 3
+
+    def check(self, frame: np.ndarray) -> ROICheck:
+        signatures: Dict[str, np.ndarray] = {}
+        changed: Set[str] = set()
+        for field, box in self.rois.items():
+            sig = self._signature(frame, box)
+            signatures[field] = sig
+            prev = self._signatures.get(field)
+            if prev is None or prev.shape != sig.shape or field not in self._values:
+                changed.add(field)
+            else:
+                diff = np.abs(sig - prev).max(initial=0) / 3.0
+                if diff > self.threshold:
+                    changed.add(field)
+            if field in changed:
+                self.misses[field] += 1
+            else:
+                self.hits[field] += 1
+        self.checks += 1
+        if not changed:
+            self.full_hits += 1
+        return ROICheck(self, signatures, changed)
+
+    def commit(self, check: ROICheck, values: Mapping[str, Any]) -> None:
+        """
+        Guarda firma y valor de los campos que se acaban de leer. Las firmas
+        de campos sin cambio no se actualizan, así una deriva lenta acaba
+        disparando una relectura.
+        """
+        for field in check.changed:
+            if field in values:
+                self._signatures[field] = check.signatures[field]
+                self._values[field] = values[field]
+
+    def cached_values(self) -> Dict[str, Any]:
+        return dict(self._values)
+
+    def cached(self, field: str, default: Optional[Any] = None) -> Any:
+        return self._values.get(field, default)
+
+    def reset(self) -> None:
+        self._signatures.clear()
+        self._values.clear()
+
+    def hit_rate(self) -> float:
+        total = sum(self.hits.values()) + sum(self.misses.values())
+        return sum(self.hits.values()) / total if total else 0.0
+
+    def stats(self) -> Dict[str, Any]:
+        per_field = {}
+        for field in self.rois:
+            h, m = self.hits[field], self.misses[field]
+            per_field[field] = {
+                "hits": h,
+                "misses": m,
+                "hit_rate": round(h / (h + m), 3) if (h + m) else 0.0,
+            }
+        return {
+            "hit_rate": round(self.hit_rate(), 3),
+            "frames": self.checks,
+            "skipped_inferences": self.full_hits,
+            "fields": per_field,
+        }
@@ -0,0 +1,259 @@
+# core/round_events.py
+"""
+Motor de eventos de partida a partir de señales baratas del HUD.
+
+En lugar de llamar al VLM con el frame completo cada X segundos, se vigilan
+señales que cuestan casi nada por frame (etiqueta de ronda y vida del modelo
+local o de las plantillas de dígitos, o cambios de píxeles en las ROIs si no
+hay ninguno de los dos) y se emiten eventos tipados:
+
+    NEW_ROUND     cambia la etiqueta de ronda (estable N frames)
+    SHOP_OPENED   la banda de la tienda deja de mostrar el tablero (estable N frames)
+    COMBAT_ENDED  baja la vida tras un combate
+
+Solo NEW_ROUND y SHOP_OPENED necesitan un análisis completo con VLM; el
+resto se resuelve con las propias señales.
+"""
+
+from __future__ import annotations
+
+import time
+from dataclasses import dataclass, field
+from enum import Enum
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from config import HUD_DIGIT_MIN_SCORE, HUD_DIGIT_TEMPLATES
+from core.digit_ocr import DigitRecognizer
+from core.hud_regions import HP_ONLY_BOX, ROUND_BOX, SHOP_DETECT_BOX, crop_box
+from core.roi_change import ROIChangeDetector
+
+
+class EventType(str, Enum):
+    NEW_ROUND = "new_round"
+    SHOP_OPENED = "shop_opened"
+    COMBAT_ENDED = "combat_ended"
+
+
+# Eventos que justifican un análisis completo (VLM) del frame.
+EVENTS_NEEDING_VLM = frozenset({EventType.NEW_ROUND, EventType.SHOP_OPENED})
+
+
+@dataclass
+class GameEvent:
+    type: EventType
+    t: float
+    round_label: Optional[str] = None
+    data: Dict[str, Any] = field(default_factory=dict)
+
+    @property
+    def needs_vlm(self) -> bool:
+        return self.type in EVENTS_NEEDING_VLM
+
+
+@dataclass
+class HUDSignals:
+    """
+    Señales baratas de un frame. Los valores exactos (round_label, hp_self)
+    vienen del modelo HUD local o de las plantillas de dígitos; los flags
+    *_changed vienen de la detección de cambios por ROI y se usan cuando no
+    hay valores. round_changed solo se activa cuando la ROI de la ronda se
+    ha quedado estable con un contenido distinto del último aceptado.
+    shop_covered: la banda de la tienda no muestra el tablero (None = sin leer).
+    """
+
+    round_label: Optional[str] = None
+    hp_self: Optional[int] = None
+    round_changed: bool = False
+    hp_changed: bool = False
+    shop_covered: Optional[bool] = None
+
+
+class CheapSignalReader:
+    """Obtiene HUDSignals de un frame BGR sin llamar a ningún modelo remoto."""
+
+    def __init__(
+        self,
+        hud_reader: Any | None = None,
+        digit_templates: str | None = HUD_DIGIT_TEMPLATES,
+        round_debounce_frames: int = 2,
+        board_visible_min: float = 0.5,
+        board_covered_max: float = 0.35,
+    ) -> None:
+        """
+        hud_reader: HUDLocalReader opcional (predict_from_array). Su propia
+            caché por ROI hace que repetir frames casi no cueste.
+        digit_templates: plantillas de core/digit_ocr.py; sin hud_reader
+            leen la etiqueta de ronda (<1 ms) en lugar de mirar píxeles.
+        round_debounce_frames: frames que la ROI de la ronda debe quedarse
+            estable y distinta de la aceptada para contar como cambio (un
+            corte de cámara o una animación de un frame no es ronda nueva).
+        board_visible_min / board_covered_max: fracción de píxeles de césped
+            en la banda de la tienda. Con el tablero a la vista es 0.6-0.8;
+            un panel encima la hunde. Entre ambos umbrales se mantiene el
+            estado anterior (histéresis).
+        """
+        self.hud_reader = hud_reader
+        self.digits: DigitRecognizer | None = None
+        if hud_reader is None and digit_templates and Path(digit_templates).exists():
+            try:
+                self.digits = DigitRecognizer.load(digit_templates, min_score=HUD_DIGIT_MIN_SCORE)
+            except Exception as e:
+                print(f"[eventos] No se pudieron cargar las plantillas de digitos {digit_templates}: {e}")
+        self.round_debounce_frames = max(1, round_debounce_frames)
+        self.board_visible_min = board_visible_min
+        self.board_covered_max = board_covered_max
+        # Cambio frame a frame (estabilidad) y referencia = última ronda aceptada.
+        self._hud_rois = ROIChangeDetector({"round": ROUND_BOX, "hp": HP_ONLY_BOX})
+        self._round_ref = ROIChangeDetector({"round": ROUND_BOX})
+        self._round_stable = 0
+        self._shop_covered = False
+        self._first = True
+
+    def board_fraction(self, frame: np.ndarray) -> float:
+        """Fracción de píxeles verdes (césped del tablero) en la banda de la tienda (frame BGR)."""
+        band = crop_box(frame, SHOP_DETECT_BOX)[::4, ::4].astype(np.int16)
+        b, g, r = band[..., 0], band[..., 1], band[..., 2]
+        return float(((g > r + 10) & (g > b + 10)).mean())
+
+    def _round_roi_changed(self, frame: np.ndarray, frame_changed: bool) -> bool:
+        ref = self._round_ref.check(frame)
+        if self._first or not ref.is_changed("round"):
+            if self._first:
+                self._round_ref.commit(ref, {"round": True})
+            self._round_stable = 0
+            return False
+        # Distinta de la aceptada: cuenta solo mientras no siga moviéndose.
+        self._round_stable = 1 if frame_changed else self._round_stable + 1
+        if self._round_stable < self.round_debounce_frames:
+            return False
+        self._round_ref.commit(ref, {"round": True})
+        self._round_stable = 0
+        return True
+
+    def read(self, frame: np.ndarray) -> HUDSignals:
+        signals = HUDSignals()
+
+        check = self._hud_rois.check(frame)
+        self._hud_rois.commit(check, {name: True for name in check.changed})
+        signals.round_changed = self._round_roi_changed(frame, check.is_changed("round"))
+        # En el primer frame todo "cambia"; no es un cambio real.
+        if not self._first:
+            signals.hp_changed = check.is_changed("hp")
+        self._first = False
+
+        board = self.board_fraction(frame)
+        if self._shop_covered:
+            self._shop_covered = board < self.board_visible_min
+        else:
+            self._shop_covered = board < self.board_covered_max
+        signals.shop_covered = self._shop_covered
+
+        if self.hud_reader is not None:
+            try:
+                hud = self.hud_reader.predict_from_array(frame)
+                signals.round_label = hud.get("round")
+                signals.hp_self = hud.get("hp_self")
+            except Exception as hud_err:
+                print(f"[eventos] Error leyendo HUD local: {hud_err}")
+        elif self.digits is not None:
+            signals.round_label = self.digits.read_round(np.ascontiguousarray(crop_box(frame, ROUND_BOX)[:, :, 2::-1]))
+        return signals
+
+
+class RoundEventDetector:
+    def __init__(self, debounce_frames: int = 2, min_hp_drop: int = 1) -> None:
+        """
+        debounce_frames: frames seguidos con la misma ronda nueva antes de
+            aceptarla (el modelo local puede parpadear en un frame suelto).
+        min_hp_drop: bajada mínima de vida para considerar fin de combate.
+        """
+        self.debounce_frames = max(1, debounce_frames)
+        self.min_hp_drop = min_hp_drop
+        self.round_label: Optional[str] = None
+        self.hp_self: Optional[int] = None
+        # shop_open: mejor estimación (la confirma el VLM con observe_shop);
+        # _shop_covered: última lectura estable de la banda, la que dispara eventos.
+        self.shop_open = False
+        self._shop_covered: Optional[bool] = None
+        self._shop_count = 0
+        self._candidate: Optional[str] = None
+        self._candidate_count = 0
+        self._started = False
+        self.frames = 0
+        self.counts: Dict[str, int] = {e.value: 0 for e in EventType}
+
+    def observe_shop(self, is_open: bool) -> None:
+        """
+        Estado real de la tienda (p.ej. confirmado por el VLM). No rearma
+        SHOP_OPENED: eso solo lo hace la banda al volver a mostrar el tablero.
+        """
+        self.shop_open = bool(is_open)
+
+    def _emit(self, events: List[GameEvent], etype: EventType, **data: Any) -> None:
+        self.counts[etype.value] += 1
+        events.append(GameEvent(type=etype, t=time.monotonic(), round_label=self.round_label, data=data))
+
+    def update(self, signals: HUDSignals) -> List[GameEvent]:
+        self.frames += 1
+        events: List[GameEvent] = []
+
+        # Primer frame: un análisis inicial para tener estado de partida.
+        if not self._started:
+            self._started = True
+            self.round_label = signals.round_label
+            self.hp_self = signals.hp_self
+            self._shop_covered = signals.shop_covered
+            self.shop_open = bool(signals.shop_covered)
+            self._emit(events, EventType.NEW_ROUND, initial=True)
+            return events
+
+        # --- Ronda ---
+        if signals.round_label is not None:
+            if signals.round_label == self.round_label:
+                self._candidate, self._candidate_count = None, 0
+            elif signals.round_label == self._candidate:
+                self._candidate_count += 1
+            else:
+                self._candidate, self._candidate_count = signals.round_label, 1
+            if self._candidate is not None and self._candidate_count >= self.debounce_frames:
+                previous = self.round_label
+                self.round_label = self._candidate
+                self._candidate, self._candidate_count = None, 0
+                # Ronda nueva: la tienda se reinicia.
+                self.shop_open = False
+                self._emit(events, EventType.NEW_ROUND, previous=previous)
+        elif signals.round_changed:
+            # Ya llega filtrado por CheapSignalReader (estable N frames).
+            self.shop_open = False
+            self._emit(events, EventType.NEW_ROUND, source="roi_change")
+
+        # --- Vida ---
+        if signals.hp_self is not None:
+            if self.hp_self is not None and self.hp_self - signals.hp_self >= self.min_hp_drop:
+                self._emit(events, EventType.COMBAT_ENDED, hp_before=self.hp_self, hp_after=signals.hp_self)
+            self.hp_self = signals.hp_self
+        elif signals.hp_changed:
+            self._emit(events, EventType.COMBAT_ENDED, source="roi_change")
+
+        # --- Tienda ---
+        # Señal de nivel (cubierta / tablero visible) con el mismo debounce
+        # que la ronda; solo la transición a cubierta pide análisis.
+        if signals.shop_covered is not None:
+            if signals.shop_covered == self._shop_covered:
+                self._shop_count = 0
+            else:
+                self._shop_count += 1
+                if self._shop_count >= self.debounce_frames:
+                    self._shop_covered = signals.shop_covered
+                    self._shop_count = 0
+                    self.shop_open = signals.shop_covered
+                    if signals.shop_covered:
+                        self._emit(events, EventType.SHOP_OPENED)
+
+        return events
+
+    def stats(self) -> Dict[str, Any]:
+        return {"frames": self.frames, "events": dict(self.counts)}
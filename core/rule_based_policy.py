@@ -18,6 +18,7 @@ from __future__ import annotations
 
 from typing import List
 
+from core.metrics import timed
 from core.policy_network import ACTIONS
 from core.state import GameState
 
@@ -31,6 +32,7 @@ class RuleBasedPolicy:
     def __init__(self) -> None:
         self.actions = ACTIONS
 
+    @timed("policy.rule_based")
     def choose_action(self, state: GameState, valid_actions: List[str] | None = None) -> str:
         """
         Decide una acción a partir del GameState.
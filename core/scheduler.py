@@ -0,0 +1,101 @@
+# core/scheduler.py
+"""
+Planificador de captura por deadlines absolutos.
+
+En vez de dormir 1/fps después de cada captura (lo que acumula el tiempo del
+consumidor y hace caer los fps reales), los instantes de captura forman una
+rejilla fija t0, t0 + T, t0 + 2T, ... Si el consumidor se retrasa y se salta
+uno o más instantes, esos ticks se descartan (no se captura en ráfaga para
+"ponerse al día") y se captura en el acto.
+
+Cada frame se marca con time.monotonic() y se guardan el intervalo entre
+capturas y el retraso respecto a su deadline (jitter) para publicar fps
+conseguidos y percentiles.
+"""
+
+from __future__ import annotations
+
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, Deque, Dict, Optional
+
+import numpy as np
+
+from core.metrics import percentile
+
+
+@dataclass
+class TimedFrame:
+    frame: Optional[np.ndarray]
+    seq: int            # índice de tick en la rejilla (cuenta también los saltados)
+    t_capture: float    # time.monotonic() justo tras capturar
+    deadline: float     # instante planificado (monotonic)
+    skipped: int = 0    # ticks descartados justo antes de este frame
+
+
+class DeadlineScheduler:
+    def __init__(self, fps: float, max_speed: bool = False, window: int = 300) -> None:
+        """
+        fps: cadencia objetivo.
+        max_speed: no espera nunca (benchmarks); solo marca tiempos.
+        window: nº de frames recientes usados para las estadísticas.
+        """
+        self.period = 1.0 / fps if fps > 0 else 0.0
+        self.max_speed = max_speed or self.period == 0.0
+        self._next: Optional[float] = None
+        self._seq = 0
+        self.frames = 0
+        self.skipped_total = 0
+        self._captures: Deque[float] = deque(maxlen=window)
+        self._jitter: Deque[float] = deque(maxlen=window)
+
+    def wait_next(self) -> tuple[int, float, int]:
+        """
+        Espera hasta el siguiente deadline de la rejilla.
+        Devuelve (seq, deadline, ticks_saltados).
+        """
+        now = time.monotonic()
+        if self.max_speed:
+            self._seq += 1
+            return self._seq, now, 0
+
+        if self._next is None:
+            self._next = now
+        skipped = 0
+        if now < self._next:
+            time.sleep(self._next - now)
+        else:
+            # Vamos tarde: descartar los ticks ya vencidos salvo el último.
+            skipped = int((now - self._next) // self.period)
+            self._next += skipped * self.period
+            self._seq += skipped
+            self.skipped_total += skipped
+
+        deadline = self._next
+        self._next += self.period
+        self._seq += 1
+        return self._seq, deadline, skipped
+
+    def record(self, t_capture: float, deadline: float) -> None:
+        self.frames += 1
+        self._captures.append(t_capture)
+        self._jitter.append(max(0.0, t_capture - deadline))
+
+    def achieved_fps(self) -> float:
+        if len(self._captures) < 2:
+            return 0.0
+        span = self._captures[-1] - self._captures[0]
+        return (len(self._captures) - 1) / span if span > 0 else 0.0
+
+    def stats(self) -> Dict[str, Any]:
+        jitter_ms = [j * 1000.0 for j in self._jitter]
+        return {
+            "target_fps": round(1.0 / self.period, 2) if self.period else None,
+            "achieved_fps": round(self.achieved_fps(), 2),
+            "frames": self.frames,
+            "skipped": self.skipped_total,
+            "jitter_ms_p50": round(percentile(jitter_ms, 50), 2),
+            "jitter_ms_p95": round(percentile(jitter_ms, 95), 2),
+            "jitter_ms_p99": round(percentile(jitter_ms, 99), 2),
+        }
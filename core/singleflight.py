@@ -0,0 +1,84 @@
+# core/singleflight.py
+"""
+Coalescencia de peticiones idénticas en vuelo ("single-flight").
+
+Si dos hilos piden lo mismo mientras la primera llamada aún no ha vuelto
+(el loop reenvía un frame igual, HUDReader y NemotronVLVLM miran la misma
+captura...), solo el primero ("líder") llama al VLM; el resto espera y
+recibe el mismo resultado o la misma excepción. A diferencia de la caché,
+no guarda nada: en cuanto la llamada termina, la clave se libera.
+
+    flight = SingleFlight()
+    value = flight.do(key, lambda: gateway.chat(...))
+
+VLMResponseCache.get_or_call la usa con la clave (modelo, prompt, hashes).
+"""
+
+from __future__ import annotations
+
+import threading
+from typing import Any, Callable, Dict, Optional
+
+
+class _Call:
+    __slots__ = ("done", "value", "error", "waiters")
+
+    def __init__(self) -> None:
+        self.done = threading.Event()
+        self.value: Any = None
+        self.error: Optional[BaseException] = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    def __init__(self) -> None:
+        self._calls: Dict[str, _Call] = {}
+        self._lock = threading.Lock()
+        self.leaders = 0
+        self.shared = 0
+
+    def do(self, key: str, fn: Callable[[], Any], timeout: Optional[float] = None) -> Any:
+        """
+        Ejecuta fn() una sola vez por `key` entre los llamadores concurrentes.
+        `timeout` limita la espera de los no-líderes (TimeoutError al agotarse).
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            if call is None:
+                call = self._calls[key] = _Call()
+                self.leaders += 1
+                leader = True
+            else:
+                call.waiters += 1
+                self.shared += 1
+                leader = False
+
+        if not leader:
+            if not call.done.wait(timeout):
+                raise TimeoutError(f"single-flight: sin respuesta para {key[:12]} en {timeout}s")
+            if call.error is not None:
+                raise call.error
+            return call.value
+
+        try:
+            call.value = fn()
+            return call.value
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call.done.set()
+
+    def in_flight(self) -> int:
+        with self._lock:
+            return len(self._calls)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "leaders": self.leaders,
+                "shared": self.shared,
+                "in_flight": len(self._calls),
+            }
@@ -201,7 +201,9 @@ class GameState:
     def update_from_hud(self, hud: Dict[str, Any]) -> None:
         """
         Actualiza campos basicos con datos leidos por OCR/modelo local.
-        Espera claves: round, level, gold, hp_self.
+        Espera claves: round, level, gold, hp_self y opcionalmente
+        confidence ({campo: prob}); la confianza de la lectura es la del
+        campo mas dudoso entre confidence_fields (si viene; si no, todos).
         """
         if hud.get("round") is not None:
             self.round_label = str(hud["round"])
@@ -211,6 +213,12 @@ class GameState:
             self.oro = _clamp_int(hud["gold"], 0, 200)
         if hud.get("hp_self") is not None:
             self.vida = _clamp_int(hud["hp_self"], 0, 100)
+        confidence = hud.get("confidence")
+        if confidence:
+            fields = hud.get("confidence_fields") or list(confidence)
+            values = [confidence[f] for f in fields if f in confidence]
+            if values:
+                self.confianza_lectura = max(0.0, min(1.0, float(min(values))))
 
     def _round_to_nums(self) -> tuple[int, int]:
         """
@@ -1,12 +1,20 @@
 import base64
+import dataclasses
 import json
+from concurrent.futures import ThreadPoolExecutor
 from io import BytesIO
 from pathlib import Path
 
+import numpy as np
 from PIL import Image
-from openai import OpenAI
 
+from config import VLM_STREAM_DEADLINE_S, VLM_STREAMING
+from core.api_gateway import get_gateway
+from core.json_stream import has_fields, stream_json
+from core.metrics import span, timed
+from core.payload import PayloadConfig, encode_image, encode_pil
 from core.state import PlayerStatus, ScreenState
+from core.vlm_cache import get_vlm_cache
 
 # ---------------------------------------------------------------------
 # CONFIG
@@ -66,8 +74,26 @@ def _b64_encode(data: bytes) -> str:
     return base64.b64encode(data).decode("utf-8")
 
 
-def _encode_full_image(path: str) -> tuple[str, str]:
+@timed("vision.decode")
+def _load_frame(path: str) -> tuple[bytes, Image.Image]:
+    """Lee el archivo una vez: bytes originales + imagen RGB decodificada."""
     data = Path(path).read_bytes()
+    img = Image.open(BytesIO(data)).convert("RGB")
+    return data, img
+
+
+def _payload_config() -> PayloadConfig:
+    # El análisis global necesita ver la pantalla entera (tipo de pantalla).
+    return dataclasses.replace(PayloadConfig(), roi_composite=False)
+
+
+@timed("vision.encode_full")
+def _encode_full_image(data: bytes, path: str, img: Image.Image) -> tuple[str, str]:
+    cfg = _payload_config()
+    if not cfg.lossless:
+        enc = encode_image(np.ascontiguousarray(np.asarray(img)[:, :, ::-1]), cfg)
+        return enc.mime, enc.b64
+    # Sin reescalar ni cambiar codec: se envían los bytes del archivo tal cual.
     ext = Path(path).suffix.lower()
     if ext in [".jpg", ".jpeg"]:
         mime = "image/jpeg"
@@ -76,12 +102,8 @@ def _encode_full_image(path: str) -> tuple[str, str]:
     return mime, _b64_encode(data)
 
 
-def _encode_players_strip(path: str) -> tuple[str, str]:
-    """
-    Recorta solo la columna derecha donde está la lista de jugadores
-    y la devuelve en base64.
-    """
-    img = Image.open(path).convert("RGB")
+def _players_strip(img: Image.Image) -> Image.Image:
+    """Recorta solo la columna derecha donde está la lista de jugadores."""
     w, h = img.size
 
     # Recortamos aprox. el 28% derecho y 4%-96% vertical para asegurar capturar HUD
@@ -90,11 +112,13 @@ def _encode_players_strip(path: str) -> tuple[str, str]:
     right = w
     bottom = int(h * 0.96)
 
-    crop = img.crop((left, top, right, bottom))
+    return img.crop((left, top, right, bottom))
 
-    buf = BytesIO()
-    crop.save(buf, format="PNG")
-    return "image/png", _b64_encode(buf.getvalue())
+
+@timed("vision.encode_players")
+def _encode_players_strip(crop: Image.Image) -> tuple[str, str]:
+    enc = encode_pil(crop, _payload_config())
+    return enc.mime, enc.b64
 
 
 # ---------------------------------------------------------------------
@@ -219,30 +243,7 @@ def _safe_json_loads(raw: str, tag: str) -> dict:
 # Llamada principal a LM Studio
 # ---------------------------------------------------------------------
 
-
-def analyze_frame(image_path: str) -> ScreenState:
-    """
-    Toma un screenshot completo y hace DOS llamadas al modelo:
-
-    1) full frame -> tipo de pantalla, ronda, oro, nivel.
-    2) strip derecha -> SOLO la lista de jugadores.
-
-    Luego combina ambas cosas en un ScreenState.
-    """
-    image_file = Path(image_path)
-    if not image_file.exists():
-        raise FileNotFoundError(f"No existe la imagen: {image_file}")
-    image_path = str(image_file)
-
-    client = OpenAI(
-        base_url=LM_STUDIO_BASE_URL,
-        api_key="lm-studio",
-    )
-
-    # --- 1) Imagen completa ---
-    full_mime, full_b64 = _encode_full_image(image_path)
-
-    global_system = """
+GLOBAL_SYSTEM = """
 Eres un analizador de Magic Chess.
 
 Esta llamada SOLO debe sacar:
@@ -264,7 +265,7 @@ Devuelve SIEMPRE un JSON con esta forma exacta:
 }
 """
 
-    global_user = """
+GLOBAL_USER = """
 Analiza la captura y devuelve SOLO el JSON con:
 
 {
@@ -276,41 +277,7 @@ Analiza la captura y devuelve SOLO el JSON con:
 Si no se ve, pon null. No añadas texto fuera del JSON.
 """
 
-    resp_global = client.chat.completions.create(
-        model=MODEL_NAME,
-        temperature=0.0,
-        messages=[
-            {"role": "system", "content": global_system},
-            {
-                "role": "user",
-                "content": [
-                    {"type": "text", "text": global_user},
-                    {
-                        "type": "image_url",
-                        "image_url": {
-                            "url": f"data:{full_mime};base64,{full_b64}"
-                        },
-                    },
-                ],
-            },
-        ],
-    )
-
-    raw_global = _content_to_text(resp_global.choices[0].message.content)
-    data_global = _safe_json_loads(raw_global, "global")
-
-    # Defaults si vino vacío / roto
-    if not data_global:
-        data_global = {
-            "screen_type": "other",
-            "round_label": None,
-            "own": {"gold": None, "level": None},
-        }
-
-    # --- 2) Strip derecha con solo la lista de jugadores ---
-    strip_mime, strip_b64 = _encode_players_strip(image_path)
-
-    players_system = """
+PLAYERS_SYSTEM = """
 Eres un OCR preciso del HUD DERECHO de Magic Chess.
 
 La imagen que ves está recortada: SOLO contiene la columna vertical de
@@ -340,7 +307,7 @@ FORMATO EXACTO:
 }
 """
 
-    players_user = """
+PLAYERS_USER = """
 Lee la lista de jugadores del HUD derecho y devuelve SOLO:
 
 {
@@ -350,29 +317,113 @@ Lee la lista de jugadores del HUD derecho y devuelve SOLO:
 }
 """
 
-    resp_players = client.chat.completions.create(
-        model=MODEL_NAME,
-        temperature=0.0,
-        messages=[
-            {"role": "system", "content": players_system},
+
+# Llamadas de jugadores en paralelo a la global, que va en el hilo del que
+# llama a analyze_frame: con varios llamadores a la vez la global no hace cola
+# detrás de las peticiones de otros frames.
+_EXECUTOR = ThreadPoolExecutor(max_workers=2, thread_name_prefix="vision")
+
+
+# Claves de primer nivel de cada respuesta (corte temprano en streaming).
+_RESPONSE_FIELDS = {
+    "global": ("screen_type", "round_label", "own"),
+    "players": ("players",),
+}
+
+
+def _ask(system: str, user: str, image: Image.Image, encode, tag: str) -> dict:
+    """
+    Una llamada con una imagen; devuelve el JSON parseado ({} si falla).
+    Imágenes repetidas (misma clave, ver core/vlm_cache.py) salen de la caché y
+    en ese caso ni siquiera se codifican (`encode` devuelve (mime, b64)).
+    """
+
+    def _request() -> dict:
+        mime, b64 = encode()
+        gateway = get_gateway(LM_STUDIO_BASE_URL)
+        messages = [
+            {"role": "system", "content": system},
             {
                 "role": "user",
                 "content": [
-                    {"type": "text", "text": players_user},
+                    {"type": "text", "text": user},
                     {
                         "type": "image_url",
-                        "image_url": {
-                            "url": f"data:{strip_mime};base64,{strip_b64}"
-                        },
+                        "image_url": {"url": f"data:{mime};base64,{b64}"},
                     },
                 ],
             },
-        ],
+        ]
+        if VLM_STREAMING:
+            with span(f"vision.http.{tag}"):
+                return stream_json(
+                    gateway,
+                    required=_RESPONSE_FIELDS.get(tag, ()),
+                    deadline_s=VLM_STREAM_DEADLINE_S,
+                    metric=f"vision.stream.{tag}",
+                    model=MODEL_NAME,
+                    temperature=0.0,
+                    messages=messages,
+                )
+        with span(f"vision.http.{tag}"):
+            resp = gateway.chat(
+                model=MODEL_NAME,
+                temperature=0.0,
+                messages=messages,
+            )
+        raw = _content_to_text(resp["choices"][0]["message"].get("content"))
+        return _safe_json_loads(raw, tag)
+
+    prompt_key = system + user + _payload_config().label()
+    return get_vlm_cache().get_or_call(
+        [image],
+        prompt_key,
+        MODEL_NAME,
+        _request,
+        cacheable=has_fields(_RESPONSE_FIELDS.get(tag, ())) if VLM_STREAMING else None,
     )
 
-    raw_players = _content_to_text(resp_players.choices[0].message.content)
-    data_players = _safe_json_loads(raw_players, "players")
 
+@timed("vision.analyze_frame")
+def analyze_frame(image_path: str) -> ScreenState:
+    """
+    Toma un screenshot completo y hace DOS llamadas al modelo:
+
+    1) full frame -> tipo de pantalla, ronda, oro, nivel.
+    2) strip derecha -> SOLO la lista de jugadores.
+
+    Las dos llamadas van en paralelo por el mismo gateway (la de jugadores
+    en un hilo de _EXECUTOR y la global en el del llamador), así que la
+    latencia es la de la más lenta y no la suma. La imagen se lee y
+    decodifica una sola vez.
+
+    Luego combina ambas cosas en un ScreenState.
+    """
+    image_file = Path(image_path)
+    if not image_file.exists():
+        raise FileNotFoundError(f"No existe la imagen: {image_file}")
+    image_path = str(image_file)
+
+    data, img = _load_frame(image_path)
+    strip = _players_strip(img)
+
+    fut_players = _EXECUTOR.submit(
+        _ask, PLAYERS_SYSTEM, PLAYERS_USER, strip, lambda: _encode_players_strip(strip), "players"
+    )
+    data_global = _ask(GLOBAL_SYSTEM, GLOBAL_USER, img, lambda: _encode_full_image(data, image_path, img), "global")
+    data_players = fut_players.result()
+
+    # --- 1) Imagen completa ---
+
+    # Defaults si vino vacío / roto
+    if not data_global:
+        data_global = {
+            "screen_type": "other",
+            "round_label": None,
+            "own": {"gold": None, "level": None},
+        }
+
+    # --- 2) Strip derecha con solo la lista de jugadores ---
     if not data_players:
         data_players = {"players": []}
 
@@ -0,0 +1,493 @@
+# core/vlm_cache.py
+"""
+Caché de respuestas del VLM indexada por el contenido de las imágenes.
+
+La clave es (modelo, prompt, hash de cada imagen enviada). El hash depende
+del tamaño de la imagen:
+
+  - recortes pequeños (hasta VLM_CACHE_PERCEPTUAL_MAX_PIXELS píxeles, p.ej.
+    el banner de ronda o la moneda de oro): dHash perceptual. Reduce el
+    recorte a una rejilla en gris y guarda el signo del gradiente
+    horizontal, así que dos capturas del mismo recorte dan la misma clave
+    aunque difieran en ruido de compresión.
+  - imágenes grandes (frames completos, tienda): hash exacto de los
+    píxeles. En un dHash de 16x17 de un frame entero los dígitos del HUD no
+    llegan a mover un bit, y dos frames con distinta ronda, nivel u oro
+    darían la misma clave.
+
+Dos niveles:
+  - memoria: LRU de VLM_CACHE_MEMORY_ITEMS entradas,
+  - disco: SQLite en VLM_CACHE_PATH, persiste entre ejecuciones.
+
+Las entradas caducan a los VLM_CACHE_TTL_S segundos (0 = nunca) y el nivel de
+disco se recorta a VLM_CACHE_MAX_DISK_ITEMS por último uso.
+
+Con VLM_CACHE_MAX_DISTANCE > 0, si no hay coincidencia exacta se busca
+entre las entradas del mismo prompt y modelo la de menor distancia de
+Hamming por recorte perceptual (las imágenes con hash exacto deben
+coincidir). Entre dígitos distintos puede haber solo 4 bits (nivel 3 y 8),
+así que por defecto está desactivado.
+
+Mientras una petición está en vuelo, las idénticas (misma clave) esperan a
+su resultado en vez de repetir la llamada (core/singleflight.py,
+VLM_SINGLE_FLIGHT), también con la caché desactivada.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Sequence, Set, Union
+
+import cv2
+import numpy as np
+from PIL import Image
+
+from config import (
+    VLM_CACHE_ENABLED,
+    VLM_CACHE_HASH_SIZE,
+    VLM_CACHE_MAX_DISK_ITEMS,
+    VLM_CACHE_MAX_DISTANCE,
+    VLM_CACHE_MEMORY_ITEMS,
+    VLM_CACHE_PATH,
+    VLM_CACHE_PERCEPTUAL_MAX_PIXELS,
+    VLM_CACHE_TTL_S,
+    VLM_SINGLE_FLIGHT,
+)
+from core.singleflight import SingleFlight
+
+ImageLike = Union[np.ndarray, Image.Image, bytes, str, Path]
+
+
+def _to_array(img: ImageLike) -> np.ndarray:
+    """Píxeles de la imagen tal cual (gris, BGR o RGB según el origen)."""
+    if isinstance(img, (str, Path)):
+        arr = cv2.imread(str(img), cv2.IMREAD_UNCHANGED)
+        if arr is None:
+            raise FileNotFoundError(f"No se pudo leer la imagen: {img}")
+        return arr
+    if isinstance(img, bytes):
+        arr = cv2.imdecode(np.frombuffer(img, dtype=np.uint8), cv2.IMREAD_UNCHANGED)
+        if arr is None:
+            raise ValueError("Bytes de imagen no decodificables")
+        return arr
+    return np.asarray(img)
+
+
+def _to_gray(img: ImageLike) -> np.ndarray:
+    arr = _to_array(img)
+    if arr.ndim == 3:
+        # Media de canales: no depende de si el frame es BGR o RGB.
+        return arr[:, :, :3].mean(axis=2).astype(np.uint8)
+    return arr.astype(np.uint8)
+
+
+def dhash(img: ImageLike, hash_size: int = VLM_CACHE_HASH_SIZE, deadband: float = 4.0) -> str:
+    """
+    Difference hash en hexadecimal. Cada celda compara con su vecina derecha
+    y da sube / baja / plano; las diferencias menores que `deadband` cuentan
+    como plano, así el ruido en zonas lisas (fondos del HUD) no cambia bits.
+    """
+    gray = _to_gray(img).astype(np.float32)
+    small = cv2.resize(gray, (hash_size + 1, hash_size), interpolation=cv2.INTER_AREA)
+    diff = small[:, 1:] - small[:, :-1]
+    bits = np.concatenate([(diff > deadband).flatten(), (diff < -deadband).flatten()])
+    return np.packbits(bits).tobytes().hex()
+
+
+def content_hash(img: ImageLike) -> str:
+    """Hash exacto de los píxeles (y la forma) de la imagen."""
+    arr = np.ascontiguousarray(_to_array(img))
+    h = hashlib.blake2b(digest_size=16)
+    h.update(repr((arr.shape, arr.dtype.str)).encode("ascii"))
+    h.update(arr.tobytes())
+    return h.hexdigest()
+
+
+# Prefijos de image_hash: solo los hashes perceptuales admiten vecinos.
+PERCEPTUAL_PREFIX = "d:"
+EXACT_PREFIX = "x:"
+
+
+def image_hash(
+    img: ImageLike,
+    hash_size: int = VLM_CACHE_HASH_SIZE,
+    perceptual_max_pixels: int = VLM_CACHE_PERCEPTUAL_MAX_PIXELS,
+) -> str:
+    """dHash ("d:...") para recortes pequeños, hash exacto ("x:...") para el resto."""
+    arr = _to_array(img)
+    if arr.shape[0] * arr.shape[1] <= perceptual_max_pixels:
+        return PERCEPTUAL_PREFIX + dhash(arr, hash_size)
+    return EXACT_PREFIX + content_hash(arr)
+
+
+_POPCOUNT = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint16)
+
+
+def hamming(a: str, b: str) -> int:
+    """Bits distintos entre dos hashes hex de igual longitud."""
+    xa = np.frombuffer(bytes.fromhex(a), dtype=np.uint8)
+    xb = np.frombuffer(bytes.fromhex(b), dtype=np.uint8)
+    return int(_POPCOUNT[xa ^ xb].sum())
+
+
+class _NearIndex:
+    """
+    Entradas de un mismo prompt/modelo para buscar vecinos por Hamming sin
+    recorrerlas todas. Por palomar, dos hashes a distancia <= d coinciden en
+    al menos uno de d + 1 trozos: se indexa cada trozo del primer hash
+    perceptual y solo se comparan las entradas que comparten alguno.
+    """
+
+    def __init__(self, max_distance: int) -> None:
+        self.max_distance = max_distance
+        self.hashes: Dict[str, List[str]] = {}
+        self._buckets: Dict[tuple, Set[str]] = {}
+
+    @staticmethod
+    def _pivot(hashes: Sequence[str]) -> Optional[str]:
+        for h in hashes:
+            if h.startswith(PERCEPTUAL_PREFIX):
+                return h[len(PERCEPTUAL_PREFIX):]
+        return None
+
+    def _chunks(self, h: str) -> List[tuple]:
+        n = self.max_distance + 1
+        step = -(-len(h) // n)
+        return [(i, h[i * step:(i + 1) * step]) for i in range(n)]
+
+    def add(self, key: str, hashes: Sequence[str]) -> None:
+        self.remove(key)
+        self.hashes[key] = list(hashes)
+        pivot = self._pivot(hashes)
+        if pivot is not None:
+            for chunk in self._chunks(pivot):
+                self._buckets.setdefault(chunk, set()).add(key)
+
+    def remove(self, key: str) -> None:
+        hashes = self.hashes.pop(key, None)
+        pivot = self._pivot(hashes or ())
+        if pivot is not None:
+            for chunk in self._chunks(pivot):
+                self._buckets.get(chunk, set()).discard(key)
+
+    def nearest(self, hashes: Sequence[str]) -> Optional[str]:
+        pivot = self._pivot(hashes)
+        if pivot is None:
+            return None
+        cands: Set[str] = set()
+        for chunk in self._chunks(pivot):
+            cands.update(self._buckets.get(chunk, ()))
+        best_key, best_dist = None, self.max_distance + 1
+        for key in cands:
+            other = self.hashes[key]
+            if len(other) != len(hashes):
+                continue
+            dist = 0
+            for a, b in zip(hashes, other):
+                if a.startswith(PERCEPTUAL_PREFIX) and b.startswith(PERCEPTUAL_PREFIX):
+                    dist = max(dist, hamming(a[len(PERCEPTUAL_PREFIX):], b[len(PERCEPTUAL_PREFIX):]))
+                elif a != b:
+                    dist = best_dist
+                # Todas las imágenes deben parecerse, no solo en promedio.
+                if dist >= best_dist:
+                    break
+            if dist < best_dist:
+                best_key, best_dist = key, dist
+        return best_key
+
+
+class VLMResponseCache:
+    def __init__(
+        self,
+        path: Optional[str] = VLM_CACHE_PATH,
+        max_memory_items: int = VLM_CACHE_MEMORY_ITEMS,
+        max_disk_items: int = VLM_CACHE_MAX_DISK_ITEMS,
+        ttl_s: float = VLM_CACHE_TTL_S,
+        hash_size: int = VLM_CACHE_HASH_SIZE,
+        perceptual_max_pixels: int = VLM_CACHE_PERCEPTUAL_MAX_PIXELS,
+        max_distance: int = VLM_CACHE_MAX_DISTANCE,
+        enabled: bool = VLM_CACHE_ENABLED,
+        single_flight: bool = VLM_SINGLE_FLIGHT,
+    ) -> None:
+        """
+        path: fichero SQLite (None = solo memoria).
+        ttl_s: segundos de validez de una respuesta (0 = sin caducidad).
+        perceptual_max_pixels: imágenes de hasta este área usan dHash; las
+            mayores, hash exacto de los píxeles.
+        max_distance: bits de diferencia tolerados por recorte perceptual
+            para reutilizar una respuesta parecida (0 = solo clave exacta).
+        single_flight: coalescer peticiones idénticas en vuelo.
+        """
+        self.enabled = enabled
+        self.max_memory_items = max(1, max_memory_items)
+        self.max_disk_items = max_disk_items
+        self.ttl_s = ttl_s
+        self.hash_size = hash_size
+        self.perceptual_max_pixels = perceptual_max_pixels
+        self.max_distance = max(0, max_distance)
+        self._memory: "OrderedDict[str, tuple[float, Any]]" = OrderedDict()
+        # prompt_key -> entradas de ese prompt, para buscar vecinos
+        # (solo con max_distance > 0).
+        self._index: Dict[str, _NearIndex] = {}
+        self._lock = threading.Lock()
+        self._flight: Optional[SingleFlight] = SingleFlight() if single_flight else None
+
+        self.hits_memory = 0
+        self.hits_disk = 0
+        self.hits_near = 0
+        self.misses = 0
+        self.stores = 0
+        self.expired = 0
+        self.evicted = 0
+
+        self._conn: Optional[sqlite3.Connection] = None
+        if enabled and path:
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+            self._conn = sqlite3.connect(path, check_same_thread=False)
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS vlm_cache (
+                    key TEXT PRIMARY KEY,
+                    prompt_key TEXT NOT NULL,
+                    hashes TEXT NOT NULL,
+                    value_json TEXT NOT NULL,
+                    created REAL NOT NULL,
+                    last_used REAL NOT NULL
+                )
+                """
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_vlm_cache_last_used ON vlm_cache(last_used)")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_vlm_cache_prompt ON vlm_cache(prompt_key)")
+            self._conn.commit()
+
+    # ---------- claves ----------
+
+    @staticmethod
+    def prompt_key(prompt: str, model: str) -> str:
+        return hashlib.sha1(f"{model}\0{prompt}".encode("utf-8")).hexdigest()
+
+    def image_hashes(self, images: Sequence[ImageLike]) -> List[str]:
+        return [image_hash(img, self.hash_size, self.perceptual_max_pixels) for img in images]
+
+    @staticmethod
+    def _key(prompt_key: str, hashes: Sequence[str]) -> str:
+        return hashlib.sha1("\0".join([prompt_key, *hashes]).encode("ascii")).hexdigest()
+
+    def key_for(self, images: Sequence[ImageLike], prompt: str, model: str) -> str:
+        """Clave de (modelo, prompt, imágenes). Sin imágenes sirve para prompts de texto."""
+        return self._key(self.prompt_key(prompt, model), self.image_hashes(images))
+
+    # ---------- lectura / escritura ----------
+
+    def _fresh(self, created: float) -> bool:
+        return self.ttl_s <= 0 or time.time() - created <= self.ttl_s
+
+    def _lookup(self, key: str) -> tuple[Optional[Any], str]:
+        """(valor, nivel) sin tocar contadores de hit/miss. Llamar con el lock."""
+        entry = self._memory.get(key)
+        if entry is not None:
+            created, value = entry
+            if self._fresh(created):
+                self._memory.move_to_end(key)
+                return value, "memory"
+            del self._memory[key]
+            self.expired += 1
+
+        if self._conn is not None:
+            row = self._conn.execute(
+                "SELECT value_json, created FROM vlm_cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is not None:
+                value_json, created = row
+                if self._fresh(created):
+                    self._conn.execute("UPDATE vlm_cache SET last_used = ? WHERE key = ?", (time.time(), key))
+                    self._conn.commit()
+                    value = json.loads(value_json)
+                    self._remember(key, created, value)
+                    return value, "disk"
+                self._conn.execute("DELETE FROM vlm_cache WHERE key = ?", (key,))
+                self._conn.commit()
+                self.expired += 1
+        return None, ""
+
+    def _count(self, tier: str) -> None:
+        if tier == "memory":
+            self.hits_memory += 1
+        elif tier == "disk":
+            self.hits_disk += 1
+        else:
+            self.misses += 1
+
+    def get(self, key: str) -> Optional[Any]:
+        if not self.enabled:
+            return None
+        with self._lock:
+            value, tier = self._lookup(key)
+            self._count(tier)
+            return value
+
+    def _candidates(self, prompt_key: str) -> _NearIndex:
+        """Índice de las claves con el mismo prompt/modelo (se carga una vez del disco)."""
+        index = self._index.get(prompt_key)
+        if index is None:
+            index = _NearIndex(self.max_distance)
+            if self._conn is not None:
+                rows = self._conn.execute(
+                    "SELECT key, hashes FROM vlm_cache WHERE prompt_key = ?", (prompt_key,)
+                ).fetchall()
+                for k, h in rows:
+                    index.add(k, h.split(",") if h else [])
+            self._index[prompt_key] = index
+        return index
+
+    def _remember(self, key: str, created: float, value: Any) -> None:
+        self._memory[key] = (created, value)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory_items:
+            self._memory.popitem(last=False)
+            self.evicted += 1
+
+    def put(
+        self,
+        key: str,
+        value: Any,
+        prompt_key: str = "",
+        hashes: Sequence[str] = (),
+    ) -> None:
+        """Guarda una respuesta (debe ser serializable a JSON)."""
+        if not self.enabled:
+            return
+        now = time.time()
+        with self._lock:
+            self._remember(key, now, value)
+            self.stores += 1
+            if prompt_key and self.max_distance > 0:
+                self._candidates(prompt_key).add(key, hashes)
+            if self._conn is None:
+                return
+            self._conn.execute(
+                """
+                INSERT OR REPLACE INTO vlm_cache (key, prompt_key, hashes, value_json, created, last_used)
+                VALUES (?, ?, ?, ?, ?, ?)
+                """,
+                (key, prompt_key, ",".join(hashes), json.dumps(value, ensure_ascii=False), now, now),
+            )
+            if self.max_disk_items > 0:
+                self._conn.execute(
+                    """
+                    DELETE FROM vlm_cache WHERE key IN (
+                        SELECT key FROM vlm_cache ORDER BY last_used DESC LIMIT -1 OFFSET ?
+                    )
+                    """,
+                    (self.max_disk_items,),
+                )
+            self._conn.commit()
+
+    def get_or_call(
+        self,
+        images: Sequence[ImageLike],
+        prompt: str,
+        model: str,
+        fn: Callable[[], Any],
+        cacheable: Optional[Callable[[Any], bool]] = None,
+    ) -> Any:
+        """
+        Devuelve la respuesta cacheada (exacta o de un recorte casi igual) o
+        llama a fn() y la guarda. Las respuestas vacías ({} / None) no se
+        guardan: suelen ser errores de parseo y merece la pena reintentarlas.
+        Tampoco las que `cacheable` rechace (p.ej. JSON parcial por deadline).
+        """
+        if not self.enabled:
+            if self._flight is None:
+                return fn()
+            return self._flight.do(self.key_for(images, prompt, model), fn)
+        pkey = self.prompt_key(prompt, model)
+        hashes = self.image_hashes(images)
+        key = self._key(pkey, hashes)
+        with self._lock:
+            value, tier = self._lookup(key)
+            if value is None and hashes and self.max_distance > 0:
+                near = self._candidates(pkey).nearest(hashes)
+                if near is not None:
+                    value, near_tier = self._lookup(near)
+                    if value is None:
+                        # Entrada caducada o recortada del disco.
+                        self._index[pkey].remove(near)
+                    else:
+                        tier = near_tier
+                        self.hits_near += 1
+            self._count(tier)
+        if value is not None:
+            return value
+
+        def call() -> Any:
+            if self._flight is not None:
+                # Otro líder pudo guardar la respuesta justo tras nuestra búsqueda.
+                with self._lock:
+                    cached, _ = self._lookup(key)
+                if cached is not None:
+                    return cached
+            result = fn()
+            if result and (cacheable is None or cacheable(result)):
+                self.put(key, result, prompt_key=pkey, hashes=hashes)
+            return result
+
+        if self._flight is None:
+            return call()
+        return self._flight.do(key, call)
+
+    # ---------- mantenimiento ----------
+
+    def clear(self) -> None:
+        with self._lock:
+            self._memory.clear()
+            self._index.clear()
+            if self._conn is not None:
+                self._conn.execute("DELETE FROM vlm_cache")
+                self._conn.commit()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            hits = self.hits_memory + self.hits_disk
+            lookups = hits + self.misses
+            disk_items = None
+            if self._conn is not None:
+                disk_items = self._conn.execute("SELECT COUNT(*) FROM vlm_cache").fetchone()[0]
+            return {
+                "hit_rate": round(hits / lookups, 3) if lookups else 0.0,
+                "hits_memory": self.hits_memory,
+                "hits_disk": self.hits_disk,
+                "hits_near": self.hits_near,
+                "misses": self.misses,
+                "stores": self.stores,
+                "expired": self.expired,
+                "evicted_memory": self.evicted,
+                "memory_items": len(self._memory),
+                "disk_items": disk_items,
+                "single_flight": self._flight.stats() if self._flight is not None else None,
+            }
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+_CACHE: Optional[VLMResponseCache] = None
+_CACHE_LOCK = threading.Lock()
+
+
+def get_vlm_cache() -> VLMResponseCache:
+    """Caché compartida del proceso (config.VLM_CACHE_*)."""
+    global _CACHE
+    with _CACHE_LOCK:
+        if _CACHE is None:
+            _CACHE = VLMResponseCache()
+        return _CACHE
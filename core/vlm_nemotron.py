@@ -1,14 +1,71 @@
-﻿import base64
+﻿import dataclasses
 import json
-from typing import Any, Dict, List
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeout
+from typing import Any, Dict, List, Tuple
 
-import cv2
 import numpy as np
-import requests
 
-from config import VLM_API_BASE_URL, VLM_API_MODEL, VLM_API_KEY
+from config import (
+    VLM_API_BASE_URL,
+    VLM_API_KEY,
+    VLM_API_MODEL,
+    VLM_BREAKER_FAILURES,
+    VLM_BREAKER_RESET_S,
+    VLM_BREAKER_SLOW_S,
+    VLM_CALL_BUDGET_S,
+    VLM_FALLBACK_CONFIDENCE_FACTOR,
+    VLM_READ_CONFIDENCE,
+    VLM_STREAM_DEADLINE_S,
+    VLM_STREAMING,
+)
+from .api_gateway import get_gateway, message_text
+from .circuit_breaker import CircuitBreaker
+from .json_stream import has_fields, stream_json
+from .metrics import METRICS, span, timed
+from .payload import EncodedImage, PayloadConfig, encode_image
+from .hud_regions import BOARD_BOX, GOLD_BOX, LEVEL_BOX, PLAYERS_BOX, ROUND_BOX, SHOP_DETECT_BOX, SYNERGY_BOX
+from .roi_change import ROIChangeDetector
+from .vlm_cache import get_vlm_cache
 from .state import GameState, ShopHero
 
+# Regiones vigiladas para decidir si merece la pena volver a llamar al VLM.
+# El GameState reutilizado incluye tienda, sinergias y tablero, así que
+# también se vigilan esas zonas y no solo los números del HUD.
+WATCHED_BOXES = {
+    "round": ROUND_BOX,
+    "level": LEVEL_BOX,
+    "gold": GOLD_BOX,
+    "players": PLAYERS_BOX,
+    "shop": SHOP_DETECT_BOX,
+    "board": BOARD_BOX,
+    "synergies": SYNERGY_BOX,
+}
+
+# El timeout de requests es por lectura del socket: una respuesta que gotea
+# bytes nunca lo agota. El presupuesto de la llamada entera se espera desde
+# fuera, con la llamada en uno de estos hilos; si se pasa, el hilo termina
+# por su cuenta (y su respuesta aún entra en la caché) sin bloquear el bucle.
+_CALL_EXECUTOR = ThreadPoolExecutor(max_workers=4, thread_name_prefix="vlm")
+# Margen sobre budget_s para que el streaming devuelva su JSON parcial.
+_DEADLINE_GRACE_S = 0.5
+
+# Claves del JSON pedido; en streaming se corta cuando todas han llegado.
+RESPONSE_FIELDS = (
+    "fase",
+    "oro",
+    "vida",
+    "nivel_tablero",
+    "xp_actual",
+    "tienda",
+    "sinergias_activas",
+    "comandante",
+    "emblema",
+    "tienda_abierta",
+)
+
 
 class NemotronVLVLM:
     """
@@ -21,21 +78,59 @@ class NemotronVLVLM:
         base_url: str = VLM_API_BASE_URL,
         model: str = VLM_API_MODEL,
         api_key: str = VLM_API_KEY,
+        change_detection: bool = True,
+        response_cache: bool = True,
+        payload: PayloadConfig | None = None,
+        streaming: bool = VLM_STREAMING,
+        stream_deadline_s: float = VLM_STREAM_DEADLINE_S,
+        budget_s: float = VLM_CALL_BUDGET_S,
+        breaker: CircuitBreaker | None = None,
     ):
         self.base_url = base_url.rstrip("/")
         self.model = model
         self.api_key = api_key
+        self.gateway = get_gateway(base_url, api_key=api_key)
+        # El VLM lee el frame completo, asi que solo se reutiliza el GameState
+        # entero cuando ninguna region vigilada ha cambiado.
+        # Rejilla más fina que la de por defecto: en el tablero un héroe ocupa
+        # menos de un bloque de 8x24 y su cambio quedaría diluido.
+        self.change_detector = ROIChangeDetector(WATCHED_BOXES, grid=(24, 32)) if change_detection else None
+        self._last_state: GameState | None = None
+        self.cache = get_vlm_cache() if response_cache else None
+        # Reescalado / codec / mosaico de la imagen enviada (config.VLM_PAYLOAD_*).
+        self.payload = payload or PayloadConfig()
+        # Streaming: se deja de leer (y de generar) en cuanto el JSON está completo.
+        self.streaming = streaming
+        self.stream_deadline_s = stream_deadline_s
+        # Tiempo máximo (de reloj) por llamada; si se agota, o el breaker
+        # está abierto, se devuelve el último GameState bueno con menos
+        # confianza. 0 = sin límite propio (solo el timeout por lectura).
+        self.budget_s = budget_s
+        self.breaker = breaker or CircuitBreaker(
+            "vlm",
+            failure_threshold=VLM_BREAKER_FAILURES,
+            slow_call_s=VLM_BREAKER_SLOW_S,
+            reset_timeout_s=VLM_BREAKER_RESET_S,
+        )
+        self._last_good: GameState | None = None
+        self.fallbacks: Counter = Counter()
 
-    @staticmethod
-    def _encode_image(frame: np.ndarray) -> str:
-        _, buf = cv2.imencode(".png", frame)
-        return base64.b64encode(buf.tobytes()).decode("utf-8")
+    @timed("vlm.encode")
+    def _encode_image(self, frame: np.ndarray) -> EncodedImage:
+        return encode_image(frame, self.payload)
 
     @staticmethod
-    def _build_prompt(ronda: int) -> str:
+    def _build_prompt(ronda: int, composite: bool = False) -> str:
+        source = (
+            "La imagen es un mosaico con recortes del HUD apilados en vertical: "
+            "ronda, nivel, oro, lista de jugadores y banda de la tienda.\n"
+            if composite
+            else ""
+        )
         return (
             "Eres un asistente experto en el juego \"Magic Chess: Go Go\".\n"
-            "Analiza la captura de pantalla y devuelve EXCLUSIVAMENTE un JSON "
+            + source
+            + "Analiza la captura de pantalla y devuelve EXCLUSIVAMENTE un JSON "
             "con el estado actual del juego.\n\n"
             "Usa EXACTAMENTE esta estructura:\n"
             "{\n"
@@ -62,98 +157,190 @@ class NemotronVLVLM:
         )
 
     def _call_api(self, frame: np.ndarray, ronda: int) -> Dict:
-        img_b64 = self._encode_image(frame)
-
-        headers = {
-            "Content-Type": "application/json",
-            "Accept": "application/json",
-        }
-        if self.api_key:
-            headers["Authorization"] = f"Bearer {self.api_key}"
-
-        payload = {
-            "model": self.model,
-            "messages": [
-                {
-                    "role": "user",
-                    "content": [
-                        {
-                            "type": "image_url",
-                            "image_url": {
-                                "url": f"data:image/png;base64,{img_b64}"
-                            },
-                        },
-                        {
-                            "type": "text",
-                            "text": self._build_prompt(ronda),
+        """_cached_call con el presupuesto de reloj; TimeoutError si se agota."""
+        if self.budget_s <= 0:
+            return self._cached_call(frame, ronda)
+        future = _CALL_EXECUTOR.submit(self._cached_call, frame, ronda)
+        try:
+            return future.result(timeout=self.budget_s + _DEADLINE_GRACE_S)
+        except FutureTimeout:
+            future.cancel()
+            raise TimeoutError(f"sin respuesta en {self.budget_s:.1f} s") from None
+
+    def _cached_call(self, frame: np.ndarray, ronda: int) -> Dict:
+        if self.cache is None:
+            return self._request(frame, ronda)
+        return self.cache.get_or_call(
+            [frame],
+            self._build_prompt(ronda, self.payload.roi_composite) + self.payload.label(),
+            self.model,
+            lambda: self._request(frame, ronda),
+            cacheable=has_fields(RESPONSE_FIELDS) if self.streaming else None,
+        )
+
+    def _request(self, frame: np.ndarray, ronda: int) -> Dict:
+        image = self._encode_image(frame)
+
+        messages = [
+            {
+                "role": "user",
+                "content": [
+                    {
+                        "type": "image_url",
+                        "image_url": {
+                            "url": image.data_url
                         },
-                    ],
-                }
-            ],
-            "temperature": 0.0,
-            "max_tokens": 512,
-        }
-
-        url = f"{self.base_url}/v1/chat/completions"
-        resp = requests.post(url, headers=headers, json=payload, timeout=60)
-        resp.raise_for_status()
-        data = resp.json()
-        content = data["choices"][0]["message"]["content"]
-        return json.loads(content)
+                    },
+                    {
+                        "type": "text",
+                        "text": self._build_prompt(ronda, self.payload.roi_composite),
+                    },
+                ],
+            }
+        ]
+
+        if self.streaming:
+            with span("vlm.http"):
+                return stream_json(
+                    self.gateway,
+                    required=RESPONSE_FIELDS,
+                    deadline_s=self.stream_deadline_s or self.budget_s,
+                    metric="vlm.stream",
+                    model=self.model,
+                    messages=messages,
+                    temperature=0.0,
+                    max_tokens=512,
+                    timeout=self.budget_s,
+                )
 
+        with span("vlm.http"):
+            data = self.gateway.chat(
+                model=self.model,
+                messages=messages,
+                temperature=0.0,
+                max_tokens=512,
+                timeout=self.budget_s,
+            )
+        return json.loads(message_text(data))
+
+    @timed("vlm.analyze_frame")
     def analyze_frame(self, frame: Any, ronda: int) -> GameState:
         if frame is None:
-            return GameState(
-                fase="unknown",
-                ronda=ronda,
-                oro=0,
-                vida=100,
-                nivel_tablero=1,
-                xp_actual=0,
-                tienda=[],
-                tablero=[],
-                banco=[],
-                sinergias_activas={},
-                sinergias_potenciales={},
-                comandante="",
-                emblema="",
-                confianza_lectura=0.0,
-                tienda_abierta=False,
-            )
+            return self._unknown_state(ronda)
 
         if not isinstance(frame, np.ndarray):
             frame = np.array(frame)
 
-        result = self._call_api(frame, ronda)
+        check = self.change_detector.check(frame) if self.change_detector else None
+        if check is not None and check.all_unchanged() and self._last_state is not None:
+            return dataclasses.replace(self._last_state, ronda=ronda)
+
+        state, ok = self._state_from_frame(frame, ronda)
+        if check is not None and ok:
+            # Se marca cada region como leida; el valor real es el GameState entero.
+            # Un fallback no se guarda: el siguiente frame vuelve a intentarlo.
+            self.change_detector.commit(check, {name: True for name in WATCHED_BOXES})
+            self._last_state = state
+        return state
 
-        tienda_raw: List[Dict[str, Any]] = result.get("tienda", [])
+    @staticmethod
+    def _unknown_state(ronda: int) -> GameState:
+        return GameState(
+            fase="unknown",
+            ronda=ronda,
+            oro=0,
+            vida=100,
+            nivel_tablero=1,
+            xp_actual=0,
+            tienda=[],
+            tablero=[],
+            banco=[],
+            sinergias_activas={},
+            sinergias_potenciales={},
+            comandante="",
+            emblema="",
+            confianza_lectura=0.0,
+            tienda_abierta=False,
+        )
+
+    def _fallback(self, ronda: int, reason: str) -> GameState:
+        """Último GameState bueno (o uno vacío) con la confianza rebajada."""
+        self.fallbacks[reason] += 1
+        METRICS.incr(f"vlm.fallback.{reason}")
+        if self._last_good is None:
+            return self._unknown_state(ronda)
+        return dataclasses.replace(
+            self._last_good,
+            ronda=ronda,
+            confianza_lectura=self._last_good.confianza_lectura * VLM_FALLBACK_CONFIDENCE_FACTOR,
+        )
+
+    @staticmethod
+    def _read_confidence(result: Dict) -> float:
+        """
+        El VLM no da probabilidades: se parte de VLM_READ_CONFIDENCE y se
+        escala por la fracción de campos pedidos que llegaron (una respuesta
+        parcial o incompleta vale menos).
+        """
+        present = sum(1 for k in RESPONSE_FIELDS if result.get(k) is not None)
+        return VLM_READ_CONFIDENCE * present / len(RESPONSE_FIELDS)
+
+    def _state_from_frame(self, frame: np.ndarray, ronda: int) -> Tuple[GameState, bool]:
+        """(estado, True) si el VLM respondió bien; (fallback, False) si no."""
+        if not self.breaker.allow():
+            return self._fallback(ronda, "breaker_open"), False
+        t0 = time.perf_counter()
+        try:
+            result = self._call_api(frame, ronda)
+            if not isinstance(result, dict) or not result:
+                raise ValueError(f"Respuesta vacía o no es un objeto JSON: {result!r:.200}")
+            state = self._state_from_result(result, ronda)
+        except Exception as e:
+            self.breaker.record_failure()
+            print(f"[vlm] Fallo en la llamada ({type(e).__name__}: {e}); usando último estado conocido")
+            return self._fallback(ronda, type(e).__name__), False
+        self.breaker.record_success(time.perf_counter() - t0)
+        self._last_good = state
+        return state, True
+
+    def _state_from_result(self, result: Dict, ronda: int) -> GameState:
+        def get(obj: Dict, key: str, default: Any) -> Any:
+            # El VLM manda null en lo que no lee: cuenta como ausente, no
+            # como fallo de la llamada (ni para el breaker).
+            value = obj.get(key)
+            return default if value is None else value
+
+        tienda_raw: List[Dict[str, Any]] = get(result, "tienda", [])
         tienda: List[ShopHero] = []
         for item in tienda_raw:
             try:
                 tienda.append(
                     ShopHero(
-                        slot_index=int(item.get("slot_index", 0)),
-                        nombre=str(item.get("nombre", "")),
-                        coste=int(item.get("coste", 1)),
+                        slot_index=int(get(item, "slot_index", 0)),
+                        nombre=str(get(item, "nombre", "")),
+                        coste=int(get(item, "coste", 1)),
                     )
                 )
             except Exception:
                 continue
 
         return GameState(
-            fase=result.get("fase", "early"),
+            fase=get(result, "fase", "early"),
             ronda=ronda,
-            oro=int(result.get("oro", 0)),
-            vida=int(result.get("vida", 100)),
-            nivel_tablero=int(result.get("nivel_tablero", 1)),
-            xp_actual=int(result.get("xp_actual", 0)),
+            oro=int(get(result, "oro", 0)),
+            vida=int(get(result, "vida", 100)),
+            nivel_tablero=int(get(result, "nivel_tablero", 1)),
+            xp_actual=int(get(result, "xp_actual", 0)),
             tienda=tienda,
             tablero=[],
             banco=[],
-            sinergias_activas=result.get("sinergias_activas", {}),
+            sinergias_activas=get(result, "sinergias_activas", {}),
             sinergias_potenciales={},
-            comandante=result.get("comandante", ""),
-            emblema=result.get("emblema", ""),
-            confianza_lectura=0.9,
-            tienda_abierta=bool(result.get("tienda_abierta", False)),
+            comandante=get(result, "comandante", ""),
+            emblema=get(result, "emblema", ""),
+            confianza_lectura=self._read_confidence(result),
+            tienda_abierta=bool(get(result, "tienda_abierta", False)),
         )
+
+    def stats(self) -> Dict[str, Any]:
+        return {"breaker": self.breaker.stats(), "fallbacks": dict(self.fallbacks)}
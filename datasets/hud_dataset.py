@@ -2,6 +2,10 @@
 """
 Dataset de entrenamiento para el modelo HUD local.
 Lee data/labels.jsonl y las imágenes de data/raw_frames/.
+
+model_type="frame" devuelve la captura entera a 224x224 (HUDModel; otro tamaño
+pasando transform=FrameTransform(size));
+model_type="roi" devuelve un dict {campo: recorte} (HUDRoiModel).
 """
 
 import json
@@ -11,7 +15,39 @@ from typing import Dict, Tuple, Any, List
 from PIL import Image
 import torch
 from torch.utils.data import Dataset
-from torchvision import transforms
+
+from models.hud_roi_model import FrameTransform, RoiTransform
+
+# Campo -> claves aceptadas en labels.jsonl (el teacher escribe round_label/hp).
+LABEL_KEYS = {
+    "round": ("round", "round_label"),
+    "level": ("level",),
+    "gold": ("gold",),
+    "hp_self": ("hp_self", "hp"),
+}
+
+
+def label_value(rec: Dict[str, Any], field: str) -> Any:
+    for key in LABEL_KEYS[field]:
+        if rec.get(key) is not None:
+            return rec[key]
+    return None
+
+
+def image_path(image: str, data_dir: str | Path = "data") -> Path:
+    """
+    Ruta del campo "image" de un registro de labels.jsonl: absoluta tal
+    cual, "data/..." junto a data_dir y un nombre suelto (lo que escribe
+    tools/generate_labels_with_teacher.py) dentro de data_dir/raw_frames.
+    """
+    p = Path(image)
+    if p.is_absolute():
+        return p
+    data_dir = Path(data_dir)
+    norm = str(p).replace("\\", "/")
+    if norm.startswith("data/"):
+        return data_dir.parent / norm
+    return data_dir / "raw_frames" / p
 
 
 class HUDDataset(Dataset):
@@ -21,7 +57,13 @@ class HUDDataset(Dataset):
         labels_file: str = "labels.jsonl",
         round_vocab: Dict[str, int] | None = None,
         transform: Any | None = None,
+        model_type: str = "frame",
+        num_classes: Dict[str, int] | None = None,
     ) -> None:
+        """
+        num_classes: clases por cabeza numérica ({"level": 11, ...}); un valor
+        fuera de rango se ignora en la pérdida en lugar de romper CrossEntropy.
+        """
         self.data_dir = Path(data_dir)
         self.frames_dir = self.data_dir / "raw_frames"
         self.labels_path = self.data_dir / labels_file
@@ -40,68 +82,54 @@ class HUDDataset(Dataset):
         # Construir vocabulario de rondas si no viene de fuera
         if round_vocab is None:
             rounds = sorted(
-                {r["round"] for r in self.records if r.get("round") is not None}
+                {label_value(r, "round") for r in self.records if label_value(r, "round") is not None}
             )
             self.round_vocab: Dict[str, int] = {r: i for i, r in enumerate(rounds)}
         else:
             self.round_vocab = round_vocab
 
-        # Transformaciones por defecto
-        self.transform = transform or transforms.Compose(
-            [
-                transforms.Resize((224, 224)),
-                transforms.ToTensor(),
-                transforms.Normalize(
-                    mean=[0.485, 0.456, 0.406],
-                    std=[0.229, 0.224, 0.225],
-                ),
-            ]
-        )
+        # Transformaciones por defecto (las mismas que usa HUDLocalReader)
+        if transform is None:
+            transform = RoiTransform() if model_type == "roi" else FrameTransform()
+        self.transform = transform
 
         # Índice utilizado por CrossEntropy para ignorar targets
         self.ignore_index = -100
+        self.num_classes = dict(num_classes or {})
 
     def __len__(self) -> int:
         return len(self.records)
 
     def __getitem__(
         self, idx: int
-    ) -> Tuple[torch.Tensor, Dict[str, torch.Tensor]]:
+    ) -> Tuple[Any, Dict[str, torch.Tensor]]:
         rec = self.records[idx]
-        img_field = rec["image"]
-        p = Path(img_field)
-        if p.is_absolute():
-            img_path = p
-        else:
-            norm = str(p).replace("\\", "/")
-            if norm.startswith("data/"):
-                img_path = Path(norm)
-            else:
-                img_path = self.frames_dir / p
-
-        img = Image.open(img_path).convert("RGB")
+        img = Image.open(image_path(rec["image"], self.data_dir)).convert("RGB")
         x = self.transform(img)
 
         # ROUND
-        r = rec.get("round")
+        r = label_value(rec, "round")
         if r is None or r not in self.round_vocab:
             round_idx = self.ignore_index
         else:
             round_idx = self.round_vocab[r]
 
         # LEVEL, GOLD, HP
-        def _num_or_ignore(value: Any) -> int:
+        def _num_or_ignore(field: str) -> int:
+            value = label_value(rec, field)
             if value is None:
                 return self.ignore_index
             try:
                 v = int(value)
             except (TypeError, ValueError):
                 return self.ignore_index
+            if field in self.num_classes and v >= self.num_classes[field]:
+                return self.ignore_index
             return max(0, v)
 
-        level = _num_or_ignore(rec.get("level"))
-        gold = _num_or_ignore(rec.get("gold"))
-        hp_self = _num_or_ignore(rec.get("hp_self"))
+        level = _num_or_ignore("level")
+        gold = _num_or_ignore("gold")
+        hp_self = _num_or_ignore("hp_self")
 
         targets = {
             "round": torch.tensor(round_idx, dtype=torch.long),
@@ -1,6 +1,9 @@
 import time
 from datetime import datetime
 
+import cv2
+
+from core.round_events import CheapSignalReader, RoundEventDetector
 from core.vision import analyze_frame
 from core.state import ScreenState
 
@@ -30,8 +33,17 @@ def handle_state(state: ScreenState) -> None:
 def main() -> None:
     # Por ahora, 5 iteraciones para que lo veas claro.
     # Más adelante esto puede ser while True con captura en tiempo real.
+    # Las dos llamadas al modelo de analyze_frame solo se hacen cuando las
+    # senales baratas del HUD indican ronda nueva o tienda abierta.
+    signals = CheapSignalReader()
+    events = RoundEventDetector()
+    state: ScreenState | None = None
     for i in range(5):
-        state = analyze_frame(IMAGE_PATH)
+        frame = cv2.imread(IMAGE_PATH)
+        if frame is None:
+            raise FileNotFoundError(f"No existe la imagen: {IMAGE_PATH}")
+        if any(ev.needs_vlm for ev in events.update(signals.read(frame))) or state is None:
+            state = analyze_frame(IMAGE_PATH)
         handle_state(state)
         time.sleep(2)  # espera 2 segundos entre frames
 
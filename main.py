@@ -1,17 +1,26 @@
 ﻿# main.py
 import os
 import time
+from pathlib import Path
 
 from config import (
+    CAPTURE_FPS,
+    FRAME_SOURCE,
+    FRAME_SOURCE_MAX_SPEED,
+    HUD_MODEL_WEIGHTS,
     VLM_API_BASE_URL,
     VLM_API_KEY,
     VLM_API_MODEL,
     VLM_BACKEND,
 )
-from core.capture import WindowCapture
+from core.api_gateway import all_stats as gateway_stats
 from core.decision import DecisionEngine
+from core.frame_source import build_frame_source
 from core.knowledge import KnowledgeBase
+from core.metrics import METRICS, span
 from core.overlay import OverlayRenderer
+from core.round_events import CheapSignalReader, EventType, RoundEventDetector
+from core.vlm_cache import get_vlm_cache
 from core.vlm_nemotron import NemotronVLVLM
 from core.vlm import get_vlm
 
@@ -32,15 +41,34 @@ def build_vlm():
     return get_vlm(VLM_BACKEND)
 
 
+def build_signal_reader() -> CheapSignalReader:
+    """
+    Senales baratas para detectar eventos: modelo HUD local si existe
+    (ronda/vida exactas), si no solo cambios de pixeles en las ROIs.
+    """
+    hud_reader = None
+    if Path(HUD_MODEL_WEIGHTS).exists():
+        try:
+            from core.hud_local_reader import HUDLocalReader
+
+            hud_reader = HUDLocalReader(HUD_MODEL_WEIGHTS)
+        except Exception as hud_err:
+            print(f"[main] No se pudo cargar {HUD_MODEL_WEIGHTS}: {hud_err}")
+    return CheapSignalReader(hud_reader)
+
+
 def main():
     kb = KnowledgeBase()
     vlm = build_vlm()
-    capture = WindowCapture()
+    capture = build_frame_source(FRAME_SOURCE, fps=CAPTURE_FPS, max_speed=FRAME_SOURCE_MAX_SPEED)
     decision_engine = DecisionEngine()
     overlay = OverlayRenderer()
+    signals = build_signal_reader()
+    events = RoundEventDetector()
 
     match_id = kb.start_match()
-    ronda = 1
+    ronda = 0
+    vlm_calls = 0
 
     print(f"Partida iniciada, match_id={match_id}")
 
@@ -50,30 +78,52 @@ def main():
             time.sleep(1)
             continue
 
-        # En version real deberiamos detectar eventos como nueva ronda o reroll.
-        # Por ahora: 1 lectura de GameState cada X segundos = nueva ronda simulada.
-        game_state = vlm.analyze_frame(frame, ronda)
-
-        recs = decision_engine.recommend_actions(game_state)
-        overlay.show_recommendations(recs)
+        # Senales baratas en cada frame; el VLM solo en eventos que lo piden.
+        with span("events.signals"):
+            frame_events = events.update(signals.read(frame))
+        for ev in frame_events:
+            print(f"[eventos] {ev.type.value} ronda={ev.round_label} {ev.data}")
+        if not any(ev.needs_vlm for ev in frame_events):
+            continue
 
-        kb.add_round(
-            match_id=match_id,
-            ronda=ronda,
-            fase=game_state.fase,
-            game_state_json=game_state.to_json(),
-            recomendaciones_json=DecisionEngine.recs_to_json(recs),
-            acciones_realizadas_json=None,
-        )
+        new_round = any(ev.type == EventType.NEW_ROUND for ev in frame_events)
+        if new_round:
+            ronda += 1
+            if ronda > 10:
+                # Solo para demo: paramos despues de 10 rondas
+                break
 
-        ronda += 1
-        if ronda > 10:
-            # Solo para demo: paramos despues de 10 rondas simuladas
-            break
+        game_state = vlm.analyze_frame(frame, ronda)
+        vlm_calls += 1
+        events.observe_shop(game_state.tienda_abierta)
 
-        time.sleep(5)  # simula duracion entre rondas
+        with span("decision.recommend"):
+            recs = decision_engine.recommend_actions(game_state)
+        overlay.show_recommendations(recs)
 
+        # Una fila por ronda; la apertura de tienda solo refresca recomendaciones.
+        if new_round:
+            kb.add_round(
+                match_id=match_id,
+                ronda=ronda,
+                fase=game_state.fase,
+                game_state_json=game_state.to_json(),
+                recomendaciones_json=DecisionEngine.recs_to_json(recs),
+                acciones_realizadas_json=None,
+            )
+
+    capture.close()
     kb.end_match(match_id, posicion=4, vida=30)
+    stats = events.stats()
+    print(f"[eventos] {stats['frames']} frames, {vlm_calls} llamadas VLM, eventos={stats['events']}")
+    for endpoint, st in gateway_stats().items():
+        print(f"[gateway] {endpoint}: {st}")
+    print("[vlm_cache]", get_vlm_cache().stats())
+    if hasattr(vlm, "stats"):
+        print("[vlm]", vlm.stats())
+    if METRICS.enabled:
+        METRICS.dump()
+        print(f"[metrics] Latencias guardadas en {METRICS.path}")
     print("Partida terminada (demo).")
 
 
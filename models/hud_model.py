@@ -1,10 +1,76 @@
 # models/hud_model.py
 """
-Definición del modelo local de HUD basado en ResNet18.
+Definición del modelo local de HUD: un backbone sobre el frame entero y una
+cabeza lineal por campo.
+
+El backbone se elige por nombre (BACKBONES) al entrenar y queda guardado en
+el checkpoint junto con el tamaño de entrada, para que HUDLocalReader
+reconstruya la misma arquitectura:
+
+  resnet18            11M parámetros, ImageNet; el de siempre
+  mobilenet_v3_small  1M, ImageNet; varias veces más rápido en CPU
+  tiny                CNN propia de ~0.3M sin preentrenar; la más rápida
+                      y la única que no necesita torchvision
+
+    model = HUDModel(num_round_classes=8, backbone="mobilenet_v3_small")
 """
 
+from dataclasses import dataclass
+from typing import Callable, Dict, Tuple
+
 import torch.nn as nn
-from torchvision import models
+
+from models.hud_roi_model import _conv_bn
+
+
+@dataclass(frozen=True)
+class BackboneSpec:
+    # pretrained -> módulo que devuelve (N, features)
+    build: Callable[[bool], nn.Module]
+    features: int
+    input_size: Tuple[int, int]
+    # Sin pesos preentrenados se entrena desde cero (lr más alto).
+    pretrained: bool
+
+
+def _resnet18(pretrained: bool) -> nn.Module:
+    from torchvision import models
+
+    backbone = models.resnet18(weights=models.ResNet18_Weights.DEFAULT if pretrained else None)
+    backbone.fc = nn.Identity()
+    return backbone
+
+
+def _mobilenet_v3_small(pretrained: bool) -> nn.Module:
+    from torchvision import models
+
+    weights = models.MobileNet_V3_Small_Weights.DEFAULT if pretrained else None
+    backbone = models.mobilenet_v3_small(weights=weights)
+    # features -> avgpool -> flatten (576); el clasificador de ImageNet sobra.
+    backbone.classifier = nn.Identity()
+    return backbone
+
+
+def _tiny(pretrained: bool) -> nn.Module:
+    # Stride 32 como ResNet18, pero con 16-128 canales.
+    return nn.Sequential(
+        _conv_bn(3, 16, 2),
+        _conv_bn(16, 32, 2),
+        _conv_bn(32, 64, 2),
+        _conv_bn(64, 64, 1),
+        _conv_bn(64, 128, 2),
+        _conv_bn(128, 128, 2),
+        nn.AdaptiveAvgPool2d(1),
+        nn.Flatten(),
+    )
+
+
+BACKBONES: Dict[str, BackboneSpec] = {
+    "resnet18": BackboneSpec(_resnet18, 512, (224, 224), True),
+    "mobilenet_v3_small": BackboneSpec(_mobilenet_v3_small, 576, (224, 224), True),
+    "tiny": BackboneSpec(_tiny, 128, (192, 320), False),
+}
+DEFAULT_BACKBONE = "resnet18"
 
 
 class HUDModel(nn.Module):
@@ -14,13 +80,20 @@ class HUDModel(nn.Module):
         num_level_classes: int = 10,   # 0–9
         num_gold_classes: int = 101,   # 0–100
         num_hp_classes: int = 101,     # 0–100
+        backbone: str = DEFAULT_BACKBONE,
+        pretrained: bool = True,
     ) -> None:
+        """
+        pretrained: descarga pesos de ImageNet si el backbone los tiene. Al
+        cargar un checkpoint va a False (los pesos vienen del state_dict).
+        """
         super().__init__()
-
-        backbone = models.resnet18(weights=models.ResNet18_Weights.DEFAULT)
-        in_features = backbone.fc.in_features
-        backbone.fc = nn.Identity()
-        self.backbone = backbone
+        if backbone not in BACKBONES:
+            raise ValueError(f"Backbone desconocido {backbone!r}. Disponibles: {sorted(BACKBONES)}")
+        spec = BACKBONES[backbone]
+        self.backbone_name = backbone
+        self.backbone = spec.build(pretrained and spec.pretrained)
+        in_features = spec.features
 
         self.round_head = nn.Linear(in_features, num_round_classes)
         self.level_head = nn.Linear(in_features, num_level_classes)
@@ -0,0 +1,160 @@
+# models/hud_roi_model.py
+"""
+Modelo HUD por regiones: en lugar de encoger la captura entera a 224x224
+(los dígitos quedan en 2-3 píxeles y casi todo el cómputo se va en el
+tablero), recorta las ROIs fijas de core/hud_regions.py a una resolución
+cercana a la nativa y las pasa por un encoder convolucional pequeño
+compartido, con una cabeza por campo.
+
+    transform = RoiTransform()
+    x = transform(frame_rgb)                 # {"round": (3,32,80), "level": ..., ...}
+    model = HUDRoiModel(num_round_classes=len(round_vocab))
+    out = model(stack_inputs([x]))           # mismas claves que HUDModel
+
+No depende de torchvision: el preprocesado es PIL + NumPy. FrameTransform
+es el equivalente del Resize(224) + ToTensor + Normalize de HUDModel, para
+que el runtime de inferencia (core/hud_runtime.py) tampoco lo necesite.
+"""
+
+from __future__ import annotations
+
+from typing import Any, Dict, List, Mapping, Sequence, Tuple, Union
+
+import numpy as np
+import torch
+import torch.nn as nn
+from PIL import Image
+
+from core.hud_regions import HUD_FIELD_BOXES, crop_box
+
+# Campo -> (alto, ancho) de entrada. Aproximadamente el tamaño del recorte en
+# una captura 1920x1080 (hp_self es la columna de vidas, alta y estrecha).
+# Múltiplos de 8 x POOL_GRID: el pooling adaptativo queda exacto, que es lo
+# que admite la exportación a ONNX (tools/export_hud_model.py).
+ROI_SIZES: Dict[str, Tuple[int, int]] = {
+    "round": (32, 80),
+    "level": (48, 128),
+    "gold": (64, 144),
+    "hp_self": (320, 64),
+}
+
+# Rejilla a la que se reduce el mapa de cada campo antes de su cabeza:
+# conserva el orden de los dígitos (izquierda/derecha) y la fila de la vida.
+POOL_GRID: Dict[str, Tuple[int, int]] = {
+    "round": (1, 5),
+    "level": (2, 4),
+    "gold": (2, 6),
+    "hp_self": (10, 2),
+}
+
+IMAGENET_MEAN = np.array([0.485, 0.456, 0.406], np.float32)
+IMAGENET_STD = np.array([0.229, 0.224, 0.225], np.float32)
+
+RoiBatch = Dict[str, torch.Tensor]
+
+
+class FrameTransform:
+    """
+    Imagen RGB (PIL o array HxWx3) -> tensor (3, alto, ancho) normalizado.
+    Mismo resultado que torchvision Resize + ToTensor + Normalize sobre PIL
+    (Resize con PIL es un resize BILINEAR de PIL).
+    """
+
+    def __init__(self, size: Sequence[int] = (224, 224)) -> None:
+        self.size = (int(size[0]), int(size[1]))
+
+    def __call__(self, img: Union[Image.Image, np.ndarray]) -> torch.Tensor:
+        if not isinstance(img, Image.Image):
+            img = Image.fromarray(np.ascontiguousarray(np.asarray(img)[:, :, :3]))
+        h, w = self.size
+        if img.size != (w, h):
+            img = img.resize((w, h), Image.BILINEAR)
+        arr = (np.asarray(img, dtype=np.float32) / 255.0 - IMAGENET_MEAN) / IMAGENET_STD
+        return torch.from_numpy(arr.transpose(2, 0, 1).copy())
+
+
+class RoiTransform:
+    """Imagen RGB (PIL o array HxWx3) -> {campo: tensor (3, alto, ancho) normalizado}."""
+
+    def __init__(self, roi_sizes: Mapping[str, Sequence[int]] | None = None) -> None:
+        self.roi_sizes = {f: (int(h), int(w)) for f, (h, w) in (roi_sizes or ROI_SIZES).items()}
+
+    def __call__(self, img: Union[Image.Image, np.ndarray]) -> RoiBatch:
+        rgb = np.asarray(img)
+        out: RoiBatch = {}
+        for field, (h, w) in self.roi_sizes.items():
+            crop = Image.fromarray(np.ascontiguousarray(crop_box(rgb, HUD_FIELD_BOXES[field])[:, :, :3]))
+            if crop.size != (w, h):
+                crop = crop.resize((w, h), Image.BILINEAR)
+            arr = (np.asarray(crop, dtype=np.float32) / 255.0 - IMAGENET_MEAN) / IMAGENET_STD
+            out[field] = torch.from_numpy(arr.transpose(2, 0, 1).copy())
+        return out
+
+
+def stack_inputs(items: List[Any]) -> Any:
+    """Lista de tensores o de dicts de tensores -> lote."""
+    if items and isinstance(items[0], Mapping):
+        return {k: torch.stack([it[k] for it in items]) for k in items[0]}
+    return torch.stack(items)
+
+
+def batch_len(x: Any) -> int:
+    if isinstance(x, Mapping):
+        return next(iter(x.values())).shape[0]
+    return x.shape[0]
+
+
+def to_device(x: Any, device: Any) -> Any:
+    if isinstance(x, Mapping):
+        return {k: v.to(device) for k, v in x.items()}
+    return x.to(device)
+
+
+def _conv_bn(c_in: int, c_out: int, stride: int) -> nn.Sequential:
+    return nn.Sequential(
+        nn.Conv2d(c_in, c_out, 3, stride=stride, padding=1, bias=False),
+        nn.BatchNorm2d(c_out),
+        nn.ReLU(inplace=True),
+    )
+
+
+class HUDRoiModel(nn.Module):
+    def __init__(
+        self,
+        num_round_classes: int,
+        num_level_classes: int = 10,
+        num_gold_classes: int = 101,
+        num_hp_classes: int = 101,
+        width: int = 32,
+        pool_grid: Mapping[str, Sequence[int]] | None = None,
+    ) -> None:
+        super().__init__()
+        # Encoder compartido por todas las regiones (stride total 8).
+        self.encoder = nn.Sequential(
+            _conv_bn(3, width, 2),
+            _conv_bn(width, width * 2, 2),
+            _conv_bn(width * 2, width * 3, 2),
+            _conv_bn(width * 3, width * 4, 1),
+        )
+        self.pool_grid = {f: (int(h), int(w)) for f, (h, w) in (pool_grid or POOL_GRID).items()}
+        channels = width * 4
+        classes = {
+            "round": num_round_classes,
+            "level": num_level_classes,
+            "gold": num_gold_classes,
+            "hp_self": num_hp_classes,
+        }
+        self.pools = nn.ModuleDict({f: nn.AdaptiveAvgPool2d(self.pool_grid[f]) for f in classes})
+        self.heads = nn.ModuleDict(
+            {
+                f: nn.Sequential(
+                    nn.Flatten(),
+                    nn.Dropout(0.1),
+                    nn.Linear(channels * self.pool_grid[f][0] * self.pool_grid[f][1], n),
+                )
+                for f, n in classes.items()
+            }
+        )
+
+    def forward(self, x: RoiBatch) -> Dict[str, torch.Tensor]:
+        return {field: head(self.pools[field](self.encoder(x[field]))) for field, head in self.heads.items()}
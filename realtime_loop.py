@@ -2,66 +2,98 @@
 # Loop continuo: captura la ventana del juego, pasa por VLM + HUD/OCR recortado,
 # genera GameState, recomienda acciones y persiste en la base de conocimiento.
 
+import argparse
 import os
 import time
 from pathlib import Path
 import copy
 
-import cv2
 import numpy as np
 from PIL import Image
 
 from core.experience_logger import EpisodeLogger
+from core.frame_archive import FrameArchiveWriter
 from core.hud_local_reader import HUDLocalReader
+from core.metrics import METRICS
 from core.reward import compute_reward
 from core.rule_based_policy import RuleBasedPolicy
 from core.state import GameState
-from core.capture import WindowCapture
-from config import GAME_WINDOW_TITLE
+from core.frame_source import FrameSource, build_frame_source
+from core.pipeline import Pipeline
+from config import (
+    CAPTURE_FPS,
+    FRAME_SOURCE,
+    FRAME_SOURCE_MAX_SPEED,
+    HUD_CASCADE_ENABLED,
+    HUD_MODEL_WEIGHTS,
+    PIPELINE_FRAME_QUEUE,
+    PIPELINE_REPORT_SECONDS,
+    PIPELINE_RESULT_QUEUE,
+    REALTIME_PIPELINED,
+    FRAME_ARCHIVE_CODEC,
+    FRAME_ARCHIVE_MAX_MB,
+    FRAME_ARCHIVE_PNG_LEVEL,
+    FRAME_ARCHIVE_QUALITY,
+    FRAME_ARCHIVE_SAMPLE_EVERY,
+    SAVE_RAW_FRAMES,
+    VLM_API_BASE_URL,
+    VLM_API_KEY,
+    VLM_API_MODEL,
+)
 
 # Directorio para frames y control de episodio fake
 RAW_FRAMES_DIR = Path("data/raw_frames")
-RAW_FRAMES_DIR.mkdir(parents=True, exist_ok=True)
 MAX_STEPS = 50  # terminar episodio tras este numero de pasos
 _step_counter = 0
-_frame_idx = 0
-window_capture = WindowCapture(window_title=GAME_WINDOW_TITLE)
+# Escritor en segundo plano de los frames capturados (si SAVE_RAW_FRAMES).
+frame_archive: FrameArchiveWriter | None = None
+# Se construye en main() segun --source / config.FRAME_SOURCE.
+frame_source: FrameSource | None = None
 
 
-def capture_current_frame() -> str:
+def _get_frame_source() -> FrameSource:
+    global frame_source
+    if frame_source is None:
+        frame_source = build_frame_source(FRAME_SOURCE, fps=CAPTURE_FPS, max_speed=FRAME_SOURCE_MAX_SPEED)
+    return frame_source
+
+
+def capture_current_frame(save: bool = SAVE_RAW_FRAMES) -> np.ndarray | None:
     """
-    Captura la ventana del juego y guarda un PNG en data/raw_frames/.
-    Si falla la captura, genera un frame negro para no romper el pipeline.
+    Captura la ventana del juego y devuelve el frame BGR en memoria.
+    Si save=True ademas lo encola en el archivo de frames (data/raw_frames/,
+    en segundo plano), pero la inferencia ya no depende de ese archivo.
+    Devuelve None si falla la captura.
     """
-    global _step_counter
-    global _frame_idx
-    _step_counter += 1
-    _frame_idx += 1
+    frame_bgr = _get_frame_source().capture_once()
+    _on_frame_captured(frame_bgr, save)
+    return frame_bgr
 
-    out_path = RAW_FRAMES_DIR / f"frame_{_frame_idx:05d}.png"
 
-    frame_bgr = window_capture.capture_once()
-    if frame_bgr is None:
-        # Fallback: imagen negra 1080p
-        img = np.zeros((1080, 1920, 3), dtype=np.uint8)
-        cv2.imwrite(str(out_path), img)
-        return str(out_path)
-
-    cv2.imwrite(str(out_path), frame_bgr)
-    return str(out_path)
+def _on_frame_captured(frame_bgr: np.ndarray | None, save: bool = SAVE_RAW_FRAMES) -> None:
+    global _step_counter
+    _step_counter += 1
+    # Un fallo de captura ya no se persiste como frame negro.
+    if frame_bgr is None or not save or frame_archive is None:
+        return
+    frame_archive.submit(frame_bgr)
 
 
-def read_hud(frame_path: str, gs: GameState, hud_reader: HUDLocalReader | None) -> None:
+def read_hud(frame_bgr: np.ndarray | None, gs: GameState, hud_reader: HUDLocalReader | None) -> None:
     """
     Actualiza el estado a partir del HUD local si existe; si no, aplica defaults.
     """
-    if hud_reader is not None:
+    if hud_reader is not None and frame_bgr is not None:
         try:
-            hud = hud_reader.predict_from_image_path(frame_path)
+            hud = hud_reader.predict_from_array(frame_bgr)
             gs.update_from_hud(hud)
             return
         except Exception as hud_err:
             print(f"[hud] Error leyendo HUD local: {hud_err}")
+    _apply_hud_defaults(gs)
+
+
+def _apply_hud_defaults(gs: GameState) -> None:
     # Fallback: valores por defecto para que el pipeline no se rompa
     gs.round_label = gs.round_label or "1-1"
     if getattr(gs, "oro", None) is None:
@@ -72,34 +104,46 @@ def read_hud(frame_path: str, gs: GameState, hud_reader: HUDLocalReader | None)
         gs.vida = 100
 
 
-def env_step(action: str, gs: GameState) -> tuple[bool, dict]:
+def env_step(action: str, gs: GameState, step_idx: int | None = None) -> tuple[bool, dict]:
     """
     Stub: no ejecuta clicks. Cierra tras MAX_STEPS.
+    En modo pipeline se pasa step_idx (pasos procesados), ya que la captura
+    puede ir por delante y descartar frames.
     """
-    done = _step_counter >= MAX_STEPS
+    steps = _step_counter if step_idx is None else step_idx
+    done = steps >= MAX_STEPS
     info = {}
     if done:
         info["result"] = "lose"
-    time.sleep(0.05)
+    # En replay a maxima velocidad no se simula la latencia de la accion.
+    if frame_source is None or not frame_source.max_speed:
+        time.sleep(0.05)
     return done, info
 
 
-def main() -> None:
-    print("Generando episodio de prueba (stub).")
+def _load_hud_reader() -> HUDLocalReader | None:
+    hud_model_path = Path(HUD_MODEL_WEIGHTS)
+    if not hud_model_path.exists():
+        print(f"AVISO: no hay {hud_model_path}, usando HUD dummy.")
+        return None
+    try:
+        print(f"Cargando modelo HUD local desde {hud_model_path}")
+        reader = HUDLocalReader(str(hud_model_path))
+    except Exception as hud_err:
+        print(f"[realtime] No se pudo cargar {hud_model_path}: {hud_err}")
+        return None
+    if not HUD_CASCADE_ENABLED:
+        return reader
+    # Mismo predict_from_array, pero los campos dudosos se leen con el VLM.
+    from core.hud_cascade import CascadeHUDReader
+    from core.hud_reader import HUDReader
 
-    hud_reader = None
-    hud_model_path = Path("hud_model.pt")
-    if hud_model_path.exists():
-        try:
-            print("Cargando modelo HUD local desde hud_model.pt")
-            hud_reader = HUDLocalReader(str(hud_model_path))
-        except Exception as hud_err:
-            print(f"[realtime] No se pudo cargar hud_model.pt: {hud_err}")
-            hud_reader = None
-    else:
-        print("AVISO: no hay hud_model.pt, usando HUD dummy.")
+    print(f"[realtime] Cascada HUD activa (VLM en {VLM_API_BASE_URL} si la confianza baja)")
+    return CascadeHUDReader(reader, HUDReader(VLM_API_BASE_URL, VLM_API_MODEL, api_key=VLM_API_KEY))
 
-    gs = GameState(
+
+def _initial_state() -> GameState:
+    return GameState(
         fase="early",
         ronda=1,
         round_label="1-1",
@@ -118,51 +162,184 @@ def main() -> None:
         tienda_abierta=False,
     )
 
-    logger = EpisodeLogger()
-    logger.start_episode()
+
+def _step_info(gs: GameState, step_idx: int, env_info: dict, t_capture: float | None = None) -> dict:
+    info = {
+        "round": gs.round_label,
+        "gold": getattr(gs, "oro", None),
+        "level": getattr(gs, "nivel_tablero", None),
+        "hp": getattr(gs, "vida", None),
+        "step_idx": step_idx,
+    }
+    if t_capture is not None:
+        # Edad del frame cuando se decidio la accion (latencia de percepcion).
+        info["frame_age_ms"] = round((time.monotonic() - t_capture) * 1000.0, 1)
+    info.update(env_info)
+    return info
+
+
+def run_sequential(
+    gs: GameState, hud_reader: HUDLocalReader | None, logger: EpisodeLogger
+) -> tuple[dict, int]:
+    """Un paso tras otro en un solo hilo: captura -> HUD -> politica -> reward -> log."""
     policy = RuleBasedPolicy()
 
-    done = False
     step_idx = 0
     prev_state = copy.deepcopy(gs)
     env_info = {}
 
-    try:
-        while not done:
-            step_idx += 1
+    # La fuente marca la cadencia con deadlines absolutos: si un paso tarda
+    # mas de 1/CAPTURE_FPS se salta el frame vencido en vez de acumular lag.
+    for timed in _get_frame_source().timed_loop():
+        step_idx += 1
+
+        frame_bgr = timed.frame
+        _on_frame_captured(frame_bgr)
+
+        # Leer HUD (real si hay modelo, dummy si no)
+        read_hud(frame_bgr, gs, hud_reader)
 
-            frame_path = capture_current_frame()
+        state_vec = gs.to_vector()
+        action = policy.choose_action(gs)
 
-            # Leer HUD (real si hay modelo, dummy si no)
-            read_hud(frame_path, gs, hud_reader)
+        done, env_info = env_step(action, gs, step_idx=step_idx)
 
-            state_vec = gs.to_vector()
-            action = policy.choose_action(gs)
+        reward = compute_reward(prev_state, gs, done, env_info.get("result") if done else None)
 
-            done, env_info = env_step(action, gs)
+        logger.log_step(
+            state_vector=state_vec,
+            action=action,
+            reward=reward,
+            done=done,
+            info=_step_info(gs, step_idx, env_info, timed.t_capture),
+        )
 
-            reward = compute_reward(prev_state, gs, done, env_info.get("result") if done else None)
+        prev_state = copy.deepcopy(gs)
+        if done:
+            break
 
-            info = {
-                "round": gs.round_label,
-                "gold": getattr(gs, "oro", None),
-                "level": getattr(gs, "nivel_tablero", None),
-                "hp": getattr(gs, "vida", None),
-                "step_idx": step_idx,
-            }
-            info.update(env_info)
+    return env_info, step_idx
 
-            logger.log_step(
-                state_vector=state_vec,
-                action=action,
-                reward=reward,
-                done=done,
-                info=info,
-            )
 
-            prev_state = copy.deepcopy(gs)
+def run_pipelined(
+    gs: GameState, hud_reader: HUDLocalReader | None, logger: EpisodeLogger
+) -> tuple[dict, int]:
+    """
+    Captura, HUD, politica/reward y log corren en hilos separados unidos por
+    colas acotadas. La cola de frames descarta el mas viejo si el HUD se atasca,
+    de modo que la captura mantiene CAPTURE_FPS y siempre se procesa lo reciente.
+    """
+    policy = RuleBasedPolicy()
+    pipe = Pipeline()
+    # Solo la etapa de politica toca gs/prev_state, asi que no hace falta lock.
+    ctx = {"step_idx": 0, "prev_state": copy.deepcopy(gs), "env_info": {}}
 
+    def frames():
+        for timed in _get_frame_source().timed_loop():
+            if pipe.stopped:
+                return
+            _on_frame_captured(timed.frame)
+            # Se envuelve en dict para que un fallo de captura (None) siga
+            # contando como paso, igual que en el modo secuencial.
+            yield {"frame": timed.frame, "t_capture": timed.t_capture}
+
+    def hud_stage(item: dict) -> dict:
+        hud = None
+        frame_bgr = item["frame"]
+        if hud_reader is not None and frame_bgr is not None:
+            try:
+                hud = hud_reader.predict_from_array(frame_bgr)
+            except Exception as hud_err:
+                print(f"[hud] Error leyendo HUD local: {hud_err}")
+        # El frame no viaja mas alla del HUD: las etapas siguientes no lo usan.
+        return {"hud": hud, "t_capture": item["t_capture"]}
+
+    def policy_stage(item: dict) -> dict | None:
+        if pipe.stopped:
+            return None
+        ctx["step_idx"] += 1
+        step_idx = ctx["step_idx"]
+
+        if item["hud"] is not None:
+            gs.update_from_hud(item["hud"])
+        else:
+            _apply_hud_defaults(gs)
+
+        state_vec = gs.to_vector()
+        action = policy.choose_action(gs)
+        done, env_info = env_step(action, gs, step_idx=step_idx)
+        reward = compute_reward(
+            ctx["prev_state"], gs, done, env_info.get("result") if done else None
+        )
+        ctx["prev_state"] = copy.deepcopy(gs)
+        ctx["env_info"] = env_info
+        if done:
+            pipe.stop()
+        return {
+            "state_vector": state_vec,
+            "action": action,
+            "reward": reward,
+            "done": done,
+            "info": _step_info(gs, step_idx, env_info, item["t_capture"]),
+        }
+
+    def log_stage(tr: dict) -> None:
+        logger.log_step(**tr)
+        return None
+
+    pipe.source("capture", frames())
+    pipe.stage("hud", hud_stage, maxsize=PIPELINE_FRAME_QUEUE, drop_oldest=True)
+    pipe.stage("policy", policy_stage, maxsize=PIPELINE_FRAME_QUEUE, drop_oldest=True)
+    pipe.stage("log", log_stage, maxsize=PIPELINE_RESULT_QUEUE)
+
+    report = pipe.run(report_every=PIPELINE_REPORT_SECONDS)
+    print("[pipeline] final: " + Pipeline.format_report(report))
+    return ctx["env_info"], ctx["step_idx"]
+
+
+def main(
+    pipelined: bool = REALTIME_PIPELINED,
+    source: str = FRAME_SOURCE,
+    max_speed: bool = FRAME_SOURCE_MAX_SPEED,
+    max_steps: int | None = None,
+) -> None:
+    global frame_source, frame_archive, MAX_STEPS
+    print("Generando episodio de prueba (stub).")
+
+    frame_source = build_frame_source(source, fps=CAPTURE_FPS, max_speed=max_speed)
+    if SAVE_RAW_FRAMES:
+        frame_archive = FrameArchiveWriter(
+            out_dir=str(RAW_FRAMES_DIR),
+            codec=FRAME_ARCHIVE_CODEC,
+            quality=FRAME_ARCHIVE_QUALITY,
+            png_level=FRAME_ARCHIVE_PNG_LEVEL,
+            sample_every=FRAME_ARCHIVE_SAMPLE_EVERY,
+            max_bytes=FRAME_ARCHIVE_MAX_MB * 1024 * 1024,
+        )
+    if max_steps is not None:
+        MAX_STEPS = max_steps
+
+    hud_reader = _load_hud_reader()
+    gs = _initial_state()
+
+    logger = EpisodeLogger()
+    logger.start_episode()
+
+    env_info = {}
+    steps = 0
+    t0 = time.perf_counter()
+    try:
+        if pipelined:
+            env_info, steps = run_pipelined(gs, hud_reader, logger)
+        else:
+            env_info, steps = run_sequential(gs, hud_reader, logger)
     finally:
+        elapsed = time.perf_counter() - t0
+        frame_source.close()
+        print("[capture]", frame_source.timing_stats())
+        if frame_archive is not None:
+            frame_archive.close()
+            print("[archive]", frame_archive.stats())
         meta = {
             "result": env_info.get("result", "unknown"),
             "final_round": gs.round_label,
@@ -170,7 +347,58 @@ def main() -> None:
         }
         path = logger.end_episode(meta)
         print("Episodio guardado en:", path)
+        print(
+            f"[realtime] {steps} pasos en {elapsed:.2f}s "
+            f"({steps / elapsed if elapsed > 0 else 0.0:.1f} pasos/s, fuente={source})"
+        )
+        if hud_reader is not None:
+            # Con cascada, la caché por ROI es la del lector local que envuelve.
+            local_reader = getattr(hud_reader, "local", hud_reader)
+            if local_reader.change_detector is not None:
+                print("[hud] Cache por ROI:", local_reader.change_detector.stats())
+            if local_reader is not hud_reader:
+                print("[hud] Cascada:", hud_reader.stats())
+        if METRICS.enabled:
+            METRICS.dump()
+            for name, s in METRICS.snapshot().items():
+                print(
+                    f"[metrics] {name}: n={s['count']} p50={s['p50_ms']:.2f}ms "
+                    f"p95={s['p95_ms']:.2f}ms p99={s['p99_ms']:.2f}ms"
+                )
+            print(f"[metrics] Guardado en {METRICS.path}")
 
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--pipelined",
+        action="store_true",
+        default=REALTIME_PIPELINED,
+        help="Ejecuta captura/HUD/politica/log como etapas concurrentes.",
+    )
+    parser.add_argument(
+        "--source",
+        default=FRAME_SOURCE,
+        help="window | dir:data/raw_frames | video:ruta.mp4 | synthetic[:N]",
+    )
+    parser.add_argument(
+        "--max-speed",
+        action="store_true",
+        default=FRAME_SOURCE_MAX_SPEED,
+        help="No esperar a CAPTURE_FPS (benchmark de throughput con fuentes de replay).",
+    )
+    parser.add_argument("--max-steps", type=int, default=None)
+    parser.add_argument(
+        "--metrics",
+        action="store_true",
+        help="Activa las latencias por etapa (config.METRICS_ENABLED) para esta ejecución.",
+    )
+    args = parser.parse_args()
+    if args.metrics:
+        METRICS.configure(enabled=True)
+    main(
+        pipelined=args.pipelined,
+        source=args.source,
+        max_speed=args.max_speed,
+        max_steps=args.max_steps,
+    )
@@ -0,0 +1,53 @@
+# tests/test_build_digit_templates.py
+"""
+Plantillas de dígitos a partir de un labels.jsonl con el formato del teacher
+(tools/generate_labels_with_teacher.py): nombre de imagen suelto y "round".
+
+    python -m pytest tests/test_build_digit_templates.py
+"""
+
+import json
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from core.digit_ocr import DigitRecognizer, round_to_glyphs  # noqa: E402
+from tools.build_digit_templates import LABELS_PATH, iter_samples, load_field_crops  # noqa: E402
+
+
+def _teacher_labels(tmp_path: Path) -> Path:
+    """Las etiquetas del repo reescritas como las escribe el teacher."""
+    out = tmp_path / "labels.jsonl"
+    with LABELS_PATH.open("r", encoding="utf-8") as src, out.open("w", encoding="utf-8") as dst:
+        for line in src:
+            if not line.strip():
+                continue
+            rec = json.loads(line)
+            teacher = {
+                "image": Path(rec["image"]).name,
+                "sha1": "",
+                "round": rec["round_label"],
+                "level": rec["level"],
+                "gold": rec["gold"],
+                "hp_self": rec["hp"],
+            }
+            dst.write(json.dumps(teacher) + "\n")
+    return out
+
+
+def test_teacher_labels_build_round_templates(tmp_path):
+    frames = load_field_crops(_teacher_labels(tmp_path))
+
+    assert frames, "los nombres sueltos deben resolverse en data/raw_frames"
+    assert all({"round", "level", "gold"} <= set(crops) for crops in frames)
+
+    rec = DigitRecognizer.fit(iter_samples(frames))
+    assert {"I", "-"} <= set(rec.fit_stats["per_class"])
+
+    # Se entrena con lo que se ve en pantalla: "1-1" -> "I-1".
+    crop, expected = frames[0]["round"]
+    assert expected == round_to_glyphs("1-1")
+    assert rec.read(crop) == expected
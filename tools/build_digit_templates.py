@@ -0,0 +1,146 @@
+# tools/build_digit_templates.py
+"""
+Construye las plantillas de core/digit_ocr.py a partir de las etiquetas del HUD.
+
+Para cada registro de data/labels.jsonl recorta ronda, nivel y oro del frame
+(core/hud_regions.py), segmenta los glifos y, si salen tantos como
+caracteres tiene la etiqueta (o unos pocos más a la izquierda, como el "Lv"
+del orbe, que se aprenden como basura), los añade a las plantillas. La ronda
+se etiqueta "3-4" pero en pantalla es "III-4": se entrena con lo que se ve.
+Con --holdout
+aparta uno de cada N frames y reporta la precisión por campo sobre ellos.
+
+    python tools/build_digit_templates.py
+    python tools/build_digit_templates.py --holdout 4 --out hud_digits.npz
+
+benchmarks/bench_digit_ocr.py compara el resultado con Tesseract.
+"""
+
+import argparse
+import json
+import sys
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Tuple
+
+import numpy as np
+from PIL import Image
+
+ROOT = Path(__file__).resolve().parent.parent
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from config import HUD_DIGIT_TEMPLATES
+from core.digit_ocr import DigitRecognizer, round_to_glyphs
+from core.hud_regions import GOLD_BOX, LEVEL_BOX, ROUND_BOX, crop_box
+from datasets.hud_dataset import image_path, label_value
+
+LABELS_PATH = ROOT / "data" / "labels.jsonl"
+
+# Campo -> caja; la etiqueta se lee con label_value (round o round_label...).
+FIELDS = {
+    "round": ROUND_BOX,
+    "level": LEVEL_BOX,
+    "gold": GOLD_BOX,
+}
+
+
+def load_field_crops(labels_path: Path) -> List[Dict[str, Tuple[np.ndarray, str]]]:
+    """
+    Una entrada por frame etiquetado: {campo: (recorte RGB, texto esperado)}.
+    Se omiten campos sin etiqueta y frames que no existen.
+    """
+    frames: List[Dict[str, Tuple[np.ndarray, str]]] = []
+    with labels_path.open("r", encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            rec = json.loads(line)
+            path = image_path(rec.get("image", ""), ROOT / "data")
+            if not path.is_file():
+                continue
+            rgb = np.asarray(Image.open(path).convert("RGB"))
+            crops = {}
+            for field, box in FIELDS.items():
+                value = label_value(rec, field)
+                if value is None:
+                    continue
+                text = round_to_glyphs(value) if field == "round" else str(value)
+                crops[field] = (np.ascontiguousarray(crop_box(rgb, box)), text)
+            frames.append(crops)
+    return frames
+
+
+def split(frames: List[Any], holdout: int) -> Tuple[List[Any], List[Any]]:
+    """Uno de cada `holdout` frames a evaluación (0 = todo a entrenamiento)."""
+    if holdout <= 1:
+        return frames, []
+    test = frames[holdout - 1 :: holdout]
+    train = [f for i, f in enumerate(frames) if (i + 1) % holdout]
+    return train, test
+
+
+def iter_samples(frames: List[Dict[str, Tuple[np.ndarray, str]]]) -> Iterator[Tuple[np.ndarray, str]]:
+    for crops in frames:
+        yield from crops.values()
+
+
+def accuracy(rec: DigitRecognizer, frames: List[Dict[str, Tuple[np.ndarray, str]]]) -> Dict[str, Dict[str, Any]]:
+    """{campo: {n, correct, rejected, accuracy}}; una lectura None cuenta como fallo."""
+    report: Dict[str, Dict[str, Any]] = {}
+    for field in FIELDS:
+        pairs = [crops[field] for crops in frames if field in crops]
+        correct = rejected = 0
+        for crop, expected in pairs:
+            text = rec.read(crop)
+            rejected += text is None
+            correct += text == expected
+        report[field] = {
+            "n": len(pairs),
+            "correct": correct,
+            "rejected": rejected,
+            "accuracy": round(correct / len(pairs), 4) if pairs else None,
+        }
+    return report
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Plantillas de dígitos del HUD desde data/labels.jsonl.")
+    parser.add_argument("--labels", default=str(LABELS_PATH))
+    parser.add_argument("--out", default=str(ROOT / HUD_DIGIT_TEMPLATES))
+    parser.add_argument("--holdout", type=int, default=0, help="Aparta 1 de cada N frames para evaluar (0 = no).")
+    parser.add_argument("--max-per-class", type=int, default=24, help="Plantillas por carácter.")
+    parser.add_argument("--threshold", type=int, default=120, help="Umbral de binarizado.")
+    parser.add_argument("--min-score", type=float, default=0.6, help="Correlación mínima por glifo.")
+    args = parser.parse_args()
+
+    frames = load_field_crops(Path(args.labels))
+    if not frames:
+        raise SystemExit(f"No hay frames etiquetados en {args.labels}")
+    train, test = split(frames, args.holdout)
+
+    rec = DigitRecognizer.fit(
+        iter_samples(train),
+        max_per_class=args.max_per_class,
+        threshold=args.threshold,
+        min_score=args.min_score,
+    )
+    rec.save(args.out)
+    stats = rec.fit_stats
+    print(
+        f"[digits] {len(train)} frames: {stats['samples_used']} recortes usados, "
+        f"{stats['samples_skipped']} descartados (segmentación != etiqueta)"
+    )
+    print(f"[digits] Glifos por carácter: {stats['per_class']}")
+    missing = [ch for ch in rec.charset if ch not in stats["per_class"]]
+    if missing:
+        print(f"[digits] Aviso: sin ejemplos de {''.join(missing)!r}; no se podrán leer")
+
+    if test:
+        print(f"[digits] Evaluación sobre {len(test)} frames apartados:")
+        for field, r in accuracy(rec, test).items():
+            print(f"  {field:<6} n={r['n']:<4} acierto={r['accuracy']}  rechazados={r['rejected']}")
+    print(f"[digits] Plantillas guardadas en {args.out} ({len(rec.templates)} en total)")
+
+
+if __name__ == "__main__":
+    main()
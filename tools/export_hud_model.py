@@ -0,0 +1,245 @@
+# tools/export_hud_model.py
+"""
+Exporta el checkpoint del modelo HUD (hud_model.pt) a un artefacto de
+inferencia para CPU que HUDLocalReader carga directamente (core/hud_runtime.py):
+
+  --format torchscript  .ts, trace + freeze (pliega BatchNorm en las convs)
+  --format onnx         .onnx para ONNX Runtime (necesita onnx y onnxruntime)
+
+  --quantize dynamic    int8 en los pesos de las capas lineales (las cabezas);
+                        en ONNX Runtime también convs (ConvInteger, que en
+                        CPU suele ser más lento que fp32). No necesita datos.
+  --quantize static     int8 en pesos y activaciones, calibrado con los frames
+                        de data/labels.jsonl (FX graph mode en TorchScript,
+                        quantize_static en ONNX Runtime).
+  --channels-last       pesos y entradas NHWC (solo TorchScript).
+
+    python tools/export_hud_model.py
+    python tools/export_hud_model.py --quantize static --channels-last
+    python tools/export_hud_model.py --format onnx --quantize dynamic --out hud_model.int8.onnx
+
+Sin --out el nombre sale del checkpoint: hud_model.static.cl.ts, etc.
+benchmarks/bench_hud_runtime.py compara latencia y acierto de cada variante.
+"""
+
+import argparse
+import json
+import sys
+import tempfile
+from pathlib import Path
+from typing import Any, Dict, List, Tuple
+
+import numpy as np
+import torch
+import torch.nn as nn
+from PIL import Image
+
+ROOT = Path(__file__).resolve().parent.parent
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from core.hud_runtime import META_NAME, ONNX_OUTPUTS, ExportWrapper, flatten_inputs, input_names, load_checkpoint
+from datasets.hud_dataset import image_path
+from models.hud_roi_model import FrameTransform, RoiTransform, stack_inputs
+
+LABELS_PATH = ROOT / "data" / "labels.jsonl"
+FORMAT_SUFFIX = {"torchscript": ".ts", "onnx": ".onnx"}
+
+
+def load_labeled_frames(labels_path: Path = LABELS_PATH, limit: int | None = None) -> List[Tuple[np.ndarray, Dict[str, Any]]]:
+    """(frame RGB, registro de labels.jsonl) por cada imagen que existe."""
+    frames: List[Tuple[np.ndarray, Dict[str, Any]]] = []
+    if not labels_path.exists():
+        return frames
+    with labels_path.open("r", encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            rec = json.loads(line)
+            path = image_path(rec.get("image", ""), ROOT / "data")
+            if not path.is_file():
+                continue
+            frames.append((np.asarray(Image.open(path).convert("RGB")), rec))
+            if limit is not None and len(frames) >= limit:
+                break
+    return frames
+
+
+def default_out_path(weights: Path, fmt: str, quantize: str, channels_last: bool) -> Path:
+    parts = [weights.stem]
+    if quantize != "none":
+        parts.append(quantize)
+    if channels_last and fmt == "torchscript":
+        parts.append("cl")
+    return weights.with_name(".".join(parts) + FORMAT_SUFFIX[fmt])
+
+
+def _transform(meta: Dict[str, Any]) -> Any:
+    return RoiTransform(meta.get("roi_sizes")) if meta["model_type"] == "roi" else FrameTransform(meta["input_size"])
+
+
+def _calibration_batches(meta: Dict[str, Any], frames: List[Tuple[np.ndarray, Dict[str, Any]]], batch_size: int = 8) -> List[Any]:
+    transform = _transform(meta)
+    samples = [transform(rgb) for rgb, _ in frames]
+    return [stack_inputs(samples[i : i + batch_size]) for i in range(0, len(samples), batch_size)]
+
+
+def _example_input(meta: Dict[str, Any]) -> Any:
+    """Lote de 1 con la forma de entrada del modelo (el contenido da igual para el trace)."""
+    if meta["model_type"] == "roi":
+        return {name: torch.zeros(1, 3, h, w) for name, (h, w) in _transform(meta).roi_sizes.items()}
+    return torch.zeros(1, 3, *_transform(meta).size)
+
+
+def _to_memory_format(x: Any, memory_format: torch.memory_format) -> Any:
+    if isinstance(x, dict):
+        return {k: v.contiguous(memory_format=memory_format) for k, v in x.items()}
+    return x.contiguous(memory_format=memory_format)
+
+
+def _quantize_static_fx(model: nn.Module, example: Any, calib: List[Any]) -> nn.Module:
+    from torch.ao.quantization import get_default_qconfig_mapping
+    from torch.ao.quantization.quantize_fx import convert_fx, prepare_fx
+
+    qmapping = get_default_qconfig_mapping(torch.backends.quantized.engine)
+    prepared = prepare_fx(model, qmapping, (example,))
+    with torch.no_grad():
+        for x in calib:
+            prepared(x)
+    return convert_fx(prepared)
+
+
+def export_torchscript(
+    model: nn.Module,
+    meta: Dict[str, Any],
+    out: Path,
+    quantize: str,
+    channels_last: bool,
+    calib: List[Any],
+) -> None:
+    example = _example_input(meta)
+    if quantize == "dynamic":
+        model = torch.ao.quantization.quantize_dynamic(model, {nn.Linear}, dtype=torch.qint8)
+    elif quantize == "static":
+        model = _quantize_static_fx(model, example, calib)
+    if channels_last:
+        model = model.to(memory_format=torch.channels_last)
+        example = _to_memory_format(example, torch.channels_last)
+
+    wrapper = ExportWrapper(model, input_names(meta)).eval()
+    with torch.no_grad():
+        traced = torch.jit.trace(wrapper, flatten_inputs(example, wrapper.names), check_trace=False)
+    traced = torch.jit.freeze(traced)
+    torch.jit.save(traced, str(out), _extra_files={META_NAME: json.dumps(meta)})
+
+
+def export_onnx(model: nn.Module, meta: Dict[str, Any], out: Path, quantize: str, calib: List[Any]) -> None:
+    import onnx
+
+    names = input_names(meta)
+    wrapper = ExportWrapper(model, names).eval()
+    dynamic_axes = {name: {0: "batch"} for name in [*names, *ONNX_OUTPUTS]}
+    with tempfile.TemporaryDirectory() as tmp:
+        fp32_path = out if quantize == "none" else Path(tmp) / "fp32.onnx"
+        torch.onnx.export(
+            wrapper,
+            flatten_inputs(_example_input(meta), names),
+            str(fp32_path),
+            input_names=names,
+            output_names=list(ONNX_OUTPUTS),
+            dynamic_axes=dynamic_axes,
+            opset_version=17,
+            dynamo=False,
+        )
+        if quantize != "none":
+            from onnxruntime.quantization import CalibrationDataReader, QuantType, quantize_dynamic, quantize_static
+            from onnxruntime.quantization.shape_inference import quant_pre_process
+
+            # Optimiza el grafo antes de cuantizar: el encoder compartido del
+            # modelo roi sale con pesos no constantes sin este paso.
+            pre_path = Path(tmp) / "pre.onnx"
+            quant_pre_process(str(fp32_path), str(pre_path))
+            fp32_path = pre_path
+
+            if quantize == "dynamic":
+                quantize_dynamic(str(fp32_path), str(out), weight_type=QuantType.QInt8)
+            else:
+
+                class _Reader(CalibrationDataReader):
+                    def __init__(self) -> None:
+                        self.batches = iter(calib)
+
+                    def get_next(self) -> Dict[str, np.ndarray] | None:
+                        x = next(self.batches, None)
+                        if x is None:
+                            return None
+                        return {n: t.numpy() for n, t in zip(names, flatten_inputs(x, names))}
+
+                quantize_static(str(fp32_path), str(out), _Reader(), weight_type=QuantType.QInt8)
+
+    proto = onnx.load(str(out))
+    entry = proto.metadata_props.add()
+    entry.key = META_NAME
+    entry.value = json.dumps(meta)
+    onnx.save(proto, str(out))
+
+
+def export(
+    weights: Path,
+    out: Path | None = None,
+    fmt: str = "torchscript",
+    quantize: str = "none",
+    channels_last: bool = False,
+    frames: List[Tuple[np.ndarray, Dict[str, Any]]] | None = None,
+) -> Path:
+    """
+    Exporta `weights` (checkpoint .pt) y devuelve la ruta del artefacto.
+    `frames` solo hace falta con quantize="static" (calibración).
+    """
+    model, meta = load_checkpoint(weights)
+    out = out or default_out_path(weights, fmt, quantize, channels_last)
+    calib: List[Any] = []
+    if quantize == "static":
+        if not frames:
+            raise ValueError("La cuantización estática necesita frames de calibración (data/labels.jsonl)")
+        calib = _calibration_batches(meta, frames)
+
+    meta = dict(meta, format=fmt, quantization=quantize, channels_last=channels_last and fmt == "torchscript")
+    if quantize != "none" and fmt == "torchscript":
+        meta["qengine"] = torch.backends.quantized.engine
+
+    if fmt == "onnx":
+        export_onnx(model, meta, out, quantize, calib)
+    else:
+        export_torchscript(model, meta, out, quantize, channels_last, calib)
+    return out
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Exporta hud_model.pt a TorchScript/ONNX optimizado para CPU.")
+    parser.add_argument("--weights", default=str(ROOT / "hud_model.pt"))
+    parser.add_argument("--out", default=None, help="Por defecto, junto al checkpoint (hud_model.static.cl.ts...).")
+    parser.add_argument("--format", choices=tuple(FORMAT_SUFFIX), default="torchscript")
+    parser.add_argument("--quantize", choices=("none", "dynamic", "static"), default="none")
+    parser.add_argument("--channels-last", action="store_true")
+    parser.add_argument("--labels", default=str(LABELS_PATH), help="Frames de calibración para --quantize static.")
+    parser.add_argument("--calib-frames", type=int, default=64)
+    args = parser.parse_args()
+
+    weights = Path(args.weights)
+    if not weights.exists():
+        raise SystemExit(f"No existe {weights}. Entrena el modelo con train_hud_model.py primero.")
+    frames = load_labeled_frames(Path(args.labels), args.calib_frames) if args.quantize == "static" else None
+    out = export(
+        weights,
+        Path(args.out) if args.out else None,
+        args.format,
+        args.quantize,
+        args.channels_last,
+        frames,
+    )
+    print(f"[export] {weights} -> {out} ({out.stat().st_size / 1e6:.1f} MB)")
+
+
+if __name__ == "__main__":
+    main()
@@ -2,11 +2,35 @@
 """
 Recorre data/raw_frames/, envía cada imagen al 'teacher' (API de visión)
 y genera data/labels.jsonl con las etiquetas para el modelo local.
+
+El etiquetado es concurrente y reanudable:
+
+  - varias imágenes en vuelo a la vez (--workers), con reintentos y
+    backoff exponencial si la API falla,
+  - cada etiqueta lleva el sha1 del archivo; al relanzar se saltan las
+    imágenes cuyo contenido ya está en labels.jsonl (aunque cambie el
+    nombre), así que el propio JSONL es el checkpoint,
+  - cada registro se escribe como una línea completa (write + fsync bajo
+    lock). Si el proceso muere a mitad de línea, esa línea incompleta se
+    descarta al reanudar.
+
+    python tools/generate_labels_with_teacher.py --workers 8
+    python tools/generate_labels_with_teacher.py --fresh   # reetiquetar todo
+
+Las llamadas no pasan por la caché de respuestas del VLM (core/vlm_cache.py).
 """
 
+import argparse
+import hashlib
 import json
+import os
+import random
 import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
+from typing import Any, Dict, Optional, Set, Tuple
 
 ROOT = Path(__file__).resolve().parent.parent
 if str(ROOT) not in sys.path:
@@ -18,33 +42,198 @@ from vlm_api import analyze_hud_image
 DATA_DIR = Path("data")
 FRAMES_DIR = DATA_DIR / "raw_frames"
 OUT_PATH = DATA_DIR / "labels.jsonl"
+# Lo que escribe core/frame_archive.py según FRAME_ARCHIVE_CODEC (y capturas a mano).
+IMAGE_SUFFIXES = {".png", ".jpg", ".jpeg", ".webp", ".bmp"}
 
 
-def main() -> None:
-    if not FRAMES_DIR.exists():
-        raise SystemExit(f"No existe el directorio de frames: {FRAMES_DIR}")
+def file_sha1(path: Path) -> str:
+    h = hashlib.sha1()
+    with path.open("rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def load_labeled(path: Path) -> Tuple[Set[str], Set[str]]:
+    """
+    (hashes, nombres) ya etiquetados en `path`. Los nombres solo se usan
+    para registros antiguos sin sha1. Si la última línea quedó a medias (el
+    proceso murió escribiendo), se recorta el archivo hasta la última línea
+    completa para que los siguientes appends no queden pegados a ella.
+    """
+    hashes: Set[str] = set()
+    legacy_names: Set[str] = set()
+    if not path.exists():
+        return hashes, legacy_names
+
+    raw = path.read_bytes()
+    end = raw.rfind(b"\n") + 1
+    if end < len(raw):
+        print(f"[labels] Descartando línea incompleta al final de {path}")
+        with path.open("r+b") as f:
+            f.truncate(end)
+            f.flush()
+            os.fsync(f.fileno())
+
+    for line in raw[:end].decode("utf-8").splitlines():
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            rec = json.loads(line)
+        except json.JSONDecodeError:
+            continue
+        if rec.get("sha1"):
+            hashes.add(rec["sha1"])
+        elif rec.get("image"):
+            legacy_names.add(Path(str(rec["image"]).replace("\\", "/")).name)
+    return hashes, legacy_names
+
+
+class LabelWriter:
+    """Append de registros JSONL, una línea completa por write, seguro entre hilos."""
+
+    def __init__(self, path: Path) -> None:
+        self._f = path.open("a", encoding="utf-8")
+        self._lock = threading.Lock()
+
+    def write(self, record: Dict[str, Any]) -> None:
+        line = json.dumps(record, ensure_ascii=False) + "\n"
+        with self._lock:
+            self._f.write(line)
+            self._f.flush()
+            os.fsync(self._f.fileno())
+
+    def close(self) -> None:
+        self._f.close()
+
 
-    images = sorted(p for p in FRAMES_DIR.glob("*.png"))
+def label_with_retries(img_path: Path, retries: int, backoff_s: float) -> Dict[str, Any]:
+    """Llama al teacher; reintenta con backoff exponencial (+ jitter) si falla."""
+    for attempt in range(retries + 1):
+        try:
+            # Sin caché de respuestas: una etiqueta ajena sería un error en el
+            # dataset, y el sha1 de labels.jsonl ya evita repetir imágenes.
+            return analyze_hud_image(str(img_path), use_cache=False)
+        except Exception as e:
+            if attempt >= retries:
+                raise
+            delay = backoff_s * (2 ** attempt) * (1.0 + random.random() * 0.25)
+            print(f"[labels] {img_path.name}: {e!r}; reintento {attempt + 1}/{retries} en {delay:.1f}s")
+            time.sleep(delay)
+    raise AssertionError("unreachable")
+
+
+def _label_one(img_path: Path, sha1: str, retries: int, backoff_s: float) -> Dict[str, Any]:
+    hud = label_with_retries(img_path, retries, backoff_s)
+    return {
+        "image": img_path.name,
+        "sha1": sha1,
+        "round": hud.get("round"),
+        "level": hud.get("level"),
+        "gold": hud.get("gold"),
+        "hp_self": hud.get("hp_self"),
+    }
+
+
+def run(
+    frames_dir: Path = FRAMES_DIR,
+    out_path: Path = OUT_PATH,
+    workers: int = 4,
+    retries: int = 3,
+    backoff_s: float = 1.0,
+    limit: Optional[int] = None,
+) -> Dict[str, int]:
+    if not frames_dir.exists():
+        raise SystemExit(f"No existe el directorio de frames: {frames_dir}")
+
+    images = sorted(p for p in frames_dir.glob("*") if p.suffix.lower() in IMAGE_SUFFIXES)
 
     if not images:
-        raise SystemExit(f"No se encontraron PNG en {FRAMES_DIR}")
-
-    OUT_PATH.parent.mkdir(parents=True, exist_ok=True)
-
-    with OUT_PATH.open("w", encoding="utf-8") as out_f:
-        for img_path in images:
-            hud = analyze_hud_image(str(img_path))
-            record = {
-                "image": img_path.name,
-                "round": hud.get("round"),
-                "level": hud.get("level"),
-                "gold": hud.get("gold"),
-                "hp_self": hud.get("hp_self"),
+        raise SystemExit(f"No se encontraron imágenes ({', '.join(sorted(IMAGE_SUFFIXES))}) en {frames_dir}")
+
+    out_path.parent.mkdir(parents=True, exist_ok=True)
+    done, legacy_names = load_labeled(out_path)
+
+    # Pendientes: contenido no etiquetado todavía (ni repetido en esta pasada).
+    pending = []
+    seen = set(done)
+    for p in images:
+        if p.name in legacy_names:
+            continue
+        sha1 = file_sha1(p)
+        if sha1 in seen:
+            continue
+        seen.add(sha1)
+        pending.append((p, sha1))
+    if limit is not None:
+        pending = pending[:limit]
+
+    print(
+        f"[labels] {len(images)} imágenes, {len(done) + len(legacy_names)} ya etiquetadas, "
+        f"{len(pending)} pendientes ({workers} en paralelo)"
+    )
+
+    stats = {"labeled": 0, "failed": 0, "skipped": len(images) - len(pending)}
+    writer = LabelWriter(out_path)
+    t0 = time.perf_counter()
+    try:
+        with ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="teacher") as pool:
+            futures = {
+                pool.submit(_label_one, p, sha1, retries, backoff_s): p for p, sha1 in pending
             }
-            out_f.write(json.dumps(record, ensure_ascii=False) + "\n")
-            print("Etiquetado:", record)
+            for i, fut in enumerate(as_completed(futures), start=1):
+                img_path = futures[fut]
+                try:
+                    record = fut.result()
+                except Exception as e:
+                    stats["failed"] += 1
+                    print(f"[labels] ERROR {img_path.name}: {e!r} (se reintentará en la próxima ejecución)")
+                    continue
+                writer.write(record)
+                stats["labeled"] += 1
+                print(f"[{i}/{len(pending)}] Etiquetado:", record)
+    finally:
+        writer.close()
+
+    elapsed = time.perf_counter() - t0
+    rate = stats["labeled"] / elapsed if elapsed > 0 else 0.0
+    print(
+        f"\nListo en {elapsed:.1f}s ({rate:.2f} img/s): {stats['labeled']} nuevas, "
+        f"{stats['skipped']} saltadas, {stats['failed']} fallidas. Dataset en {out_path}"
+    )
+    return stats
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Etiqueta data/raw_frames con el teacher (VLM).")
+    parser.add_argument("--frames-dir", default=str(FRAMES_DIR))
+    parser.add_argument("--out", default=str(OUT_PATH))
+    parser.add_argument("--workers", type=int, default=4, help="Peticiones simultáneas al teacher.")
+    parser.add_argument("--retries", type=int, default=3, help="Reintentos por imagen.")
+    parser.add_argument("--backoff", type=float, default=1.0, help="Espera inicial entre reintentos (s).")
+    parser.add_argument("--limit", type=int, default=None, help="Etiquetar como mucho N imágenes.")
+    parser.add_argument(
+        "--fresh",
+        action="store_true",
+        help="Ignorar etiquetas previas (el archivo actual se mueve a .bak).",
+    )
+    args = parser.parse_args()
+
+    out_path = Path(args.out)
+    if args.fresh and out_path.exists():
+        backup = out_path.with_suffix(out_path.suffix + ".bak")
+        os.replace(out_path, backup)
+        print(f"[labels] {out_path} movido a {backup}")
 
-    print(f"\nListo. Dataset guardado en {OUT_PATH}")
+    run(
+        frames_dir=Path(args.frames_dir),
+        out_path=out_path,
+        workers=args.workers,
+        retries=args.retries,
+        backoff_s=args.backoff,
+        limit=args.limit,
+    )
 
 
 if __name__ == "__main__":
@@ -0,0 +1,136 @@
+# tools/hud_bulk_predict.py
+"""
+Lee con el modelo HUD local todas las imágenes de un directorio y escribe
+una lectura por línea en JSONL.
+
+El decodificado y el preprocesado (el transform del checkpoint) corren en
+--workers procesos de un DataLoader; el hilo principal solo hace un forward
+por lote de --batch-size imágenes. Sirve para reetiquetar offline, evaluar
+el modelo contra data/labels.jsonl o revisar un dataset sin ir de una en
+una como en el loop en tiempo real.
+
+    python tools/hud_bulk_predict.py data/raw_frames
+    python tools/hud_bulk_predict.py frames/ --out data/hud_predictions.jsonl --batch-size 64 --workers 8
+
+Cada línea: {"image", "round", "level", "gold", "hp_self", "confidence"};
+una imagen que no se puede leer sale con "error" y sin lectura.
+"""
+
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+from typing import Any, Iterator, List, Optional, Tuple
+
+import torch
+from PIL import Image
+from torch.utils.data import DataLoader, Dataset
+
+ROOT = Path(__file__).resolve().parent.parent
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from config import HUD_MODEL_WEIGHTS, HUD_PREDICT_BATCH_SIZE, HUD_PREDICT_WORKERS
+from core.hud_local_reader import HUDLocalReader
+from models.hud_roi_model import stack_inputs
+
+IMAGE_SUFFIXES = {".png", ".jpg", ".jpeg", ".webp", ".bmp"}
+
+
+class ImagePathDataset(Dataset):
+    """Rutas -> (tensor | None, índice, error). Un archivo roto no tumba el lote."""
+
+    def __init__(self, paths: List[Path], transform: Any) -> None:
+        self.paths = paths
+        self.transform = transform
+
+    def __len__(self) -> int:
+        return len(self.paths)
+
+    def __getitem__(self, idx: int) -> Tuple[Optional[Any], int, str]:
+        try:
+            img = Image.open(self.paths[idx]).convert("RGB")
+            return self.transform(img), idx, ""
+        except Exception as e:
+            return None, idx, f"{type(e).__name__}: {e}"
+
+
+def collate(items: List[Tuple[Optional[Any], int, str]]) -> Tuple[Optional[Any], List[Tuple[int, str]]]:
+    """(entradas válidas apiladas | None, [(índice, error)] de todo el lote en orden)."""
+    tensors = [t for t, _, _ in items if t is not None]
+    return (stack_inputs(tensors) if tensors else None), [(idx, err) for _, idx, err in items]
+
+
+def list_images(directory: Path, recursive: bool = False) -> List[Path]:
+    pattern = "**/*" if recursive else "*"
+    return sorted(p for p in directory.glob(pattern) if p.suffix.lower() in IMAGE_SUFFIXES)
+
+
+def bulk_predict(
+    reader: HUDLocalReader,
+    paths: List[Path],
+    batch_size: int = HUD_PREDICT_BATCH_SIZE,
+    workers: int = HUD_PREDICT_WORKERS,
+) -> Iterator[dict]:
+    """Lecturas en el mismo orden que `paths`, lote a lote."""
+    loader = DataLoader(
+        ImagePathDataset(paths, reader.transform),
+        batch_size=batch_size,
+        shuffle=False,
+        num_workers=workers,
+        collate_fn=collate,
+        pin_memory=reader.device != "cpu",
+    )
+    for x, entries in loader:
+        huds = iter(reader.predict_tensor_batch(x) if x is not None else [])
+        for idx, error in entries:
+            if error:
+                yield {"image": str(paths[idx]), "error": error}
+            else:
+                yield {"image": str(paths[idx]), **next(huds)}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Lectura del HUD por lotes sobre un directorio de imágenes.")
+    parser.add_argument("directory", help="Directorio con capturas (png/jpg/webp/bmp).")
+    parser.add_argument("--out", default="data/hud_predictions.jsonl")
+    parser.add_argument("--weights", default=HUD_MODEL_WEIGHTS, help="Checkpoint .pt o artefacto exportado (.ts/.onnx).")
+    parser.add_argument("--batch-size", type=int, default=HUD_PREDICT_BATCH_SIZE)
+    parser.add_argument("--workers", type=int, default=HUD_PREDICT_WORKERS, help="Procesos de decodificado (0 = en línea).")
+    parser.add_argument("--device", default=None, help="cpu | cuda (por defecto, la que haya).")
+    parser.add_argument("--threads", type=int, default=None, help="torch.set_num_threads para el forward.")
+    parser.add_argument("--recursive", action="store_true", help="Incluir subdirectorios.")
+    parser.add_argument("--limit", type=int, default=None, help="Leer como mucho N imágenes.")
+    args = parser.parse_args()
+
+    if args.threads:
+        torch.set_num_threads(args.threads)
+
+    paths = list_images(Path(args.directory), args.recursive)[: args.limit]
+    if not paths:
+        raise SystemExit(f"No hay imágenes en {args.directory}")
+
+    reader = HUDLocalReader(args.weights, device=args.device, change_detection=False)
+    out_path = Path(args.out)
+    out_path.parent.mkdir(parents=True, exist_ok=True)
+
+    print(f"[bulk] {len(paths)} imágenes, lotes de {args.batch_size}, {args.workers} workers, {reader.device}")
+    t0 = time.perf_counter()
+    done = errors = 0
+    with out_path.open("w", encoding="utf-8") as f:
+        for rec in bulk_predict(reader, paths, args.batch_size, args.workers):
+            f.write(json.dumps(rec, ensure_ascii=False) + "\n")
+            done += 1
+            errors += "error" in rec
+            if done % (args.batch_size * 10) == 0:
+                print(f"[bulk] {done}/{len(paths)} ({done / (time.perf_counter() - t0):.1f} img/s)")
+    elapsed = time.perf_counter() - t0
+    print(
+        f"[bulk] {done} lecturas en {elapsed:.1f}s ({done / elapsed:.1f} img/s), "
+        f"{errors} errores -> {out_path}"
+    )
+
+
+if __name__ == "__main__":
+    main()
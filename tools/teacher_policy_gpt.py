@@ -11,22 +11,44 @@ Salida:
     {"state": [...], "info": {...}, "best_action": "level_up"}
 
 Este dataset se puede usar para entrenar la PolicyNetwork (imitation learning).
+
+El prompt solo depende de (round, gold, level, hp), así que muchas líneas
+piden lo mismo. Se canonizan esos campos, se agrupan los estados iguales y
+solo se consulta al teacher una vez por estado distinto (en paralelo, con
+--workers). Las respuestas quedan en la caché persistente de core/vlm_cache.py
+(clave sin imágenes), de modo que una segunda ejecución no repite llamadas.
+Cada respuesta se copia a todos los registros originales, en su orden.
+
+    python tools/teacher_policy_gpt.py --workers 8
 """
 
 from __future__ import annotations
 
+import argparse
 import json
 import os
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
-from typing import Any, Dict
+from typing import Any, Dict, List, Optional, Tuple
 
-from openai import OpenAI
+ROOT = Path(__file__).resolve().parent.parent
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from config import OPENAI_API_BASE_URL
+from core.api_gateway import get_gateway, message_text
+from core.vlm_cache import get_vlm_cache
 
 
 INPUT_PATH = Path("data/states_for_teacher.jsonl")
 OUT_PATH = Path("data/teacher_labels.jsonl")
 
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+gateway = get_gateway(OPENAI_API_BASE_URL, api_key=os.getenv("OPENAI_API_KEY", ""))
+
+TEACHER_MODEL = "gpt-4.1-mini"
+SYSTEM_PROMPT = "Eres un jugador profesional de Magic Chess."
 
 ACTIONS = [
     "noop",
@@ -37,6 +59,31 @@ ACTIONS = [
 ]
 
 
+StateKey = Tuple[str, int, int, int]
+
+
+def _as_int(value: Any, default: int) -> int:
+    try:
+        return int(float(value))
+    except (TypeError, ValueError):
+        return default
+
+
+def canonical_info(info: Dict[str, Any]) -> StateKey:
+    """
+    (round, gold, level, hp) normalizados: defaults para los que faltan,
+    números como int ("6", 6.0 y 6 son lo mismo) y la ronda sin espacios.
+    """
+    round_label = info.get("round")
+    round_label = str(round_label).strip().replace(" ", "") if round_label is not None else "1-1"
+    return (
+        round_label or "1-1",
+        _as_int(info.get("gold"), 0),
+        _as_int(info.get("level"), 1),
+        _as_int(info.get("hp"), 100),
+    )
+
+
 def build_prompt(state: Dict[str, Any], info: Dict[str, Any]) -> str:
     """
     Construye el prompt textual para GPT.
@@ -44,10 +91,7 @@ def build_prompt(state: Dict[str, Any], info: Dict[str, Any]) -> str:
     state: vector numérico, pero aquí nos interesa más info semántica de 'info'.
     info: diccionario con campos tipo round, gold, level, hp, etc.
     """
-    round_label = info.get("round", "1-1")
-    gold = info.get("gold", 0)
-    level = info.get("level", 1)
-    hp = info.get("hp", 100)
+    round_label, gold, level, hp = canonical_info(info)
 
     return (
         "Eres un experto jugando Magic Chess. Voy a darte el estado actual de la partida y "
@@ -64,68 +108,125 @@ def build_prompt(state: Dict[str, Any], info: Dict[str, Any]) -> str:
     )
 
 
-def main() -> None:
-    if not INPUT_PATH.exists():
-        raise SystemExit(f"No existe el archivo de entrada: {INPUT_PATH}")
+def _parse_label(content: str) -> Optional[Dict[str, Any]]:
+    try:
+        return json.loads(content)
+    except json.JSONDecodeError:
+        # intentar recortar la parte JSON
+        start = content.find("{")
+        end = content.rfind("}")
+        if start != -1 and end != -1 and end > start:
+            return json.loads(content[start : end + 1])
+    return None
+
+
+def _ask_teacher(prompt: str) -> Dict[str, Any]:
+    """Una llamada al teacher. {} si la respuesta no es una acción válida (no se cachea)."""
+    resp = gateway.chat(
+        model=TEACHER_MODEL,
+        messages=[
+            {"role": "system", "content": SYSTEM_PROMPT},
+            {"role": "user", "content": prompt},
+        ],
+        temperature=0.2,
+    )
+
+    content = message_text(resp)
+    label = _parse_label(content)
+    if label is None:
+        print("No se pudo parsear JSON en respuesta:", content)
+        return {}
+
+    best_action = label.get("best_action")
+    if best_action not in ACTIONS:
+        print("Acción inválida recibida:", best_action, "respuesta=", label)
+        return {}
+    return {"best_action": best_action}
+
+
+def label_unique(keys: List[StateKey], workers: int = 4) -> Tuple[Dict[StateKey, Optional[str]], int]:
+    """
+    Acción del teacher para cada estado canónico. Devuelve (acciones, llamadas
+    hechas a la API); los aciertos de caché no cuentan como llamada.
+    """
+    cache = get_vlm_cache()
+    calls = 0
+    calls_lock = threading.Lock()
+
+    def one(key: StateKey) -> Optional[str]:
+        prompt = build_prompt({}, dict(zip(("round", "gold", "level", "hp"), key)))
+
+        def request() -> Dict[str, Any]:
+            nonlocal calls
+            with calls_lock:
+                calls += 1
+            return _ask_teacher(prompt)
+
+        answer = cache.get_or_call([], SYSTEM_PROMPT + "\n" + prompt, TEACHER_MODEL, request)
+        return (answer or {}).get("best_action")
+
+    actions: Dict[StateKey, Optional[str]] = {}
+    with ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="teacher") as pool:
+        futures = {pool.submit(one, key): key for key in keys}
+        for fut in as_completed(futures):
+            key = futures[fut]
+            try:
+                actions[key] = fut.result()
+            except Exception as e:
+                print(f"Error consultando al teacher para {key}: {e!r}")
+                actions[key] = None
+    return actions, calls
 
-    OUT_PATH.parent.mkdir(parents=True, exist_ok=True)
 
-    with INPUT_PATH.open("r", encoding="utf-8") as f_in, OUT_PATH.open(
-        "w", encoding="utf-8"
-    ) as f_out:
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Etiqueta estados con la acción sugerida por el teacher.")
+    parser.add_argument("--input", default=str(INPUT_PATH))
+    parser.add_argument("--out", default=str(OUT_PATH))
+    parser.add_argument("--workers", type=int, default=4, help="Peticiones simultáneas al teacher.")
+    args = parser.parse_args()
+
+    input_path = Path(args.input)
+    out_path = Path(args.out)
+    if not input_path.exists():
+        raise SystemExit(f"No existe el archivo de entrada: {input_path}")
+
+    records: List[Dict[str, Any]] = []
+    with input_path.open("r", encoding="utf-8") as f_in:
         for line in f_in:
             line = line.strip()
             if not line:
                 continue
-            rec = json.loads(line)
-            state = rec.get("state", [])
-            info = rec.get("info", {})
-
-            prompt = build_prompt(state, info)
-
-            resp = client.chat.completions.create(
-                model="gpt-4.1-mini",
-                messages=[
-                    {"role": "system", "content": "Eres un jugador profesional de Magic Chess."},
-                    {"role": "user", "content": prompt},
-                ],
-                temperature=0.2,
-            )
-
-            content = resp.choices[0].message.content
-            if isinstance(content, list):
-                text_parts = []
-                for c in content:
-                    if isinstance(c, dict) and "text" in c:
-                        text_parts.append(c["text"])
-                content = "".join(text_parts)
+            records.append(json.loads(line))
 
-            try:
-                label = json.loads(content)
-            except json.JSONDecodeError:
-                # intentar recortar la parte JSON
-                start = content.find("{")
-                end = content.rfind("}")
-                if start != -1 and end != -1 and end > start:
-                    label = json.loads(content[start : end + 1])
-                else:
-                    print("No se pudo parsear JSON en respuesta:", content)
-                    continue
-
-            best_action = label.get("best_action")
-            if best_action not in ACTIONS:
-                print("Acción inválida recibida:", best_action, "respuesta=", label)
-                continue
+    keys = [canonical_info(rec.get("info", {})) for rec in records]
+    unique = list(dict.fromkeys(keys))
+    print(f"{len(records)} estados, {len(unique)} distintos. Consultando al teacher...")
 
+    actions, calls = label_unique(unique, workers=args.workers)
+
+    out_path.parent.mkdir(parents=True, exist_ok=True)
+    written = 0
+    with out_path.open("w", encoding="utf-8") as f_out:
+        for rec, key in zip(records, keys):
+            best_action = actions.get(key)
+            if best_action is None:
+                continue
             out_rec = {
-                "state": state,
-                "info": info,
+                "state": rec.get("state", []),
+                "info": rec.get("info", {}),
                 "best_action": best_action,
             }
             f_out.write(json.dumps(out_rec, ensure_ascii=False) + "\n")
-            print("Etiquetado con teacher:", out_rec)
+            written += 1
 
-    print(f"Etiquetas de teacher guardadas en {OUT_PATH}")
+    failed = sum(1 for key in unique if actions.get(key) is None)
+    print(f"Etiquetas de teacher guardadas en {out_path}: {written}/{len(records)} registros")
+    print(
+        f"[teacher] llamadas a la API: {calls} (sin deduplicar ni caché serían {len(records)}; "
+        f"ahorradas {len(records) - calls}), estados distintos: {len(unique)}, sin etiqueta: {failed}"
+    )
+    print("[gateway]", gateway.stats())
+    print("[cache]", get_vlm_cache().stats())
 
 
 if __name__ == "__main__":
@@ -0,0 +1,306 @@
+# tools/vlm_standin_server.py
+"""
+Servidor local que imita la API OpenAI de LM Studio / NIM.
+
+No ejecuta ningún modelo. Responde un JSON enlatado tras una latencia
+simulada, así que sirve para medir el coste de nuestro lado (codificación,
+payload, conexiones, concurrencia) y para probar las rutas de percepción
+sin GPU ni red.
+
+Endpoints:
+  GET  /v1/models             lista con el modelo configurado
+  POST /v1/chat/completions   respuesta completa o SSE (stream=true)
+
+Latencia = muestra de la distribución (--latency) + ms por MB recibido
+(subida + decodificación de la imagen en el servidor real):
+
+  fixed:40            siempre 40 ms
+  uniform:20,80       uniforme entre 20 y 80 ms
+  normal:50,10        media 50, desviación 10 (recortada a >= 0)
+  lognormal:50,0.5    mediana 50 ms, sigma 0.5 (cola larga, como un VLM real)
+  exp:50              exponencial de media 50 ms
+
+Con --error-rate una fracción de las peticiones responde --error-status
+(500 por defecto; 429 para probar reintentos). --answers apunta a un JSON
+con respuestas enlatadas: [{"match": "texto del prompt", "response": {...}}];
+se usa la primera cuyo `match` aparezca en los mensajes, o DEFAULT_RESPONSE.
+
+    python tools/vlm_standin_server.py --port 18080 --latency lognormal:60,0.4 --error-rate 0.02
+
+Luego apunta VLM_API_BASE_URL (o --url de los benchmarks) a
+http://127.0.0.1:18080.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import math
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+# Respuesta válida para todos los llamadores (claves de NemotronVLVLM,
+# HUDReader, core.vision y vlm_api a la vez).
+DEFAULT_RESPONSE: Dict[str, Any] = {
+    "fase": "early",
+    "ronda": 1,
+    "oro": 10,
+    "vida": 100,
+    "nivel_tablero": 3,
+    "xp_actual": 0,
+    "tienda": [],
+    "sinergias_activas": {},
+    "comandante": "",
+    "emblema": "",
+    "tienda_abierta": False,
+    "screen_type": "own_board",
+    "round_label": "1-1",
+    "nivel": 3,
+    "own": {"gold": 10, "level": 3},
+    "players": [],
+    "round": "1-1",
+    "level": 3,
+    "gold": 10,
+    "hp_self": 100,
+}
+
+
+def parse_latency(spec: str) -> Callable[[random.Random], float]:
+    """'lognormal:50,0.5' -> función que devuelve una latencia en ms."""
+    kind, _, args = spec.partition(":")
+    params = [float(x) for x in args.split(",") if x.strip()] if args else []
+    kind = kind.strip().lower()
+
+    def need(n: int) -> None:
+        if len(params) != n:
+            raise ValueError(f"Latencia '{spec}': {kind} necesita {n} parámetro(s)")
+
+    if kind == "fixed":
+        need(1)
+        return lambda rng: params[0]
+    if kind == "uniform":
+        need(2)
+        return lambda rng: rng.uniform(params[0], params[1])
+    if kind == "normal":
+        need(2)
+        return lambda rng: max(0.0, rng.gauss(params[0], params[1]))
+    if kind == "lognormal":
+        need(2)
+        mu = math.log(max(params[0], 1e-6))
+        return lambda rng: rng.lognormvariate(mu, params[1])
+    if kind in ("exp", "exponential"):
+        need(1)
+        return lambda rng: rng.expovariate(1.0 / params[0]) if params[0] > 0 else 0.0
+    raise ValueError(f"Distribución de latencia desconocida: {spec}")
+
+
+def load_answers(path: Optional[str]) -> List[Dict[str, Any]]:
+    if not path:
+        return []
+    data = json.loads(Path(path).read_text(encoding="utf-8"))
+    if not isinstance(data, list):
+        raise ValueError(f"{path}: se esperaba una lista de {{match, response}}")
+    return data
+
+
+def _messages_text(messages: Any) -> str:
+    parts: List[str] = []
+    for msg in messages or []:
+        content = msg.get("content") if isinstance(msg, dict) else None
+        if isinstance(content, str):
+            parts.append(content)
+        elif isinstance(content, list):
+            for item in content:
+                if isinstance(item, dict) and item.get("type") == "text":
+                    parts.append(str(item.get("text", "")))
+    return "\n".join(parts)
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive, como un servidor real
+
+    # Se rellenan en make_server().
+    latency_ms: Callable[[random.Random], float] = staticmethod(lambda rng: 40.0)
+    ms_per_mb: float = 30.0
+    error_rate: float = 0.0
+    error_status: int = 500
+    answers: List[Dict[str, Any]] = []
+    model: str = "standin"
+    stream_chunk_chars: int = 8
+    stream_token_ms: float = 0.0
+    rng: random.Random = random.Random()
+    rng_lock = threading.Lock()
+
+    def do_GET(self) -> None:  # noqa: N802 (nombre de http.server)
+        if self.path.rstrip("/").endswith("/models"):
+            self._send(
+                200,
+                {"object": "list", "data": [{"id": self.model, "object": "model", "owned_by": "standin"}]},
+            )
+            return
+        self._send(404, {"error": f"unknown path {self.path}"})
+
+    def do_POST(self) -> None:  # noqa: N802
+        length = int(self.headers.get("Content-Length") or 0)
+        body = self.rfile.read(length)
+        try:
+            request = json.loads(body or b"{}")
+        except json.JSONDecodeError:
+            self._send(400, {"error": "invalid json"})
+            return
+        if not self.path.rstrip("/").endswith("/chat/completions"):
+            self._send(404, {"error": f"unknown path {self.path}"})
+            return
+
+        with self.rng_lock:
+            delay_ms = self.latency_ms(self.rng)
+            fail = self.error_rate > 0 and self.rng.random() < self.error_rate
+        time.sleep((delay_ms + self.ms_per_mb * length / 1e6) / 1000.0)
+        if fail:
+            self._send(self.error_status, {"error": {"message": "standin: error simulado", "code": self.error_status}})
+            return
+
+        content = json.dumps(self._answer(request), ensure_ascii=False)
+        if request.get("stream"):
+            self._send_stream(content)
+            return
+        self._send(
+            200,
+            {
+                "id": "standin",
+                "object": "chat.completion",
+                "model": request.get("model", self.model),
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+                "usage": {"prompt_tokens": 0, "completion_tokens": 0, "request_bytes": length},
+            },
+        )
+
+    def _answer(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        text = _messages_text(request.get("messages"))
+        for entry in self.answers:
+            if str(entry.get("match", "")) in text:
+                return entry.get("response", {})
+        return DEFAULT_RESPONSE
+
+    def _send(self, status: int, payload: Dict[str, Any]) -> None:
+        data = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _send_stream(self, content: str) -> None:
+        """SSE troceado; si el cliente corta, se deja de enviar (como un servidor real)."""
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        self.close_connection = True
+        step = max(1, self.stream_chunk_chars)
+        try:
+            for i in range(0, len(content), step):
+                chunk = {
+                    "id": "standin",
+                    "object": "chat.completion.chunk",
+                    "choices": [{"index": 0, "delta": {"content": content[i : i + step]}, "finish_reason": None}],
+                }
+                self.wfile.write(b"data: " + json.dumps(chunk).encode("utf-8") + b"\n\n")
+                self.wfile.flush()
+                if self.stream_token_ms > 0:
+                    time.sleep(self.stream_token_ms / 1000.0)
+            self.wfile.write(b"data: [DONE]\n\n")
+            self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+    def log_message(self, fmt: str, *args: Any) -> None:
+        pass
+
+
+def make_server(
+    host: str = "127.0.0.1",
+    port: int = 18080,
+    base_ms: float = 40.0,
+    ms_per_mb: float = 30.0,
+    latency: str = "",
+    error_rate: float = 0.0,
+    error_status: int = 500,
+    answers: Optional[List[Dict[str, Any]]] = None,
+    model: str = "standin",
+    stream_token_ms: float = 0.0,
+    seed: Optional[int] = None,
+) -> ThreadingHTTPServer:
+    """`latency` (p.ej. 'uniform:20,80') tiene prioridad sobre `base_ms` fijo."""
+    handler = type(
+        "ConfiguredStandInHandler",
+        (StandInHandler,),
+        {
+            "latency_ms": staticmethod(parse_latency(latency or f"fixed:{base_ms}")),
+            "ms_per_mb": ms_per_mb,
+            "error_rate": error_rate,
+            "error_status": error_status,
+            "answers": list(answers or []),
+            "model": model,
+            "stream_token_ms": stream_token_ms,
+            "rng": random.Random(seed),
+            "rng_lock": threading.Lock(),
+        },
+    )
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    return server
+
+
+def serve_in_thread(**kwargs: Any) -> Tuple[ThreadingHTTPServer, str]:
+    """Arranca el servidor en un hilo daemon (port=0 = puerto libre). Devuelve (server, url)."""
+    kwargs.setdefault("port", 0)
+    server = make_server(**kwargs)
+    threading.Thread(target=server.serve_forever, name="vlm-standin", daemon=True).start()
+    host, port = server.server_address[:2]
+    return server, f"http://{host}:{port}"
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Stand-in local de la API OpenAI (/v1/chat/completions, /v1/models).")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=18080)
+    parser.add_argument("--base-ms", type=float, default=40.0, help="Latencia fija (si no se pasa --latency).")
+    parser.add_argument("--latency", default="", help="Distribución: fixed:40, uniform:20,80, lognormal:50,0.5, exp:50...")
+    parser.add_argument("--ms-per-mb", type=float, default=30.0, help="Latencia extra por MB recibido.")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fracción de peticiones que fallan (0-1).")
+    parser.add_argument("--error-status", type=int, default=500, help="Status HTTP de los errores simulados.")
+    parser.add_argument("--answers", default="", help="JSON con [{match, response}] enlatadas.")
+    parser.add_argument("--model", default="standin", help="Id que devuelve /v1/models.")
+    parser.add_argument("--stream-token-ms", type=float, default=0.0, help="Pausa entre trozos SSE.")
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+
+    server = make_server(
+        args.host,
+        args.port,
+        base_ms=args.base_ms,
+        ms_per_mb=args.ms_per_mb,
+        latency=args.latency,
+        error_rate=args.error_rate,
+        error_status=args.error_status,
+        answers=load_answers(args.answers),
+        model=args.model,
+        stream_token_ms=args.stream_token_ms,
+        seed=args.seed,
+    )
+    print(f"[standin] Escuchando en http://{args.host}:{args.port}/v1 (chat/completions, models)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,24 +1,107 @@
 # train_hud_model.py
 """
 Entrena el modelo local de HUD usando data/labels.jsonl y data/raw_frames/.
+
+    python train_hud_model.py                                 # ResNet18 sobre el frame a 224x224
+    python train_hud_model.py --backbone mobilenet_v3_small   # ~1M parámetros, ImageNet
+    python train_hud_model.py --backbone tiny                 # CNN propia, a 192x320
+    python train_hud_model.py --model roi                     # CNN pequeña sobre las ROIs del HUD
+
+El checkpoint guarda "model_type" ("backbone" e "input_size" para frame,
+"roi_sizes" para roi) para que HUDLocalReader reconstruya el mismo modelo
+y el mismo preprocesado.
 """
 
 from __future__ import annotations
 
+import argparse
+
 import torch
 import torch.nn as nn
 from torch.utils.data import DataLoader, random_split
 
 from datasets.hud_dataset import HUDDataset
-from models.hud_model import HUDModel
-
-
-def train(num_epochs: int = 15, batch_size: int = 16, lr: float = 1e-4) -> None:
+from models.hud_model import BACKBONES, DEFAULT_BACKBONE, HUDModel
+from models.hud_roi_model import FrameTransform, HUDRoiModel, to_device
+
+
+HEADS = ("round", "level", "gold", "hp_self")
+
+# Clases por cabeza numérica. El nivel llega a 10, así que son 11 (0-10).
+NUM_CLASSES = {"level": 11, "gold": 101, "hp_self": 101}
+
+# lr por defecto: afinar un backbone preentrenado o entrenar desde cero
+# (roi y el backbone "tiny").
+LR_PRETRAINED = 1e-4
+LR_SCRATCH = 1e-3
+
+
+def fit_temperatures(model: nn.Module, loader: DataLoader, device: torch.device) -> dict:
+    """
+    Temperature scaling por cabeza sobre el conjunto de validación: busca T
+    que minimiza la NLL de softmax(logits / T). No cambia el argmax, solo
+    hace que la probabilidad de la clase elegida sea una confianza usable
+    (core/hud_cascade.py decide con ella si consultar al VLM).
+    """
+    model.eval()
+    logits = {h: [] for h in HEADS}
+    labels = {h: [] for h in HEADS}
+    with torch.no_grad():
+        for x, targets in loader:
+            outputs = model(to_device(x, device))
+            for h in HEADS:
+                logits[h].append(outputs[h].cpu())
+                labels[h].append(targets[h].cpu())
+
+    temperatures = {}
+    for h in HEADS:
+        if not logits[h]:
+            temperatures[h] = 1.0
+            continue
+        z = torch.cat(logits[h])
+        y = torch.cat(labels[h])
+        mask = y != -100
+        if mask.sum() < 2:
+            temperatures[h] = 1.0
+            continue
+        z, y = z[mask], y[mask]
+        log_t = torch.zeros(1, requires_grad=True)
+        opt = torch.optim.LBFGS([log_t], lr=0.1, max_iter=100)
+
+        def closure():
+            opt.zero_grad()
+            loss = nn.functional.cross_entropy(z / log_t.exp(), y)
+            loss.backward()
+            return loss
+
+        opt.step(closure)
+        temperatures[h] = round(float(log_t.exp().clamp(0.05, 20.0).item()), 4)
+    return temperatures
+
+
+def train(
+    num_epochs: int = 15,
+    batch_size: int = 16,
+    lr: float | None = None,
+    model_type: str = "frame",
+    out_path: str = "hud_model.pt",
+    backbone: str = DEFAULT_BACKBONE,
+    input_size: tuple[int, int] | None = None,
+) -> None:
     device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
-    print("Usando dispositivo:", device)
+    spec = BACKBONES[backbone]
+    input_size = tuple(input_size or spec.input_size)
+    if model_type == "roi":
+        print("Usando dispositivo:", device, "| modelo: roi")
+        from_scratch = True
+    else:
+        print("Usando dispositivo:", device, f"| modelo: frame ({backbone}, {input_size[0]}x{input_size[1]})")
+        from_scratch = not spec.pretrained
+    lr = lr if lr is not None else (LR_SCRATCH if from_scratch else LR_PRETRAINED)
 
     # Dataset completo para construir vocabulario de rondas
-    full_ds = HUDDataset()
+    transform = FrameTransform(input_size) if model_type == "frame" else None
+    full_ds = HUDDataset(transform=transform, model_type=model_type, num_classes=NUM_CLASSES)
     round_vocab = full_ds.round_vocab
     num_round_classes = len(round_vocab)
 
@@ -31,12 +114,17 @@ def train(num_epochs: int = 15, batch_size: int = 16, lr: float = 1e-4) -> None:
     train_loader = DataLoader(train_ds, batch_size=batch_size, shuffle=True)
     val_loader = DataLoader(val_ds, batch_size=batch_size)
 
-    model = HUDModel(
+    heads = dict(
         num_round_classes=num_round_classes,
-        num_level_classes=10,
-        num_gold_classes=101,
-        num_hp_classes=101,
-    ).to(device)
+        num_level_classes=NUM_CLASSES["level"],
+        num_gold_classes=NUM_CLASSES["gold"],
+        num_hp_classes=NUM_CLASSES["hp_self"],
+    )
+    if model_type == "roi":
+        model = HUDRoiModel(**heads)
+    else:
+        model = HUDModel(**heads, backbone=backbone)
+    model = model.to(device)
 
     criterion = nn.CrossEntropyLoss(ignore_index=-100)
     optimizer = torch.optim.Adam(model.parameters(), lr=lr)
@@ -46,7 +134,7 @@ def train(num_epochs: int = 15, batch_size: int = 16, lr: float = 1e-4) -> None:
         total_loss = 0.0
 
         for x, targets in train_loader:
-            x = x.to(device)
+            x = to_device(x, device)
             targets = {k: v.to(device) for k, v in targets.items()}
 
             optimizer.zero_grad()
@@ -70,7 +158,7 @@ def train(num_epochs: int = 15, batch_size: int = 16, lr: float = 1e-4) -> None:
         val_loss = 0.0
         with torch.no_grad():
             for x, targets in val_loader:
-                x = x.to(device)
+                x = to_device(x, device)
                 targets = {k: v.to(device) for k, v in targets.items()}
                 outputs = model(x)
                 loss_round = criterion(outputs["round"], targets["round"])
@@ -87,14 +175,50 @@ def train(num_epochs: int = 15, batch_size: int = 16, lr: float = 1e-4) -> None:
             f"val_loss = {avg_val_loss:.4f}"
         )
 
-    # Guardar modelo + vocabulario de rondas
+    temperatures = fit_temperatures(model, val_loader, device)
+    print("Temperaturas calibradas:", temperatures)
+
+    # Guardar modelo + vocabulario de rondas + calibración de confianza
     ckpt = {
         "model_state_dict": model.state_dict(),
+        "model_type": model_type,
+        "num_classes": NUM_CLASSES,
         "round_vocab": round_vocab,
+        "temperatures": temperatures,
     }
-    torch.save(ckpt, "hud_model.pt")
-    print("Modelo guardado en hud_model.pt")
+    if model_type == "roi":
+        ckpt["roi_sizes"] = full_ds.transform.roi_sizes
+    else:
+        ckpt["backbone"] = backbone
+        ckpt["input_size"] = list(input_size)
+    torch.save(ckpt, out_path)
+    print(f"Modelo guardado en {out_path}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Entrena el modelo local del HUD.")
+    parser.add_argument(
+        "--model",
+        choices=("frame", "roi"),
+        default="frame",
+        help="frame: backbone sobre el frame entero; roi: CNN pequeña por regiones.",
+    )
+    parser.add_argument("--backbone", choices=sorted(BACKBONES), default=DEFAULT_BACKBONE, help="Solo con --model frame.")
+    parser.add_argument(
+        "--input-size",
+        type=int,
+        nargs=2,
+        metavar=("ALTO", "ANCHO"),
+        default=None,
+        help="Tamaño de entrada del frame (por defecto, el del backbone).",
+    )
+    parser.add_argument("--epochs", type=int, default=15)
+    parser.add_argument("--batch-size", type=int, default=16)
+    parser.add_argument("--lr", type=float, default=None, help="Por defecto 1e-4 (preentrenado) o 1e-3 (roi, tiny).")
+    parser.add_argument("--out", default="hud_model.pt")
+    args = parser.parse_args()
+    train(args.epochs, args.batch_size, args.lr, args.model, args.out, args.backbone, args.input_size)
 
 
 if __name__ == "__main__":
-    train()
+    main()
@@ -3,11 +3,13 @@ import base64
 import json
 from typing import Any, Dict
 
-from openai import OpenAI
+from config import OPENAI_API_BASE_URL
+from core.api_gateway import get_gateway, message_text
+from core.vlm_cache import get_vlm_cache
 
 
 # Usa la variable de entorno OPENAI_API_KEY
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+gateway = get_gateway(OPENAI_API_BASE_URL, api_key=os.getenv("OPENAI_API_KEY", ""))
 
 # Modelo de visión. Ajusta según tengas acceso:
 # - "gpt-4.1"
@@ -41,15 +43,28 @@ def _build_hud_prompt() -> str:
     )
 
 
-def analyze_hud_image(image_path: str) -> Dict[str, Any]:
+def analyze_hud_image(image_path: str, use_cache: bool = True) -> Dict[str, Any]:
     """
     Envía una captura de pantalla del juego a la API de OpenAI para que
     extraiga round, level, gold y hp_self. Devuelve un dict con esos campos.
+    Capturas idénticas (mismos píxeles) se sirven desde la caché salvo con
+    use_cache=False.
     """
+    if not use_cache:
+        return _request_hud(image_path)
+    return get_vlm_cache().get_or_call(
+        [image_path],
+        _build_hud_prompt(),
+        OPENAI_VLM_MODEL,
+        lambda: _request_hud(image_path),
+    )
+
+
+def _request_hud(image_path: str) -> Dict[str, Any]:
     image_b64 = _encode_image_to_base64(image_path)
     prompt = _build_hud_prompt()
 
-    response = client.chat.completions.create(
+    response = gateway.chat(
         model=OPENAI_VLM_MODEL,
         messages=[
             {
@@ -68,18 +83,9 @@ def analyze_hud_image(image_path: str) -> Dict[str, Any]:
         temperature=0.0,
     )
 
-    content = response.choices[0].message.content
-
-    if isinstance(content, list):
-        # SDK a veces devuelve lista de segmentos
-        text_parts = []
-        for c in content:
-            if isinstance(c, dict) and "text" in c:
-                text_parts.append(c["text"])
-        content = "".join(text_parts)
-
-    if not isinstance(content, str):
-        raise ValueError(f"Respuesta inesperada de la API: {content!r}")
+    content = message_text(response)
+    if not content:
+        raise ValueError(f"Respuesta inesperada de la API: {response!r}")
 
     # Intentamos parsear JSON
     try: